@@ -1,45 +1,22 @@
-import os
-import json
-from pathlib import Path
-from pydub import AudioSegment
+from commentary_pipeline import AssetIndex
 
-# Load existing manifest
-with open("./commentary_audio_v2/manifest.json") as f:
-    manifest = json.load(f)
+# Refresh the asset index and merge its exact durations into the manifest
+index = AssetIndex("./commentary_audio_v2")
+stats = index.refresh()
+print(f"Asset index: {stats.describe()}")
 
-# Add durations to each file
-for item in manifest["files"]:
-    mp3_path = Path(f"./commentary_audio_v2/{item['filename']}")
-    if mp3_path.exists():
-        audio = AudioSegment.from_mp3(mp3_path)
-        item["duration_sec"] = round(len(audio) / 1000, 2)
-    else:
-        item["duration_sec"] = 8.0  # Default estimate
-
-# Save updated manifest
-with open("./commentary_audio_v2/manifest.json", "w") as f:
-    json.dump(manifest, f, indent=2)
+manifest = index.manifest()
+index.write_manifest(manifest)
 
 print("Updated manifest with durations:")
 for item in manifest["files"]:
-    print(f"  [{item['index']:02d}] {item['time']:5.1f}s - {item['duration_sec']:4.1f}s duration - {item['text'][:40]}...")
-
-# Also create a JS-compatible version
-js_data = {
-    "commentaryTiming": []
-}
-
-for item in manifest["files"]:
-    js_data["commentaryTiming"].append({
-        "index": item["index"],
-        "triggerTime": item["time"],
-        "duration": item["duration_sec"],
-        "text": item["text"],
-        "filename": item["filename"],
-        "subjectId": item["subjectId"]
-    })
+    duration = f"{item['duration_sec']:4.1f}s" if "duration_sec" in item else "  ✗ missing"
+    print(f"  [{item['index']:02d}] {item['time']:5.1f}s - {duration} duration - {item.get('text', '')[:40]}...")
 
-with open("./data/commentary_timing.json", "w") as f:
-    json.dump(js_data, f, indent=2)
+# Also create a JS-compatible version from the same index
+timing_path = index.write_timing("./data/commentary_timing.json", manifest)
+print(f"\nCreated {timing_path} with {len(index.assets)} entries")
 
-print(f"\nCreated commentary_timing.json with {len(js_data['commentaryTiming'])} entries")
+missing = [item for item in manifest["files"] if "duration_sec" not in item]
+if missing:
+    print(f"✗ {len(missing)} clips missing (no duration recorded): {', '.join(str(m['index']) for m in missing)}")
@@ -0,0 +1,63 @@
+"""
+Commentary synthesis pipeline shared by the generate_* scripts.
+
+Each script keeps its own COMMENTARY_EVENTS table and prompt style, turns the
+events into ClipRequests and hands them to generate_clips(), which drives TTS
+through a token-bucket RPM limiter with a concurrency ceiling instead of a
+fixed time.sleep(RATE_LIMIT_DELAY) between serial calls. Synthesized PCM is
+kept in a content-addressed ClipCache so unchanged lines are never re-requested.
+
+race_events derives the event list itself from a replay's splits, for races
+that don't have a hand-written table; batch runs that for every replay
+under one persisted QuotaLedger.
+"""
+
+from .clips import SAMPLE_RATE, ClipRequest, ClipResult
+from .backends import (
+    AzureBackend,
+    FakeBackend,
+    GeminiBackend,
+    GoogleCloudBackend,
+    NoAudioError,
+    RateLimitError,
+    TTSError,
+)
+from .cache import ClipCache
+from .journal import JobJournal
+from .quota import QuotaLedger
+from .scheduler import TokenBucket, run_scheduled
+from .pipeline import generate_clips, generate_clips_async
+from .mp3info import mp3_duration, mp3_info
+from .timing import TimingFile
+from .assets import AssetIndex
+from .race_events import extract_events, replay_events
+from .spoken import normalize_text, parse_clock, spoken_time
+
+__all__ = [
+    "SAMPLE_RATE",
+    "ClipRequest",
+    "ClipResult",
+    "ClipCache",
+    "JobJournal",
+    "QuotaLedger",
+    "GeminiBackend",
+    "GoogleCloudBackend",
+    "AzureBackend",
+    "FakeBackend",
+    "TTSError",
+    "NoAudioError",
+    "RateLimitError",
+    "TokenBucket",
+    "run_scheduled",
+    "generate_clips",
+    "generate_clips_async",
+    "mp3_duration",
+    "mp3_info",
+    "TimingFile",
+    "AssetIndex",
+    "extract_events",
+    "replay_events",
+    "normalize_text",
+    "parse_clock",
+    "spoken_time",
+]
@@ -0,0 +1,399 @@
+"""
+Command line entry point: python -m commentary_pipeline <command>
+"""
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+from .assets import AssetIndex
+from .audio import LADDER
+from .backends import FakeBackend
+from .batch import DEFAULT_ROOT, plan_batch, run_batch, write_manifest
+from .bench import format_report, load_events, run_bench
+from .cache import ClipCache
+from .journal import JobJournal
+from .pipeline import generate_clips
+from .publish import SOUNDTRACK, SPRITE, TIMING, publish_artifact
+from .quota import DEFAULT_QUOTA_PATH, QuotaLedger
+from .race_events import build_requests, extract_events, load_race
+from .reencode import find_clip_dirs, reencode_dirs
+from .triggers import plan_events, schedule_timing
+
+
+def cmd_reencode(args) -> None:
+    dirs = args.dirs or find_clip_dirs()
+    if not dirs:
+        print("No commentary_* directories with MP3 files found")
+        return
+    print(f"Re-encoding {', '.join(str(d) for d in dirs)}")
+    print("-" * 60)
+    ok, failed = reencode_dirs(dirs, bitrate=args.bitrate, workers=args.workers)
+    print("-" * 60)
+    print(f"Done! Re-encoded {ok} files ({failed} failed)")
+
+
+def cmd_index(args) -> None:
+    dirs = args.dirs or find_clip_dirs()
+    for d in dirs:
+        start = time.perf_counter()
+        index = AssetIndex(d)
+        stats = index.refresh()
+        if stats.dirty:
+            index.write_manifest()
+            index.write_timing(index.directory / "commentary_timing.json")
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"{str(d):28s} {len(index.assets):3d} clips  {stats.describe()}  ({elapsed_ms:.1f} ms)")
+        if args.timing and len(dirs) == 1:
+            index.write_timing(args.timing)
+            print(f"Timing: {args.timing}")
+
+
+def cmd_bench(args) -> None:
+    events = load_events(args.events)
+    backend = FakeBackend(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        no_audio_rate=args.no_audio_rate,
+        bad_audio_rate=args.bad_audio_rate,
+        burst_every=args.burst_every,
+        burst_length=args.burst_length,
+        seed=args.seed,
+    )
+    print(f"Benchmarking {len(events) * args.repeat} clips from {args.events}")
+    print(f"Fake TTS latency {args.latency}s ±{args.jitter}s | {args.rpm} RPM, {args.concurrency} concurrent")
+    print("-" * 60)
+    stats = run_bench(
+        events,
+        backend,
+        rpm=args.rpm,
+        concurrency=args.concurrency,
+        encoder_workers=args.workers,
+        format=args.format,
+        repeat=args.repeat,
+        qa=make_qa(args),
+    )
+    print(format_report(stats))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(stats, f, indent=2)
+
+
+def cmd_events(args) -> None:
+    replay, event, runners = load_race(args.replay, args.heats)
+    events = extract_events(event, runners)
+    print(f"{replay.get('title') or replay.get('replay_id')}: {len(runners)} runners, {len(events)} events")
+    print("-" * 60)
+    # Planned with estimated durations; re-solved with exact ones after synthesis.
+    for e, cue in zip(events, plan_events(events)):
+        start = "dropped" if cue.dropped else f"{cue.start:7.2f}s"
+        print(f"{e['dueTime']:7.2f}s → {start:8s} {e['kind']:20s} {e['text']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(events, f, indent=2)
+        print(f"Events: {args.json}")
+    if not args.generate:
+        return
+
+    backend = make_backend(args)
+    if backend is None:
+        return
+    output_dir = Path(args.generate)
+    requests = build_requests(events, voice=args.voice, format=args.format)
+    cache = ClipCache()
+    if args.fragments:
+        from .fragments import FragmentLibrary
+
+        backend = FragmentLibrary(backend, cache=cache)
+        missing = len(backend.missing(requests))
+        print("-" * 60)
+        print(f"Fragments: {missing} to synthesize")
+        _, failed = backend.prefetch(requests, rpm=args.rpm)
+        if failed:
+            print(f"{len(failed)} fragments failed; their clips will retry them")
+        # Assembled lines are cheap to rebuild; only the fragments are cached.
+        cache = None
+    print("-" * 60)
+    results = generate_clips(
+        requests,
+        output_dir,
+        backend,
+        rpm=args.rpm,
+        cache=cache,
+        postprocess=make_postprocess(args),
+        qa=make_qa(args),
+        journal=JobJournal.for_dir(output_dir),
+        timing_path=output_dir / "commentary_timing.json",
+        format=args.format,
+        ladder=LADDER if args.ladder else (),
+        speeds=args.stretch or (),
+        stretch_cache=make_stretch_cache(args),
+    )
+    write_manifest(output_dir, replay, backend.model, events, results)
+    print("-" * 60)
+    if any(r.ok for r in results):
+        cues = schedule_timing(output_dir / "commentary_timing.json")
+        publish_artifact(output_dir, TIMING, "commentary_timing.json")
+        print(f"Scheduled {sum(not c.dropped for c in cues)}/{len(cues)} clips without overlap")
+    print(f"Done! Generated {sum(r.ok for r in results)}/{len(events)} clips in {output_dir}")
+
+
+def cmd_batch(args) -> None:
+    cache = ClipCache()
+    ledger = QuotaLedger(args.quota_file, rpm=args.rpm, rpd=args.rpd)
+    model = "fake-tts" if args.fake else args.model
+    plans = plan_batch(model, ledger, heats=args.heats, root=args.root, cache=cache,
+                       voice=args.voice, format=args.format, only=args.replays or None)
+    calls = sum(p.calls for p in plans)
+    print(f"{len(plans)} replays, {sum(len(p.requests) for p in plans)} clips, {calls} provider calls needed")
+    print(f"Quota: {ledger.remaining()}/{ledger.rpd} calls left today ({ledger.day}), {ledger.rpm:g} RPM")
+    print("-" * 60)
+    for plan in plans:
+        print(plan.describe())
+    if args.dry_run:
+        return
+
+    backend = make_backend(args)
+    if backend is None:
+        return
+    print("-" * 60)
+    run_batch(plans, backend, ledger, cache=cache, concurrency=args.concurrency, format=args.format,
+              postprocess=make_postprocess(args), qa=make_qa(args), ladder=LADDER if args.ladder else (),
+              speeds=args.stretch or (), stretch_cache=make_stretch_cache(args))
+    print("-" * 60)
+    generated = sum(r.ok for p in plans for r in p.results)
+    print(f"Done! Generated {generated} clips | {ledger.remaining()} calls left today")
+
+
+def cmd_sprite(args) -> None:
+    from .sprite import SPRITE_TABLE, build_sprite, sprite_savings
+
+    for d in args.dirs:
+        table = build_sprite(d, format=args.format, guard_ms=args.guard_ms,
+                             ladder=LADDER if args.ladder else (), workers=args.workers)
+        separate, packed = sprite_savings(d, table)
+        publish_artifact(d, SPRITE, SPRITE_TABLE)
+        print(f"{d}: {len(table['clips'])} clips → {table['file']} ({table['duration']:.1f}s, "
+              f"{packed / 1024:.0f} KB vs {separate / 1024:.0f} KB separately)")
+
+
+def cmd_mixdown(args) -> None:
+    from .mixdown import SOUNDTRACK_TABLE, render_soundtrack
+
+    replay, event, runners = load_race(args.replay, args.heats)
+    clip_dir = Path(args.dir)
+    table = render_soundtrack(clip_dir / "commentary_timing.json", event, runners, speeds=args.speeds,
+                              format=args.format, workers=args.workers)
+    print(f"{replay.get('title') or replay.get('replay_id')}: {table['clips']} clips, "
+          f"{', '.join(c['kind'] for c in table['sfx'])}")
+    for track in table["tracks"]:
+        print(f"  {track['speed']:g}x  {track['file']:24s} {track['duration']:7.1f}s  {track['bytes'] / 1024:6.0f} KB")
+    print(f"Listed in {publish_artifact(clip_dir, SOUNDTRACK, SOUNDTRACK_TABLE)}")
+
+
+def cmd_qa(args) -> None:
+    from .qa import audit_dir, requeue
+
+    for d in args.dirs:
+        reports = audit_dir(d, workers=args.workers)
+        flagged = [(name, report) for name, report in reports if not report.ok]
+        print(f"{d}: {len(reports)} clips, {len(flagged)} flagged")
+        for name, report in flagged:
+            print(f"  ✗ {name}: {report.describe()}")
+        if args.requeue and flagged:
+            requeued = requeue(d, flagged, cache=ClipCache())
+            print(f"  Requeued {len(requeued)}/{len(flagged)} (clips without a journal entry need a manual re-run)")
+
+
+def cmd_timeline(args) -> None:
+    from .race_events import load_replays
+    from .timeline import build_replay_timeline
+
+    replay_ids = args.replays or [r.get("replay_id") for r in load_replays(args.heats)["replays"]]
+    for replay_id in replay_ids:
+        start = time.perf_counter()
+        replay, index = build_replay_timeline(replay_id, args.root, heats=args.heats, fps=args.fps)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"{replay.get('replay_id'):40s} {len(index['runnerIds']):3d} runners  {index['frames']:5d} frames  "
+              f"{index['bytes'] / 1024:6.0f} KB  ({elapsed_ms:.0f} ms)")
+
+
+def cmd_schedule(args) -> None:
+    for path in args.timing:
+        cues = schedule_timing(path, gap=args.gap)
+        moved = sum(1 for c in cues if not c.dropped and c.start != c.ideal)
+        dropped = [c.index for c in cues if c.dropped]
+        print(f"{path}: {len(cues)} clips, {moved} moved, {len(dropped)} dropped {dropped or ''}".rstrip())
+
+
+def make_backend(args):
+    if args.fake:
+        return FakeBackend(latency=0.0, jitter=0.0)
+    from google import genai
+    from .backends import GeminiBackend
+
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        print("Error: GEMINI_API_KEY not found")
+        return None
+    return GeminiBackend(genai.Client(api_key=api_key), args.model)
+
+
+def make_postprocess(args):
+    if not args.postprocess:
+        return None
+    from .postprocess import PostProcessor
+
+    return PostProcessor(target_lufs=args.target_lufs)
+
+
+def make_qa(args):
+    if not args.qa:
+        return None
+    from .qa import ClipQA
+
+    return ClipQA()
+
+
+def make_stretch_cache(args):
+    if not args.stretch:
+        return None
+    from .stretch import StretchCache
+
+    # One per run, shared by every clip (and every replay in a batch).
+    return StretchCache()
+
+
+def add_output_args(p, stretch: bool = True) -> None:
+    p.add_argument("--format", default="mp3", help="Output format (wav skips ffmpeg)")
+    p.add_argument("--ladder", action="store_true",
+                   help="Also encode each clip as Opus/WebM and 32k/64k MP3 for the player to choose from")
+    if stretch:
+        p.add_argument("--stretch", type=float, nargs="+", metavar="SPEED",
+                       help="Also encode pitch-preserving time-stretched copies for these playback speeds")
+
+
+def add_postprocess_args(p) -> None:
+    p.add_argument("--postprocess", action="store_true",
+                   help="Trim silence, normalize loudness and peak-limit clips before encoding")
+    p.add_argument("--target-lufs", type=float, default=-18.0, help="Loudness target for --postprocess")
+
+
+def add_qa_args(p) -> None:
+    p.add_argument("--qa", action="store_true",
+                   help="Check each clip (silence, clipping, truncation, duration vs text) and re-synthesize bad ones")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m commentary_pipeline",
+                                     description="Commentary audio pipeline tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("reencode", help="Re-encode existing clips without TTS calls")
+    p.add_argument("dirs", nargs="*", help="Clip directories (default: every commentary_* dir)")
+    p.add_argument("--bitrate", help="MP3 bitrate, e.g. 96k")
+    p.add_argument("--workers", type=int, help="Encoder processes (default: CPU count)")
+    p.set_defaults(func=cmd_reencode)
+
+    p = sub.add_parser("index", help="Refresh asset indexes, manifests and timing views")
+    p.add_argument("dirs", nargs="*", help="Clip directories (default: every commentary_* dir)")
+    p.add_argument("--timing", help="Also write the commentaryTiming view here (single dir only)")
+    p.set_defaults(func=cmd_index)
+
+    p = sub.add_parser("bench", help="Benchmark the pipeline against the offline fake backend")
+    p.add_argument("--events", default="commentary_audio_v2/manifest.json",
+                   help="JSON event list, manifest or commentaryTiming file")
+    p.add_argument("--repeat", type=int, default=1, help="Run the event list this many times")
+    p.add_argument("--rpm", type=float, default=600)
+    p.add_argument("--concurrency", type=int, default=4)
+    p.add_argument("--workers", type=int, help="Encoder processes (default: CPU count)")
+    p.add_argument("--format", default="mp3", help="Output format (wav skips ffmpeg)")
+    p.add_argument("--latency", type=float, default=0.5, help="Mean fake TTS latency in seconds")
+    p.add_argument("--jitter", type=float, default=0.2)
+    p.add_argument("--error-rate", type=float, default=0.0)
+    p.add_argument("--no-audio-rate", type=float, default=0.0)
+    p.add_argument("--bad-audio-rate", type=float, default=0.0, help="Fraction of calls returning unusable audio")
+    p.add_argument("--burst-every", type=int, default=0, help="Start a 429 burst every N calls")
+    p.add_argument("--burst-length", type=int, default=3)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--json", help="Also write the stats as JSON here")
+    add_qa_args(p)
+    p.set_defaults(func=cmd_bench)
+
+    p = sub.add_parser("events", help="Derive commentary events for a replay (optionally synthesize them)")
+    p.add_argument("replay", nargs="?", help="replay_id in the heats file (default: its default replay)")
+    p.add_argument("--heats", default="data/custom_800m_heats.json")
+    p.add_argument("--json", help="Write the event list here")
+    p.add_argument("--generate", metavar="DIR", help="Synthesize the events into this directory")
+    p.add_argument("--fake", action="store_true", help="Use the offline fake backend")
+    p.add_argument("--fragments", action="store_true",
+                   help="Assemble lines from the phrase-fragment library instead of one TTS call per line")
+    p.add_argument("--model", default="gemini-2.5-flash-preview-tts")
+    p.add_argument("--voice", default="Puck")
+    p.add_argument("--rpm", type=float, default=7)
+    add_output_args(p)
+    add_postprocess_args(p)
+    add_qa_args(p)
+    p.set_defaults(func=cmd_events)
+
+    p = sub.add_parser("batch", help="Generate commentary for every replay under a shared daily quota")
+    p.add_argument("replays", nargs="*", help="Only these replay_ids (default: all)")
+    p.add_argument("--heats", default="data/custom_800m_heats.json")
+    p.add_argument("--root", default=str(DEFAULT_ROOT), help="Output root; one directory per replay")
+    p.add_argument("--quota-file", default=str(DEFAULT_QUOTA_PATH))
+    p.add_argument("--rpm", type=float, default=7, help="Provider requests per minute")
+    p.add_argument("--rpd", type=int, default=100, help="Provider requests per day")
+    p.add_argument("--concurrency", type=int, default=4)
+    p.add_argument("--dry-run", action="store_true", help="Print the plan without synthesizing")
+    p.add_argument("--fake", action="store_true", help="Use the offline fake backend")
+    p.add_argument("--model", default="gemini-2.5-flash-preview-tts")
+    p.add_argument("--voice", default="Puck")
+    add_output_args(p)
+    add_postprocess_args(p)
+    add_qa_args(p)
+    p.set_defaults(func=cmd_batch)
+
+    p = sub.add_parser("sprite", help="Pack each clip directory into one sprite file plus sprite.json")
+    p.add_argument("dirs", nargs="+", help="Clip directories")
+    p.add_argument("--guard-ms", type=int, default=300, help="Silence around each clip in the sprite")
+    p.add_argument("--workers", type=int, help="Decoder processes (default: CPU count)")
+    add_output_args(p, stretch=False)
+    p.set_defaults(func=cmd_sprite)
+
+    p = sub.add_parser("mixdown", help="Render a replay's commentary and effects into one track per speed")
+    p.add_argument("replay", nargs="?", help="replay_id in the heats file (default: its default replay)")
+    p.add_argument("--dir", required=True, help="Clip directory with commentary_timing.json; tracks go here")
+    p.add_argument("--heats", default="data/custom_800m_heats.json")
+    p.add_argument("--speeds", type=float, nargs="+", default=[1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0])
+    p.add_argument("--workers", type=int, help="Decoder/encoder processes (default: CPU count)")
+    p.add_argument("--format", default="mp3", help="Output format (wav skips ffmpeg)")
+    p.set_defaults(func=cmd_mixdown)
+
+    p = sub.add_parser("qa", help="Check existing clips for silence, clipping, truncation and odd durations")
+    p.add_argument("dirs", nargs="+", help="Clip directories (texts are read from their manifest.json)")
+    p.add_argument("--requeue", action="store_true",
+                   help="Mark flagged clips failed in the journal and drop their cached PCM so the next run redoes them")
+    p.add_argument("--workers", type=int, help="Decoder processes (default: CPU count)")
+    p.set_defaults(func=cmd_qa)
+
+    p = sub.add_parser("timeline", help="Precompute each replay's marker trajectories for lookup playback")
+    p.add_argument("replays", nargs="*", help="Only these replay_ids (default: all)")
+    p.add_argument("--heats", default="data/custom_800m_heats.json")
+    p.add_argument("--root", default=str(DEFAULT_ROOT), help="Output root; one directory per replay")
+    p.add_argument("--fps", type=int, default=30, help="Keyframes per second of race time")
+    p.set_defaults(func=cmd_timeline)
+
+    p = sub.add_parser("schedule", help="Solve non-overlapping trigger times for commentaryTiming files")
+    p.add_argument("timing", nargs="+", help="commentaryTiming JSON files (rewritten in place)")
+    p.add_argument("--gap", type=float, default=0.3, help="Minimum silence between clips in seconds")
+    p.set_defaults(func=cmd_schedule)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
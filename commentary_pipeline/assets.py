@@ -0,0 +1,192 @@
+"""
+Incremental asset index for a commentary clip directory.
+
+Each directory keeps a .assets.json index of its commentary_*.mp3 files:
+stat signature (mtime_ns, size), sha256, exact duration/samples from the MP3
+headers, and the clip index and trigger time parsed from the filename. A
+refresh only re-reads files whose stat signature changed, so its cost tracks
+the number of edited clips rather than the size of the library.
+
+The per-directory manifest.json and the browser-facing commentaryTiming view
+are both emitted from this one index.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .mp3info import MP3FormatError, mp3_info
+from .timing import write_json_atomic
+
+INDEX_FILENAME = ".assets.json"
+INDEX_VERSION = 1
+
+# commentary_<index>_<trigger time>s[_<slug>].mp3
+CLIP_NAME = re.compile(r"^commentary_(?P<index>\d+)_(?P<time>-?\d+(?:\.\d+)?)s(?:_.*)?\.mp3$")
+# Derived files written beside a clip: ladder rungs (audio.Variant.filename) and
+# time-stretched copies (stretch.encode_stretched), <stem>.<tag>.<ext>
+LADDER_NAME = re.compile(r"^commentary_\d+_-?\d+(?:\.\d+)?s(?:_[^.]*)?\.\w+\.(?:mp3|webm|wav)$")
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class RefreshStats:
+    added: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    unchanged: int = 0
+    skipped: list[str] = field(default_factory=list)
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+    def describe(self) -> str:
+        return (f"{len(self.added)} added, {len(self.changed)} changed, "
+                f"{len(self.removed)} removed, {self.unchanged} unchanged")
+
+
+class AssetIndex:
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        self.path = self.directory / INDEX_FILENAME
+        self.assets: dict[str, dict] = {}
+        if self.path.exists():
+            with open(self.path) as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                self.assets = data.get("assets", {})
+
+    def refresh(self) -> RefreshStats:
+        """Re-inspect only files whose (mtime_ns, size) changed; drop deleted ones."""
+        stats = RefreshStats()
+        seen = set()
+
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.is_file() or LADDER_NAME.match(entry.name):
+                    continue
+                match = CLIP_NAME.match(entry.name)
+                if not match:
+                    if entry.name.endswith(".mp3"):
+                        stats.skipped.append(entry.name)
+                    continue
+                seen.add(entry.name)
+
+                st = entry.stat()
+                known = self.assets.get(entry.name)
+                if known and known["mtime_ns"] == st.st_mtime_ns and known["size"] == st.st_size:
+                    stats.unchanged += 1
+                    continue
+
+                path = Path(entry.path)
+                try:
+                    info = mp3_info(path)
+                except MP3FormatError:
+                    stats.skipped.append(entry.name)
+                    seen.discard(entry.name)
+                    continue
+                self.assets[entry.name] = {
+                    "filename": entry.name,
+                    "mtime_ns": st.st_mtime_ns,
+                    "size": st.st_size,
+                    "sha256": file_sha256(path),
+                    "duration_sec": round(info["duration_sec"], 3),
+                    "samples": info["samples"],
+                    "sample_rate": info["sample_rate"],
+                    "index": int(match["index"]),
+                    "trigger_time": float(match["time"]),
+                }
+                (stats.changed if known else stats.added).append(entry.name)
+
+        for name in set(self.assets) - seen:
+            del self.assets[name]
+            stats.removed.append(name)
+
+        if stats.dirty or not self.path.exists():
+            self.save()
+        return stats
+
+    def save(self) -> None:
+        write_json_atomic(self.path, {"version": INDEX_VERSION, "assets": self.assets})
+
+    def ordered(self) -> list[dict]:
+        return sorted(self.assets.values(), key=lambda a: (a["index"], a["filename"]))
+
+    def _manifest_path(self) -> Path:
+        return self.directory / "manifest.json"
+
+    def load_manifest(self) -> dict:
+        path = self._manifest_path()
+        if not path.exists():
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def manifest(self, base: dict | None = None) -> dict:
+        """`base` (default: the current manifest.json) with audio fields from the index.
+
+        Event metadata in the base entries (text, speaker, subjectId, ...) is
+        kept; filename, duration, samples and bytes always come from the index.
+        """
+        manifest = dict(base if base is not None else self.load_manifest())
+        events = {f["index"]: f for f in manifest.get("files", []) if "index" in f}
+
+        files = []
+        for asset in self.ordered():
+            entry = dict(events.pop(asset["index"], {"index": asset["index"], "time": asset["trigger_time"]}))
+            entry.update({
+                "filename": asset["filename"],
+                "duration_sec": asset["duration_sec"],
+                "samples": asset["samples"],
+                "bytes": asset["size"],
+            })
+            files.append(entry)
+        # Events whose clip is missing stay listed, without audio fields.
+        files.extend(events[i] for i in sorted(events))
+        files.sort(key=lambda f: f["index"])
+
+        manifest["files"] = files
+        return manifest
+
+    def write_manifest(self, base: dict | None = None) -> Path:
+        path = self._manifest_path()
+        write_json_atomic(path, self.manifest(base))
+        return path
+
+    def timing(self, manifest: dict | None = None) -> dict:
+        """The browser-facing {"commentaryTiming": [...]} view."""
+        events = {f["index"]: f for f in (manifest or self.load_manifest()).get("files", []) if "index" in f}
+        timing = []
+        for asset in self.ordered():
+            event = events.get(asset["index"], {})
+            entry = {
+                "index": asset["index"],
+                "triggerTime": event.get("time", asset["trigger_time"]),
+                "duration": round(asset["duration_sec"], 2),
+                "samples": asset["samples"],
+                "bytes": asset["size"],
+                "filename": asset["filename"],
+            }
+            for key in ("text", "subjectId"):
+                if key in event:
+                    entry[key] = event[key]
+            timing.append(entry)
+        return {"commentaryTiming": timing}
+
+    def write_timing(self, path: str | Path, manifest: dict | None = None) -> Path:
+        path = Path(path)
+        write_json_atomic(path, self.timing(manifest))
+        return path
@@ -0,0 +1,124 @@
+"""
+PCM → audio file helpers shared by every Gemini-based generator.
+
+The TTS response is already raw 24 kHz mono 16-bit PCM, so the AudioSegment is
+built straight from the in-memory buffer (no temp .wav write + re-parse) and
+the encoder output goes to a temp file beside the target that is renamed into
+place, so a crash never leaves a truncated .mp3 or a stray .wav behind.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from pydub import AudioSegment
+
+from .clips import CHANNELS, SAMPLE_RATE, SAMPLE_WIDTH
+
+
+def pcm_samples(pcm_data: bytes) -> int:
+    return len(pcm_data) // (SAMPLE_WIDTH * CHANNELS)
+
+
+def pcm_duration(pcm_data: bytes, sample_rate: int = SAMPLE_RATE) -> float:
+    return pcm_samples(pcm_data) / sample_rate
+
+
+def pcm_to_segment(pcm_data: bytes, sample_rate: int = SAMPLE_RATE) -> AudioSegment:
+    # Drop a trailing odd byte rather than let pydub reject the buffer.
+    frame = SAMPLE_WIDTH * CHANNELS
+    usable = len(pcm_data) - len(pcm_data) % frame
+    return AudioSegment(
+        data=pcm_data[:usable],
+        sample_width=SAMPLE_WIDTH,
+        frame_rate=sample_rate,
+        channels=CHANNELS,
+    )
+
+
+def export_atomic(segment: AudioSegment, output_path: Path, format: str = "mp3", **export_args) -> None:
+    """Encode `segment` to `output_path`, replacing it only once encoding succeeded."""
+    output_path = Path(output_path)
+    fd, tmp = tempfile.mkstemp(dir=output_path.parent, prefix=f".{output_path.stem}.", suffix=f".{format}.tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            segment.export(f, format=format, **export_args)
+        os.replace(tmp, output_path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def write_mp3(pcm_data: bytes, output_path: Path, **export_args) -> float:
+    """Encode raw PCM to `output_path` as MP3. Returns the clip duration in seconds."""
+    export_atomic(pcm_to_segment(pcm_data), output_path, format="mp3", **export_args)
+    return pcm_duration(pcm_data)
+
+
+def encode_clip(pcm_data: bytes, output_path: str, format: str = "mp3", **export_args) -> tuple[int, int]:
+    """Process-pool entry point: encode PCM to `output_path`.
+
+    Returns (samples, encoded bytes); the duration is exact from the PCM
+    length, so nothing has to decode the file later to measure it.
+    """
+    export_atomic(pcm_to_segment(pcm_data), Path(output_path), format=format, **export_args)
+    return pcm_samples(pcm_data), os.path.getsize(output_path)
+
+
+@dataclass(frozen=True)
+class Variant:
+    """One rung of the delivery ladder, written beside the primary clip as <stem>.<tag>.<ext>."""
+
+    tag: str
+    format: str
+    codec: str
+    mime: str
+    bitrate: str
+    ext: str = ""
+    parameters: tuple[str, ...] = field(default=())
+
+    def filename(self, primary: str) -> str:
+        return f"{Path(primary).stem}.{self.tag}.{self.ext or self.format}"
+
+    def export_args(self) -> dict:
+        args = {"bitrate": self.bitrate}
+        if self.format == "webm":
+            args["codec"] = "libopus"
+        if self.parameters:
+            args["parameters"] = list(self.parameters)
+        return args
+
+
+# 24 kHz mono speech: Opus in WebM for browsers that play it, MP3 for the rest.
+LADDER = (
+    Variant("opus", "webm", "opus", 'audio/webm; codecs="opus"', "24k", parameters=("-application", "voip")),
+    Variant("32k", "mp3", "mp3", "audio/mpeg", "32k"),
+    Variant("64k", "mp3", "mp3", "audio/mpeg", "64k"),
+)
+
+
+def encode_variant(pcm_data: bytes, primary_path: str, variant: Variant) -> dict:
+    """Process-pool entry point: encode one ladder rung beside `primary_path`.
+
+    Returns the manifest entry for it (file, codec, MIME type, bitrate, bytes).
+    """
+    path = Path(primary_path).with_name(variant.filename(Path(primary_path).name))
+    export_atomic(pcm_to_segment(pcm_data), path, format=variant.format, **variant.export_args())
+    return {
+        "file": path.name,
+        "codec": variant.codec,
+        "mime": variant.mime,
+        "bitrate": variant.bitrate,
+        "bytes": os.path.getsize(path),
+    }
+
+
+def reencode_file(path: str, format: str = "mp3", **export_args) -> float:
+    """Decode an existing clip and encode it again in place (e.g. after a bitrate change)."""
+    segment = AudioSegment.from_file(path)
+    export_atomic(segment, Path(path), format=format, **export_args)
+    return len(segment) / 1000
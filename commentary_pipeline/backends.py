@@ -0,0 +1,309 @@
+"""
+TTS backends. A backend turns a ClipRequest into raw PCM bytes.
+
+Every backend exposes:
+
+    model        identifies the engine; part of the clip cache key
+    synthesize(request) -> bytes
+                 24 kHz mono 16-bit PCM for request.text, read by
+                 request.voice with request.prompt/pace as style hints
+
+and signals failures with TTSError subclasses so the pipeline can tell a
+quota refusal (RateLimitError, retry later) from an empty answer
+(NoAudioError) or a hard failure. Provider SDKs are imported lazily so the
+fake backend works without any of them installed.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import math
+import random
+import struct
+import threading
+import time
+import wave
+
+from .clips import SAMPLE_RATE, ClipRequest
+
+
+class TTSError(RuntimeError):
+    """A backend failed to synthesize a clip."""
+
+
+class NoAudioError(TTSError):
+    """The provider answered but the response carried no audio part."""
+
+
+class QualityError(TTSError):
+    """The provider returned audio that failed automatic QA (see qa.ClipQA)."""
+
+    def __init__(self, issues: list[str]):
+        super().__init__(f"Failed QA: {', '.join(issues)}")
+        self.issues = issues
+
+
+class RateLimitError(TTSError):
+    """The provider refused the request for quota reasons (HTTP 429)."""
+
+    def __init__(self, message: str = "Rate limited (429)", retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _retry_after(exc) -> float | None:
+    """Best-effort Retry-After seconds from an SDK exception's HTTP response."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        value = headers.get("Retry-After") or headers.get("retry-after")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class GeminiBackend:
+    """Gemini native-audio TTS (gemini-2.5-*-preview-tts)."""
+
+    def __init__(self, client, model: str):
+        self.client = client
+        self.model = model
+
+    def synthesize(self, request: ClipRequest) -> bytes:
+        from google.genai import types
+
+        try:
+            response = self.client.models.generate_content(
+                model=self.model,
+                contents=request.full_prompt,
+                config=types.GenerateContentConfig(
+                    response_modalities=["AUDIO"],
+                    speech_config=types.SpeechConfig(
+                        voice_config=types.VoiceConfig(
+                            prebuilt_voice_config=types.PrebuiltVoiceConfig(
+                                voice_name=request.voice
+                            )
+                        )
+                    )
+                )
+            )
+        except Exception as e:
+            if getattr(e, "code", None) == 429 or "RESOURCE_EXHAUSTED" in str(e):
+                raise RateLimitError(str(e), retry_after=_retry_after(e)) from e
+            raise
+
+        return self._audio(response)
+
+    def synthesize_dialogue(self, script: str, voices: dict[str, str]) -> bytes:
+        """One multi-speaker request; `script` has "Speaker: line" turns, `voices` maps speaker → voice."""
+        from google.genai import types
+
+        try:
+            response = self.client.models.generate_content(
+                model=self.model,
+                contents=script,
+                config=types.GenerateContentConfig(
+                    response_modalities=["AUDIO"],
+                    speech_config=types.SpeechConfig(
+                        multi_speaker_voice_config=types.MultiSpeakerVoiceConfig(
+                            speaker_voice_configs=[
+                                types.SpeakerVoiceConfig(
+                                    speaker=speaker,
+                                    voice_config=types.VoiceConfig(
+                                        prebuilt_voice_config=types.PrebuiltVoiceConfig(
+                                            voice_name=voice
+                                        )
+                                    )
+                                )
+                                for speaker, voice in voices.items()
+                            ]
+                        )
+                    )
+                )
+            )
+        except Exception as e:
+            if getattr(e, "code", None) == 429 or "RESOURCE_EXHAUSTED" in str(e):
+                raise RateLimitError(str(e), retry_after=_retry_after(e)) from e
+            raise
+        return self._audio(response)
+
+    @staticmethod
+    def _audio(response) -> bytes:
+        if not response.candidates or not response.candidates[0].content.parts:
+            raise NoAudioError("No audio")
+        return response.candidates[0].content.parts[0].inline_data.data
+
+
+class GoogleCloudBackend:
+    """Google Cloud Text-to-Speech; request.voice is a voice name like en-US-Chirp-HD-O."""
+
+    model = "google-cloud-tts"
+
+    def __init__(self, client=None, language_code: str = "en-US", speaking_rate: float = 1.0):
+        if client is None:
+            from google.cloud import texttospeech
+            client = texttospeech.TextToSpeechClient()
+        self.client = client
+        self.language_code = language_code
+        self.speaking_rate = speaking_rate
+
+    def synthesize(self, request: ClipRequest) -> bytes:
+        from google.api_core import exceptions
+        from google.cloud import texttospeech
+
+        try:
+            response = self.client.synthesize_speech(
+                input=texttospeech.SynthesisInput(text=request.text),
+                voice=texttospeech.VoiceSelectionParams(
+                    language_code=self.language_code,
+                    name=request.voice
+                ),
+                audio_config=texttospeech.AudioConfig(
+                    audio_encoding=texttospeech.AudioEncoding.LINEAR16,
+                    sample_rate_hertz=SAMPLE_RATE,
+                    speaking_rate=self.speaking_rate
+                )
+            )
+        except exceptions.TooManyRequests as e:
+            raise RateLimitError(str(e), retry_after=_retry_after(e)) from e
+
+        if not response.audio_content:
+            raise NoAudioError("No audio")
+        # LINEAR16 responses carry a WAV header; hand back the bare frames.
+        with wave.open(io.BytesIO(response.audio_content)) as wav_file:
+            return wav_file.readframes(wav_file.getnframes())
+
+
+class AzureBackend:
+    """Azure Speech; request.voice is a neural voice name like en-US-JennyNeural."""
+
+    model = "azure-speech"
+
+    def __init__(self, key: str, region: str):
+        import azure.cognitiveservices.speech as speechsdk
+
+        self.speech_config = speechsdk.SpeechConfig(subscription=key, region=region)
+        self.speech_config.set_speech_synthesis_output_format(
+            speechsdk.SpeechSynthesisOutputFormat.Raw24Khz16BitMonoPcm
+        )
+
+    def synthesize(self, request: ClipRequest) -> bytes:
+        import azure.cognitiveservices.speech as speechsdk
+
+        self.speech_config.speech_synthesis_voice_name = request.voice
+        synthesizer = speechsdk.SpeechSynthesizer(speech_config=self.speech_config, audio_config=None)
+        result = synthesizer.speak_text_async(request.text).get()
+
+        if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
+            if not result.audio_data:
+                raise NoAudioError("No audio")
+            return result.audio_data
+        if result.reason == speechsdk.ResultReason.Canceled:
+            details = result.cancellation_details
+            if "429" in (details.error_details or ""):
+                raise RateLimitError(details.error_details)
+            raise TTSError(f"Canceled: {details.reason} {details.error_details or ''}".strip())
+        raise TTSError(f"Unexpected result: {result.reason}")
+
+
+class FakeBackend:
+    """Offline stand-in for sizing batch jobs and benchmarking the pipeline.
+
+    Returns deterministic PCM (a tone whose pitch and length derive from the
+    text, ~15 characters per second of speech, then a short trailing
+    silence) after a simulated network latency, and injects the failure
+    modes real providers produce:
+
+        error_rate       fraction of calls raising TTSError
+        no_audio_rate    fraction of calls raising NoAudioError
+        bad_audio_rate   fraction of calls returning audio QA should reject
+                         (cut off after a third of the line, a burst of
+                         noise, or a clipped take)
+        burst_every      every Nth call starts a run of `burst_length`
+                         RateLimitErrors carrying `retry_after`
+
+    All randomness comes from `seed`, so two runs with the same settings and
+    call order see the same failures.
+    """
+
+    # Providers end a line with a short silence; a take that stops at full level was cut off.
+    _TAIL = b"\0\0" * (SAMPLE_RATE // 5)
+
+    def __init__(
+        self,
+        latency: float = 0.5,
+        jitter: float = 0.2,
+        error_rate: float = 0.0,
+        no_audio_rate: float = 0.0,
+        bad_audio_rate: float = 0.0,
+        burst_every: int = 0,
+        burst_length: int = 3,
+        retry_after: float | None = 1.0,
+        chars_per_sec: float = 15.0,
+        seed: int = 0,
+        model: str = "fake-tts",
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.no_audio_rate = no_audio_rate
+        self.bad_audio_rate = bad_audio_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.retry_after = retry_after
+        self.chars_per_sec = chars_per_sec
+        self.model = model
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def synthesize(self, request: ClipRequest) -> bytes:
+        with self._lock:
+            call = self.calls
+            self.calls += 1
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            roll = self._rng.random()
+        time.sleep(delay)
+
+        if self.burst_every and call % self.burst_every < self.burst_length and call >= self.burst_every:
+            raise RateLimitError(retry_after=self.retry_after)
+        if roll < self.error_rate:
+            raise TTSError("Simulated backend error")
+        if roll < self.error_rate + self.no_audio_rate:
+            raise NoAudioError("No audio")
+        if roll < self.error_rate + self.no_audio_rate + self.bad_audio_rate:
+            return self.render_bad(request, call)
+        return self.render(request)
+
+    def synthesize_dialogue(self, script: str, voices: dict[str, str]) -> bytes:
+        """Render each "Speaker: line" turn of `script` with a 400 ms pause between turns."""
+        turns = []
+        for line in script.splitlines():
+            speaker, sep, text = line.partition(": ")
+            if sep and speaker in voices and text:
+                turns.append(ClipRequest(index=len(turns), filename="", text=text, voice=voices[speaker]))
+        if not turns:
+            raise NoAudioError("No audio")
+        self.synthesize(turns[0])  # latency and failure injection for the whole request
+        gap = b"\0\0" * int(SAMPLE_RATE * 0.4)
+        return gap.join(self.render(turn) for turn in turns)
+
+    def render(self, request: ClipRequest) -> bytes:
+        digest = hashlib.sha256(f"{request.voice}\n{request.text}".encode("utf-8")).digest()
+        period = SAMPLE_RATE // (140 + digest[0])  # 140-395 Hz
+        cycle = struct.pack(f"<{period}h", *(int(8000 * math.sin(2 * math.pi * n / period)) for n in range(period)))
+        samples = int(SAMPLE_RATE * max(0.5, len(request.text) / self.chars_per_sec))
+        return (cycle * (samples // period + 1))[:samples * 2] + self._TAIL
+
+    def render_bad(self, request: ClipRequest, call: int) -> bytes:
+        good = self.render(request)[:-len(self._TAIL)]
+        kind = call % 3
+        if kind == 0:
+            return good[:len(good) // 3 & ~1]
+        if kind == 1:
+            rng = random.Random(call)
+            return struct.pack(f"<{SAMPLE_RATE * 3 // 10}h",
+                               *(rng.randint(-12000, 12000) for _ in range(SAMPLE_RATE * 3 // 10)))
+        samples = struct.unpack(f"<{len(good) // 2}h", good)
+        return struct.pack(f"<{len(samples)}h", *(max(-32768, min(32767, s * 6)) for s in samples)) + self._TAIL
@@ -0,0 +1,173 @@
+"""
+Commentary for every replay in custom_800m_heats.json in one run.
+
+plan_batch() derives each replay's events, builds its ClipRequests and works
+out how many provider calls it still needs: clips finished in an earlier run
+(per-replay journal) and lines already in the clip cache cost nothing.
+Replays are ordered so free work goes first, then the newest races (latest
+event date, then first seen most recently), and run_batch() drains
+them one after another under a single per-minute bucket and the persisted
+daily QuotaLedger. Whatever doesn't fit in today's quota stays queued for
+the next run.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Sequence
+
+from .audio import Variant
+from .cache import ClipCache
+from .clips import ClipRequest, ClipResult
+from .journal import JobJournal
+from .pipeline import DEFAULT_CONCURRENCY, generate_clips_async
+from .publish import TIMING, publish_artifact
+from .quota import QuotaLedger
+from .race_events import HEATS_PATH, active_heat, build_requests, extract_events, load_replays, normalize_runners
+from .triggers import schedule_timing
+
+DEFAULT_ROOT = Path("commentary_replays")
+
+
+@dataclass
+class ReplayPlan:
+    replay_id: str
+    title: str
+    date: str
+    output_dir: Path
+    events: list[dict]
+    requests: list[ClipRequest]
+    done: int = 0
+    cached: int = 0
+    calls: int = 0
+    first_seen: float = 0.0
+    results: list[ClipResult] = field(default_factory=list)
+
+    def describe(self) -> str:
+        return (f"{self.replay_id:36s} {len(self.requests):3d} clips  {self.done:3d} done  "
+                f"{self.cached:3d} cached  {self.calls:3d} calls")
+
+
+def plan_batch(
+    model: str,
+    ledger: QuotaLedger,
+    *,
+    heats: str | Path = HEATS_PATH,
+    root: str | Path = DEFAULT_ROOT,
+    cache: ClipCache | None = None,
+    voice: str = "Puck",
+    format: str = "mp3",
+    only: list[str] | None = None,
+) -> list[ReplayPlan]:
+    plans = []
+    for replay in load_replays(heats)["replays"]:
+        replay_id = replay.get("replay_id")
+        if not replay_id or (only and replay_id not in only):
+            continue
+        event = dict(replay.get("event") or {})
+        events = extract_events(event, normalize_runners(active_heat(replay)))
+        output_dir = Path(root) / replay_id
+        plan = ReplayPlan(
+            replay_id=replay_id,
+            title=replay.get("title") or replay_id,
+            date=event.get("date", ""),
+            output_dir=output_dir,
+            events=events,
+            requests=build_requests(events, voice=voice, format=format),
+            first_seen=ledger.seen(replay_id),
+        )
+        journal = JobJournal.for_dir(output_dir) if output_dir.exists() else None
+        for request in plan.requests:
+            if journal and journal.is_done(JobJournal.job_key(model, request), output_dir / request.filename):
+                plan.done += 1
+            elif cache is not None and cache.key(model, request) in cache:
+                plan.cached += 1
+            else:
+                plan.calls += 1
+        plans.append(plan)
+
+    plans.sort(key=lambda p: (p.calls > 0, _newest_first(p.date), -p.first_seen, p.replay_id))
+    return plans
+
+
+def _newest_first(date: str) -> str:
+    # Invert digits so an ascending sort puts the latest ISO date first.
+    return date.translate(str.maketrans("0123456789", "9876543210")) if date else "~"
+
+
+def write_manifest(output_dir: Path, replay: dict, model: str, events: list[dict], results: list[ClipResult]) -> Path:
+    """manifest.json for a replay's generated clips, one entry per event."""
+    manifest = {
+        "model": model,
+        "replay_id": replay.get("replay_id"),
+        "title": replay.get("title"),
+        "total_clips": len(events),
+        "generated": sum(r.ok for r in results),
+        "files": [{"index": r.request.index, "time": e["dueTime"], "text": e["text"], "kind": e["kind"],
+                   "excitement": e["excitement"], "subjectId": e["subjectId"], **r.audio_fields()}
+                  for e, r in zip(events, results)],
+    }
+    path = Path(output_dir) / "manifest.json"
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return path
+
+
+async def run_batch_async(
+    plans: list[ReplayPlan],
+    backend,
+    ledger: QuotaLedger,
+    *,
+    cache: ClipCache | None = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    format: str = "mp3",
+    postprocess: Callable[[bytes], bytes | tuple[bytes, dict]] | None = None,
+    qa: Callable[[ClipRequest, bytes], list[str]] | None = None,
+    ladder: Sequence[Variant] = (),
+    speeds: Sequence[float] = (),
+    stretch_cache=None,
+    log: Callable[[str], None] | None = print,
+) -> list[ReplayPlan]:
+    bucket = ledger.bucket()
+    for plan in plans:
+        if plan.done == len(plan.requests):
+            continue
+        if plan.calls and not ledger.remaining():
+            if log:
+                log(f"{plan.replay_id}: deferred, daily quota spent ({plan.calls} calls queued)")
+            continue
+        if log:
+            log(f"{plan.replay_id}: {plan.title}")
+        plan.results = await generate_clips_async(
+            plan.requests,
+            plan.output_dir,
+            backend,
+            rpm=ledger.rpm,
+            concurrency=concurrency,
+            cache=cache,
+            postprocess=postprocess,
+            qa=qa,
+            timing_path=plan.output_dir / "commentary_timing.json",
+            format=format,
+            ladder=ladder,
+            speeds=speeds,
+            stretch_cache=stretch_cache,
+            journal=JobJournal.for_dir(plan.output_dir),
+            bucket=bucket,
+            quota=ledger,
+            log=log,
+        )
+        write_manifest(plan.output_dir, {"replay_id": plan.replay_id, "title": plan.title},
+                       backend.model, plan.events, plan.results)
+        if any(r.ok for r in plan.results):
+            schedule_timing(plan.output_dir / "commentary_timing.json")
+            publish_artifact(plan.output_dir, TIMING, "commentary_timing.json")
+    return plans
+
+
+def run_batch(plans: list[ReplayPlan], backend, ledger: QuotaLedger, **kwargs) -> list[ReplayPlan]:
+    """Synthesize the planned replays in order; see run_batch_async for options."""
+    return asyncio.run(run_batch_async(plans, backend, ledger, **kwargs))
@@ -0,0 +1,117 @@
+"""
+Offline throughput benchmark for the generation pipeline.
+
+Runs an event list through generate_clips() against FakeBackend (no network,
+no quota) and reports throughput, per-clip TTS latency, encode time and bytes
+written, so batch jobs can be sized and throughput regressions caught in CI.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import tempfile
+import time
+from pathlib import Path
+
+from .clips import ClipRequest
+from .pipeline import generate_clips
+
+
+def load_events(path: str | Path) -> list[dict]:
+    """Events from a JSON list, a manifest ({"files": [...]}) or a timing view."""
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("files") or data.get("commentaryTiming") or []
+    return [e for e in data if e.get("text")]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def build_requests(events: list[dict], format: str, repeat: int = 1) -> list[ClipRequest]:
+    requests = []
+    for n in range(repeat):
+        for i, event in enumerate(events):
+            index = len(requests)
+            requests.append(ClipRequest(
+                index=index,
+                filename=f"bench_{index:04d}.{format}",
+                text=event["text"],
+                voice=event.get("voice", "Puck"),
+                prompt=event.get("prompt", ""),
+                # Keep repeats distinct so a cache can't short-circuit them.
+                pace=f"run {n}" if repeat > 1 else "",
+                time=event.get("time", event.get("triggerTime")),
+            ))
+    return requests
+
+
+def run_bench(
+    events: list[dict],
+    backend,
+    *,
+    rpm: float,
+    concurrency: int,
+    encoder_workers: int | None = None,
+    format: str = "mp3",
+    repeat: int = 1,
+    qa=None,
+    output_dir: str | Path | None = None,
+    log=None,
+) -> dict:
+    requests = build_requests(events, format, repeat)
+    with tempfile.TemporaryDirectory(prefix="tts_bench_") as tmp:
+        start = time.perf_counter()
+        results = generate_clips(
+            requests,
+            Path(output_dir or tmp),
+            backend,
+            rpm=rpm,
+            concurrency=concurrency,
+            encoder_workers=encoder_workers,
+            format=format,
+            qa=qa,
+            log=log,
+        )
+        wall = time.perf_counter() - start
+
+    ok = [r for r in results if r.ok]
+    fetch = [r.fetch_sec for r in ok if not r.cached]
+    encode = [r.encode_sec for r in ok]
+    return {
+        "clips": len(results),
+        "ok": len(ok),
+        "failed": len(results) - len(ok),
+        "wall_sec": wall,
+        "clips_per_sec": len(ok) / wall if wall else 0.0,
+        "tts_p50_sec": percentile(fetch, 50),
+        "tts_p95_sec": percentile(fetch, 95),
+        "encode_total_sec": sum(encode),
+        "encode_p50_sec": percentile(encode, 50),
+        "encode_p95_sec": percentile(encode, 95),
+        "audio_sec": sum(r.duration_sec for r in ok),
+        "bytes_written": sum(r.bytes for r in ok),
+        "errors": sorted({r.error for r in results if not r.ok}),
+    }
+
+
+def format_report(stats: dict) -> str:
+    lines = [
+        f"Clips:        {stats['ok']}/{stats['clips']} ok ({stats['failed']} failed)",
+        f"Wall time:    {stats['wall_sec']:.2f}s",
+        f"Throughput:   {stats['clips_per_sec']:.2f} clips/sec",
+        f"TTS latency:  p50 {stats['tts_p50_sec'] * 1000:.0f} ms, p95 {stats['tts_p95_sec'] * 1000:.0f} ms",
+        f"Encode:       {stats['encode_total_sec']:.2f}s total, "
+        f"p50 {stats['encode_p50_sec'] * 1000:.0f} ms, p95 {stats['encode_p95_sec'] * 1000:.0f} ms",
+        f"Audio:        {stats['audio_sec']:.1f}s, {stats['bytes_written'] / 1024:.1f} KiB written",
+    ]
+    for error in stats["errors"]:
+        lines.append(f"  ✗ {error}")
+    return "\n".join(lines)
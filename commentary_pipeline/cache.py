@@ -0,0 +1,166 @@
+"""
+Content-addressed on-disk cache of synthesized PCM.
+
+A clip is keyed by sha256(model, voice, prompt, pace, text), so editing two
+lines of COMMENTARY_EVENTS costs two TTS calls on the next run no matter how
+the output files are named. Entries live under <root>/<key[:2]>/<key>.pcm with
+a <key>.json metadata sidecar. Reads bump the entry's mtime and the oldest
+entries are evicted once the cache grows past `max_bytes` (LRU by size).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from .clips import ClipRequest
+
+DEFAULT_CACHE_DIR = Path(".tts_cache")
+# Time-stretched copies of clip PCM (stretch.StretchCache) use the same layout.
+DEFAULT_STRETCH_DIR = Path(".tts_stretch")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class ClipCache:
+    """Persistent PCM cache shared by every generator run."""
+
+    def __init__(self, root: str | Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size: int | None = None
+
+    @staticmethod
+    def key(model: str, request: ClipRequest) -> str:
+        material = json.dumps(
+            [model, request.voice, request.prompt, request.pace, request.text],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        shard = self.root / key[:2]
+        return shard / f"{key}.pcm", shard / f"{key}.json"
+
+    def __contains__(self, key: str) -> bool:
+        """Whether `key` is cached, without counting as a use."""
+        return self._paths(key)[0].exists()
+
+    def get(self, key: str) -> bytes | None:
+        pcm_path, _ = self._paths(key)
+        try:
+            data = pcm_path.read_bytes()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(pcm_path)
+        except FileNotFoundError:
+            pass
+        return data
+
+    def metadata(self, key: str) -> dict | None:
+        _, meta_path = self._paths(key)
+        try:
+            return json.loads(meta_path.read_text())
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, pcm: bytes, meta: dict | None = None) -> None:
+        pcm_path, meta_path = self._paths(key)
+        pcm_path.parent.mkdir(parents=True, exist_ok=True)
+        existed = pcm_path.exists()
+        meta = {**(meta or {}), "bytes": len(pcm), "created": time.time()}
+        _write_atomic(meta_path, json.dumps(meta, indent=2).encode("utf-8"))
+        _write_atomic(pcm_path, pcm)
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            elif not existed:
+                self._size += len(pcm)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def discard(self, key: str) -> int:
+        """Remove the entries whose key starts with `key` (a full key or a journal's short one); returns how many."""
+        removed = 0
+        for pcm_path in self.root.glob(f"{key[:2]}/{key}*.pcm"):
+            for victim in (pcm_path, pcm_path.with_suffix(".json")):
+                try:
+                    size = victim.stat().st_size
+                    victim.unlink()
+                except FileNotFoundError:
+                    continue
+                if victim is pcm_path:
+                    removed += 1
+                    with self._lock:
+                        if self._size is not None:
+                            self._size -= size
+        return removed
+
+    def synthesize(self, backend, request: ClipRequest) -> tuple[bytes, bool]:
+        """Return (pcm, hit): the cached audio for `request`, or a fresh backend call."""
+        key = self.key(backend.model, request)
+        pcm = self.get(key)
+        if pcm is not None:
+            return pcm, True
+        pcm = backend.synthesize(request)
+        self.put(key, pcm, {
+            "model": backend.model,
+            "voice": request.voice,
+            "prompt": request.prompt,
+            "pace": request.pace,
+            "text": request.text,
+        })
+        return pcm, False
+
+    def _entries(self) -> list[Path]:
+        return list(self.root.glob("??/*.pcm"))
+
+    def _scan_size(self) -> int:
+        total = 0
+        for path in self._entries():
+            try:
+                total += path.stat().st_size
+            except FileNotFoundError:
+                pass
+        return total
+
+    def _evict(self) -> None:
+        entries = []
+        for path in self._entries():
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            for victim in (path, path.with_suffix(".json")):
+                try:
+                    victim.unlink()
+                except FileNotFoundError:
+                    pass
+            total -= size
+        self._size = total
@@ -0,0 +1,99 @@
+"""
+Clip request/result records passed between the pipeline stages.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+
+# Gemini TTS returns raw 16-bit little-endian mono PCM at 24 kHz.
+SAMPLE_RATE = 24000
+SAMPLE_WIDTH = 2
+CHANNELS = 1
+
+
+@dataclass
+class ClipRequest:
+    """One commentary line to synthesize into `filename`.
+
+    `prompt` is the speaker/style prompt and `pace` the excitement-derived
+    delivery instruction; they are kept apart (rather than pre-joined) so the
+    same text read with a different pace is a different clip. `parts` splits
+    the text into reusable phrase units for fragment assembly.
+    """
+
+    index: int
+    filename: str
+    text: str
+    voice: str = "Puck"
+    speaker: str = ""
+    prompt: str = ""
+    pace: str = ""
+    time: float | None = None
+    label: str = ""
+    manifest: dict = field(default_factory=dict)
+    parts: list[str] = field(default_factory=list)
+
+    @property
+    def full_prompt(self) -> str:
+        style = " ".join(part for part in (self.prompt, self.pace) if part)
+        return f"{style}\n\n{self.text}" if style else self.text
+
+
+@dataclass
+class ClipResult:
+    request: ClipRequest
+    ok: bool
+    path: Path | None = None
+    duration_sec: float = 0.0
+    samples: int = 0
+    bytes: int = 0
+    error: str | None = None
+    cached: bool = False
+    resumed: bool = False
+    fetch_sec: float = 0.0
+    encode_sec: float = 0.0
+    post: dict = field(default_factory=dict)
+    variants: list[dict] = field(default_factory=list)
+    speeds: list[dict] = field(default_factory=list)
+
+    def audio_fields(self) -> dict:
+        """Exact length/size of the written clip, for manifest entries."""
+        if not self.ok:
+            return {}
+        return {
+            "filename": self.request.filename,
+            "duration_sec": round(self.duration_sec, 3),
+            "samples": self.samples,
+            "bytes": self.bytes,
+            **self.post,
+            **({"variants": self.variants} if self.variants else {}),
+            **({"speeds": self.speeds} if self.speeds else {}),
+        }
+
+    def timing_entry(self) -> dict:
+        """Entry for the browser-facing commentaryTiming list."""
+        request = self.request
+        return {
+            "index": request.index,
+            "triggerTime": request.time,
+            "duration": round(self.duration_sec, 3),
+            "samples": self.samples,
+            "bytes": self.bytes,
+            "text": request.text,
+            "filename": request.filename,
+            **self.post,
+            **({"variants": self.variants} if self.variants else {}),
+            **({"speeds": self.speeds} if self.speeds else {}),
+            **request.manifest,
+        }
+
+    def describe(self) -> str:
+        request = self.request
+        label = request.label or request.voice
+        head = f"[{request.index:02d}] {label}: {request.text[:45]}..."
+        if self.ok:
+            note = ", done earlier" if self.resumed else ", cached" if self.cached else ""
+            return f"{head} ✓ ({self.duration_sec:.1f}s{note})"
+        return f"{head} ✗ {self.error}"
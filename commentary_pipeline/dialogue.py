@@ -0,0 +1,225 @@
+"""
+Multi-speaker dialogue mode: one TTS request per exchange instead of per line.
+
+DialogueBackend wraps a backend that can read a whole "Jim: ... / Sarah: ..."
+script in one multi-speaker request (GeminiBackend.synthesize_dialogue) and
+serves the resulting audio back one event at a time, so the rest of the
+pipeline (cache, journal, retries, encoding) is unchanged. The first request
+of an exchange to claim() it pays for the call; the others wait for it and
+are cut from its audio. A cut that fails QA is discard()ed, so its retry
+asks for the exchange again.
+
+Cutting is done by split_dialogue(): frame RMS energy locates the pauses, and
+a dynamic program picks one pause per hand-off so the cuts land closest to
+where the text lengths say each line should end, preferring longer pauses.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Sequence
+
+import numpy as np
+
+from .backends import TTSError
+from .clips import SAMPLE_RATE, ClipRequest
+
+DEFAULT_PREAMBLE = (
+    "Read this live track race commentary as a broadcast between two commentators. "
+    "Keep each line's energy, and leave a short pause at every change of speaker."
+)
+
+FRAME_MS = 20
+SILENCE_DB = -35.0
+MIN_GAP_MS = 200
+PAD_MS = 80
+POSITION_SIGMA_SEC = 2.5
+
+
+def _frame_db(samples: np.ndarray, frame: int) -> np.ndarray:
+    n = len(samples) // frame
+    frames = samples[:n * frame].astype(np.float32).reshape(n, frame)
+    rms = np.sqrt(np.mean(frames * frames, axis=1)) + 1e-9
+    return 20 * np.log10(rms / rms.max())
+
+
+def _silence_runs(silent: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def _choose_cuts(centers: np.ndarray, lengths: np.ndarray, expected: np.ndarray, frame_sec: float) -> np.ndarray:
+    """Pick len(expected) increasing pause centers minimizing position error minus pause length."""
+    k, m = len(expected), len(centers)
+    err = (centers[None, :] - expected[:, None]) * frame_sec / POSITION_SIGMA_SEC
+    cost = err * err - np.log(lengths)[None, :]
+
+    idx = np.arange(m)
+    dp = cost[0]
+    back = np.zeros((k, m), dtype=np.int64)
+    for j in range(1, k):
+        best = np.minimum.accumulate(dp)
+        arg = np.maximum.accumulate(np.where(dp == best, idx, 0))
+        # cut j must come strictly after cut j-1
+        dp = cost[j] + np.concatenate(([np.inf], best[:-1]))
+        back[j] = np.concatenate(([0], arg[:-1]))
+
+    cuts = np.empty(k, dtype=np.int64)
+    cuts[-1] = int(np.argmin(dp))
+    for j in range(k - 1, 0, -1):
+        cuts[j - 1] = back[j, cuts[j]]
+    return centers[cuts]
+
+
+def split_dialogue(pcm: bytes, weights: Sequence[float], sample_rate: int = SAMPLE_RATE) -> list[bytes]:
+    """Split one dialogue's PCM into len(weights) clips, in order.
+
+    `weights` are the expected relative lengths of the lines (e.g. their
+    character counts). Each clip is trimmed to its speech plus a little
+    padding.
+    """
+    samples = np.frombuffer(pcm[:len(pcm) - len(pcm) % 2], dtype="<i2")
+    if len(weights) == 1:
+        return [samples.tobytes()]
+
+    frame = sample_rate * FRAME_MS // 1000
+    frame_sec = FRAME_MS / 1000
+    db = _frame_db(samples, frame)
+    silent = db < SILENCE_DB
+    n = len(db)
+
+    weights = np.asarray(weights, dtype=np.float64)
+    expected = np.cumsum(weights)[:-1] / weights.sum() * n
+
+    starts, ends = _silence_runs(silent)
+    interior = (starts > 0) & (ends < n) & ((ends - starts) * FRAME_MS >= MIN_GAP_MS)
+    starts, ends = starts[interior], ends[interior]
+
+    if len(starts) >= len(expected):
+        cuts = _choose_cuts((starts + ends) / 2, (ends - starts).astype(np.float64), expected, frame_sec)
+    else:
+        # Not enough clear pauses: cut at the quietest frame near each expected boundary.
+        window = max(1, int(POSITION_SIGMA_SEC / frame_sec))
+        cuts = []
+        for e in expected.astype(np.int64):
+            lo, hi = max(0, e - window), min(n, e + window + 1)
+            cuts.append(lo + int(np.argmin(db[lo:hi])))
+        cuts = np.maximum.accumulate(np.asarray(cuts, dtype=np.float64))
+
+    bounds = np.concatenate(([0], np.round(cuts).astype(np.int64), [n]))
+    pad = PAD_MS // FRAME_MS
+    clips = []
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        voiced = np.flatnonzero(~silent[a:b])
+        if len(voiced):
+            first, last = a + voiced[0], a + voiced[-1]
+            a, b = max(a, first - pad), min(b, last + 1 + pad)
+        end = len(samples) if b == n else b * frame
+        clips.append(samples[a * frame:end].tobytes())
+    return clips
+
+
+class DialogueBackend:
+    """Serve per-event PCM cut from one multi-speaker request per exchange.
+
+    `requests` must all carry a `speaker`; each exchange (`exchange_size`
+    consecutive lines, default the whole list) may use at most two speakers.
+    synthesize() only calls the provider for a request that holds the
+    exchange's claim(); the pipeline claims before it spends quota.
+    """
+
+    def __init__(self, backend, requests: Sequence[ClipRequest], *,
+                 exchange_size: int | None = None, preamble: str = DEFAULT_PREAMBLE):
+        self.backend = backend
+        self.model = f"{backend.model}+dialogue"
+        self.preamble = preamble
+
+        requests = list(requests)
+        size = exchange_size or len(requests)
+        self.exchanges = [requests[i:i + size] for i in range(0, len(requests), size)]
+        self._exchange_of = {}
+        for n, exchange in enumerate(self.exchanges):
+            speakers = {r.speaker for r in exchange}
+            if "" in speakers:
+                raise ValueError("dialogue mode needs a speaker on every request")
+            if len(speakers) > 2:
+                raise ValueError(f"exchange {n} has {len(speakers)} speakers; multi-speaker TTS allows 2")
+            for r in exchange:
+                self._exchange_of[r.filename] = n
+
+        self.calls = 0
+        self._segments: dict[str, bytes] = {}
+        self._locks = [threading.Lock() for _ in self.exchanges]
+        # Exchange -> (filename of the request paying for its call, set when that call is over).
+        self._claims: dict[int, tuple[str, threading.Event]] = {}
+        self._state = threading.Lock()
+
+    def script(self, exchange: Sequence[ClipRequest]) -> str:
+        voices = {}
+        for r in exchange:
+            voices.setdefault(r.speaker, r.prompt)
+        cast = "\n".join(f"- {speaker}'s delivery — {prompt}" for speaker, prompt in voices.items() if prompt)
+        lines = "\n".join(f"{r.speaker}: {r.text}" for r in exchange)
+        header = f"{self.preamble}\n\n{cast}" if cast else self.preamble
+        return f"{header}\n\n{lines}"
+
+    def claim(self, request: ClipRequest) -> bool:
+        """True if `request` needs a provider call, which the caller now pays for and must release().
+
+        False when its audio is already cut or another request has claimed the
+        exchange's call; synthesize() then waits for that call.
+        """
+        n = self._exchange_of[request.filename]
+        with self._state:
+            if request.filename in self._segments or n in self._claims:
+                return False
+            self._claims[n] = (request.filename, threading.Event())
+            return True
+
+    def release(self, request: ClipRequest) -> None:
+        """End `request`'s claim, whether or not its call went through."""
+        n = self._exchange_of[request.filename]
+        with self._state:
+            owner, done = self._claims.get(n, (None, None))
+            if owner != request.filename:
+                return
+            del self._claims[n]
+        done.set()
+
+    def discard(self, request: ClipRequest) -> None:
+        """Forget `request`'s cut (e.g. it failed QA) so the next synthesize() calls the provider again."""
+        with self._state:
+            self._segments.pop(request.filename, None)
+
+    def synthesize(self, request: ClipRequest) -> bytes:
+        n = self._exchange_of[request.filename]
+        with self._state:
+            pcm = self._segments.get(request.filename)
+            owner, done = self._claims.get(n, (None, None))
+        if pcm is not None:
+            return pcm
+        if owner != request.filename:
+            # Only the claim owner paid for a call. Anyone else gets the cut from
+            # it, or fails and claims (and pays for) its own call on the retry.
+            if done is not None:
+                done.wait()
+            with self._state:
+                pcm = self._segments.get(request.filename)
+            if pcm is None:
+                raise TTSError(f"Dialogue exchange {n} has no audio for {request.filename} and no call claimed")
+            return pcm
+        with self._locks[n]:
+            if request.filename not in self._segments:
+                self._synthesize_exchange(self.exchanges[n])
+            return self._segments[request.filename]
+
+    def _synthesize_exchange(self, exchange: Sequence[ClipRequest]) -> None:
+        voices = {}
+        for r in exchange:
+            voices.setdefault(r.speaker, r.voice)
+        self.calls += 1
+        pcm = self.backend.synthesize_dialogue(self.script(exchange), voices)
+        clips = split_dialogue(pcm, [max(1, len(r.text)) for r in exchange])
+        with self._state:
+            for r, clip in zip(exchange, clips):
+                self._segments[r.filename] = clip
@@ -0,0 +1,165 @@
+"""
+Phrase-fragment library: synthesize reusable units once, assemble lines locally.
+
+Data-driven commentary lines are built from a small vocabulary of parts
+(athlete names, split times, distances, stock phrases; see
+race_events.join_parts). FragmentLibrary synthesizes each distinct part once
+per voice, trims it to its speech and stores the trimmed PCM, then builds a
+whole line by sample-accurate concatenation with short crossfades, with
+pauses at punctuation parts. Once a race's vocabulary is stored, its clips
+cost no TTS calls at all.
+
+The library is itself a backend (model "<inner>+fragments"), so assembled
+lines go through generate_clips() for encoding, journal and timing like any
+other clip. Call prefetch() first so missing fragments are fetched under the
+rate limit rather than several per clip.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from typing import Callable, Iterable, Sequence
+
+import numpy as np
+
+from .cache import ClipCache
+from .clips import SAMPLE_RATE, ClipRequest
+from .postprocess import trim_silence
+from .scheduler import run_scheduled
+
+DEFAULT_FRAGMENT_DIR = Path(".tts_fragments")
+DEFAULT_PROMPT = "Read this as a short phrase from live track race commentary, with even, neutral energy."
+
+PAUSE_MS = {",": 140, ";": 200, ":": 200, ".": 320, "!": 320, "?": 320}
+CROSSFADE_MS = 10
+
+
+def crossfade_concat(chunks: Sequence[np.ndarray], overlaps: Sequence[int]) -> np.ndarray:
+    """Join int16 chunks, overlapping chunk i with the end of chunk i-1 by overlaps[i] samples."""
+    total = sum(len(c) for c in chunks) - sum(overlaps[1:])
+    out = np.zeros(total, dtype=np.float32)
+    pos = 0
+    for i, chunk in enumerate(chunks):
+        chunk = chunk.astype(np.float32)
+        n = min(overlaps[i], len(chunk), pos) if i else 0
+        if n:
+            ramp = np.linspace(0.0, 1.0, n, endpoint=False, dtype=np.float32)
+            out[pos - n:pos] *= 1.0 - ramp
+            chunk[:n] *= ramp
+            pos -= n
+        out[pos:pos + len(chunk)] += chunk
+        pos += len(chunk)
+    return np.clip(np.round(out[:pos]), -32768, 32767).astype("<i2")
+
+
+class FragmentLibrary:
+    def __init__(
+        self,
+        backend,
+        *,
+        prompt: str = DEFAULT_PROMPT,
+        cache: ClipCache | None = None,
+        store: ClipCache | None = None,
+        crossfade_ms: int = CROSSFADE_MS,
+    ):
+        self.backend = backend
+        self.model = f"{backend.model}+fragments"
+        self.prompt = prompt
+        self.cache = cache
+        self.store = store or ClipCache(DEFAULT_FRAGMENT_DIR)
+        self.crossfade = SAMPLE_RATE * crossfade_ms // 1000
+        self._loaded: dict[str, np.ndarray] = {}
+
+    def _request(self, text: str, voice: str) -> ClipRequest:
+        return ClipRequest(index=0, filename="", text=text, voice=voice, prompt=self.prompt)
+
+    def _key(self, text: str, voice: str) -> str:
+        return self.store.key(self.model, self._request(text, voice))
+
+    @staticmethod
+    def _words(request: ClipRequest) -> list[str]:
+        return [p for p in (request.parts or [request.text]) if p not in PAUSE_MS]
+
+    def missing(self, requests: Iterable[ClipRequest]) -> list[ClipRequest]:
+        """Distinct fragments of `requests` not yet in the store, as fragment requests."""
+        seen, missing = set(), []
+        for request in requests:
+            for text in self._words(request):
+                key = self._key(text, request.voice)
+                if key not in seen and key not in self._loaded and key not in self.store:
+                    missing.append(self._request(text, request.voice))
+                seen.add(key)
+        return missing
+
+    def fetch(self, fragment: ClipRequest) -> np.ndarray:
+        """Synthesize, trim and store one fragment."""
+        if self.cache is not None:
+            pcm, _ = self.cache.synthesize(self.backend, fragment)
+        else:
+            pcm = self.backend.synthesize(fragment)
+        samples = trim_silence(np.frombuffer(pcm[:len(pcm) - len(pcm) % 2], dtype="<i2"))
+        key = self.store.key(self.model, fragment)
+        self.store.put(key, samples.tobytes(), {"model": self.model, "voice": fragment.voice, "text": fragment.text})
+        self._loaded[key] = samples
+        return samples
+
+    def prefetch(
+        self,
+        requests: Iterable[ClipRequest],
+        *,
+        rpm: float,
+        concurrency: int = 4,
+        log: Callable[[str], None] | None = print,
+    ) -> tuple[int, list[str]]:
+        """Fetch every missing fragment under the RPM limit; returns (fetched, failed texts)."""
+        missing = self.missing(requests)
+
+        def worker(fragment: ClipRequest) -> tuple[ClipRequest, Exception | None]:
+            try:
+                self.fetch(fragment)
+                return fragment, None
+            except Exception as e:
+                return fragment, e
+
+        def report(item) -> None:
+            fragment, error = item
+            if log:
+                log(f"  {fragment.voice}: {fragment.text!r} {'✗ ' + str(error) if error else '✓'}")
+
+        results = asyncio.run(run_scheduled(missing, worker, rpm=rpm, concurrency=concurrency, on_done=report))
+        failed = [fragment.text for fragment, error in results if error]
+        return len(missing) - len(failed), failed
+
+    def load(self, text: str, voice: str) -> np.ndarray:
+        key = self._key(text, voice)
+        if key not in self._loaded:
+            pcm = self.store.get(key)
+            if pcm is None:
+                return self.fetch(self._request(text, voice))
+            self._loaded[key] = np.frombuffer(pcm, dtype="<i2")
+        return self._loaded[key]
+
+    def assemble(self, parts: Sequence[str], voice: str) -> bytes:
+        chunks, overlaps = [], []
+        previous_pause = True
+        for part in parts:
+            if part in PAUSE_MS:
+                chunks.append(np.zeros(SAMPLE_RATE * PAUSE_MS[part] // 1000, dtype="<i2"))
+                overlaps.append(0)
+                previous_pause = True
+            else:
+                chunks.append(self.load(part, voice))
+                overlaps.append(0 if previous_pause else self.crossfade)
+                previous_pause = False
+        # A trailing pause is dead air; the player spaces clips itself.
+        while chunks and overlaps and parts[len(chunks) - 1] in PAUSE_MS:
+            chunks.pop()
+            overlaps.pop()
+        return crossfade_concat(chunks, overlaps).tobytes() if chunks else b""
+
+    def is_ready(self, request: ClipRequest) -> bool:
+        return not self.missing([request])
+
+    def synthesize(self, request: ClipRequest) -> bytes:
+        return self.assemble(request.parts or [request.text], request.voice)
@@ -0,0 +1,97 @@
+"""
+Append-only JSONL journal of per-clip job state.
+
+Every state change of a clip (queued, retry, done, failed) is appended as one
+JSON line and fsynced, so an interrupted run can be replayed exactly: on the
+next run clips whose latest state is "done" (and whose file still exists) are
+skipped, everything else is synthesized again. A clip's job key covers its
+filename and the content it was synthesized from, so editing a line's text
+or voice makes it pending again.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from .cache import ClipCache
+from .clips import ClipRequest
+
+JOURNAL_FILENAME = ".journal.jsonl"
+
+QUEUED = "queued"
+RETRY = "retry"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobJournal:
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.state: dict[str, dict] = {}
+        self.lines = 0
+        self._lock = threading.Lock()
+        if self.path.exists():
+            self._replay()
+
+    @classmethod
+    def for_dir(cls, output_dir: str | Path) -> "JobJournal":
+        return cls(Path(output_dir) / JOURNAL_FILENAME)
+
+    @staticmethod
+    def job_key(model: str, request: ClipRequest) -> str:
+        return f"{request.filename}:{ClipCache.key(model, request)[:16]}"
+
+    def _replay(self) -> None:
+        with open(self.path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn last line from a crash mid-write; everything
+                    # before it is intact.
+                    continue
+                self.lines += 1
+                self.state[record["key"]] = {**self.state.get(record["key"], {}), **record}
+
+    def record(self, key: str, state: str, **fields) -> None:
+        record = {"ts": round(time.time(), 3), "key": key, "state": state, **fields}
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.lines += 1
+            self.state[key] = {**self.state.get(key, {}), **record}
+
+    def get(self, key: str) -> dict | None:
+        return self.state.get(key)
+
+    def is_done(self, key: str, path: Path) -> bool:
+        entry = self.state.get(key)
+        return bool(entry) and entry["state"] == DONE and path.exists()
+
+    def compact(self) -> None:
+        """Rewrite the journal as one line per job (its latest merged state)."""
+        with self._lock:
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w") as f:
+                for entry in self.state.values():
+                    f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self.lines = len(self.state)
+
+    def summary(self) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        for entry in self.state.values():
+            counts[entry["state"]] = counts.get(entry["state"], 0) + 1
+        return counts
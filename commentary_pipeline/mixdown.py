@@ -0,0 +1,272 @@
+"""
+Offline soundtrack: a replay's commentary and sound effects in one track.
+
+Live playback fires every clip and effect on its own (AudioManager.play per
+clip, SfxManager building oscillators and Math.random() noise per hit).
+render_soundtrack() instead mixes the whole replay ahead of time, once per
+playback speed:
+
+    clips    each clip of a commentaryTiming file at its scheduled race time
+             (triggerTime; dropped clips stay out), at normal pitch; a clip
+             with a time-stretched copy for the track's speed uses that copy
+    sfx      start horn at the gun, lap bell when the leader reaches the bell
+             lap, finish whistle and crowd at the first finish, synthesized
+             with NumPy to match sfx-manager.js (seeded noise, so a re-render
+             is identical)
+    ducking  where two clips overlap (more likely at 4x), the lower-priority
+             one drops by DUCK_SPEECH_DB; effects drop by DUCK_SFX_DB under
+             any speech; gain changes ramp over DUCK_RAMP_MS
+    limit    the sum goes through postprocess.limit() before encoding
+
+At speed s, race time t plays at (t - raceTimeStart) / s seconds into that
+speed's track, so the player only has to keep one stream at the position
+for state.raceTime. Tracks are encoded in parallel and described in
+soundtrack.json.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+from .assets import CLIP_NAME
+from .audio import encode_clip
+from .clips import SAMPLE_RATE
+from .pipeline import default_encoder_workers
+from .postprocess import biquad_response, limit
+from .race_events import time_at_distance
+from .sprite import decode_pcm
+from .timing import write_json_atomic
+
+SOUNDTRACK_TABLE = "soundtrack.json"
+# The player's speed slider: 1x to 4x in steps of 0.5.
+SPEEDS = (1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0)
+DEFAULT_PRIORITY = 5
+
+DUCK_SPEECH_DB = -12.0
+DUCK_SFX_DB = -9.0
+DUCK_RAMP_MS = 60
+TAIL_SEC = 2.0
+
+_FULL_SCALE = 32768.0
+
+
+# =============================================================================
+# Effects (same recipes as js/sfx-manager.js)
+# =============================================================================
+
+def _t(seconds: float, sample_rate: int) -> np.ndarray:
+    return np.arange(int(seconds * sample_rate)) / sample_rate
+
+
+def _exp_ramp(start: float, end: float, ramp: float, t: np.ndarray) -> np.ndarray:
+    """exponentialRampToValueAtTime from `start` to `end` over `ramp` seconds, then held."""
+    return start * (end / start) ** np.minimum(t / ramp, 1.0)
+
+
+def _osc(kind: str, freq: np.ndarray, sample_rate: int) -> np.ndarray:
+    phase = np.cumsum(freq) / sample_rate
+    if kind == "sine":
+        return np.sin(2 * np.pi * phase)
+    frac = phase % 1.0
+    if kind == "square":
+        return np.where(frac < 0.5, 1.0, -1.0)
+    return 2 * frac - 1  # sawtooth
+
+
+def start_horn(sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    t = _t(0.4, sample_rate)
+    tones = (_osc("sawtooth", _exp_ramp(880, 440, 0.3, t), sample_rate)
+             + _osc("square", _exp_ramp(660, 330, 0.3, t), sample_rate))
+    return tones * _exp_ramp(0.15, 0.01, 0.4, t)
+
+
+def lap_bell(sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    t = _t(1.0, sample_rate)
+    tones = np.sin(2 * np.pi * 2000 * t) + np.sin(2 * np.pi * 4000 * t)
+    return tones * _exp_ramp(0.2, 0.01, 1.0, t)
+
+
+def finish_whistle(sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    t = _t(0.6, sample_rate)
+    freq = np.interp(t, [0.0, 0.2, 0.5], [1000, 2500, 1500])
+    return _osc("sine", freq, sample_rate) * _exp_ramp(0.25, 0.01, 0.6, t)
+
+
+def crowd_cheer(sample_rate: int = SAMPLE_RATE, seed: int = 0) -> np.ndarray:
+    t = _t(1.5, sample_rate)
+    noise = np.random.default_rng(seed).uniform(-1, 1, len(t)) * (1 - t / 1.5) ** 2
+    # Web Audio's bandpass biquad at 800 Hz, Q 0.5, applied in the frequency domain.
+    w0 = 2 * np.pi * 800 / sample_rate
+    alpha = np.sin(w0) / (2 * 0.5)
+    response = biquad_response([alpha, 0.0, -alpha], [1 + alpha, -2 * np.cos(w0), 1 - alpha],
+                               2 * np.pi * np.fft.rfftfreq(len(t)))
+    filtered = np.fft.irfft(np.fft.rfft(noise) * response, n=len(t))
+    return filtered * _exp_ramp(0.15, 0.01, 1.5, t)
+
+
+SFX = {
+    "start": (start_horn,),
+    "bell": (lap_bell,),
+    "finish": (finish_whistle, crowd_cheer),
+}
+
+
+def sfx_cues(event: dict, runners: Sequence[dict]) -> list[dict]:
+    """Race times of the effects app.js triggers live: gun, bell lap, first finish."""
+    race_distance = event.get("race_distance_m", 800)
+    lap = event.get("track_length_m", 200)
+    cues = [{"kind": "start", "raceTime": 0.0}]
+    timed = [r for r in runners if r.get("splits")]
+    if race_distance > lap and timed:
+        bell = min(time_at_distance(r, race_distance - lap, race_distance) for r in timed)
+        if math.isfinite(bell):
+            cues.append({"kind": "bell", "raceTime": round(bell, 3)})
+    finishes = [r["splits"][-1] for r in timed if not r.get("dnf")]
+    if finishes:
+        cues.append({"kind": "finish", "raceTime": round(min(finishes), 3)})
+    return cues
+
+
+# =============================================================================
+# Mixing
+# =============================================================================
+
+def _smooth(mask: np.ndarray, n: int) -> np.ndarray:
+    """Centered moving average of a 0/1 mask, so gain changes ramp over ~n samples."""
+    if n <= 1 or not mask.any():
+        return mask.astype(np.float64)
+    padded = np.pad(mask.astype(np.float64), (n // 2, n - n // 2), mode="edge")
+    csum = np.concatenate([[0.0], np.cumsum(padded)])
+    return (csum[n:] - csum[:-n])[:len(mask)] / n
+
+
+def _duck_gain(mask: np.ndarray, duck_db: float, ramp: int) -> np.ndarray:
+    return 1.0 - (1.0 - 10 ** (duck_db / 20)) * _smooth(mask, ramp)
+
+
+def _trigger(entry: dict) -> float | None:
+    for key in ("triggerTime", "time"):
+        if entry.get(key) is not None:
+            return float(entry[key])
+    match = CLIP_NAME.match(entry.get("filename", ""))
+    return float(match["time"]) if match else None
+
+
+def _clip_file(entry: dict, speed: float) -> str:
+    stretched = (v["file"] for v in entry.get("speeds", []) if abs(v["speed"] - speed) < 1e-6)
+    return next(stretched, entry["filename"])
+
+
+def mix(
+    clips: Sequence[tuple[float, float, np.ndarray]],
+    sfx: Sequence[tuple[float, np.ndarray]],
+    *,
+    speed: float,
+    start: float,
+    end: float,
+    sample_rate: int = SAMPLE_RATE,
+) -> np.ndarray:
+    """One speed's track as int16: clips are (race time, priority, float samples), sfx (race time, samples)."""
+    length = int(math.ceil((end - start) / speed * sample_rate))
+    ramp = sample_rate * DUCK_RAMP_MS // 1000
+
+    def at(race_time: float) -> int:
+        return int(round((race_time - start) / speed * sample_rate))
+
+    spans = [(at(t), at(t) + len(samples), priority) for t, priority, samples in clips]
+    speech = np.zeros(length)
+    talking = np.zeros(length, dtype=bool)
+    for i, ((lo, hi, priority), (_, _, samples)) in enumerate(zip(spans, clips)):
+        hi = min(hi, length)
+        if hi <= lo:
+            continue
+        # Duck under any overlapping clip that outranks this one (ties: the later one wins).
+        under = np.zeros(hi - lo, dtype=bool)
+        for j, (lo2, hi2, priority2) in enumerate(spans):
+            if j != i and (priority2, j) > (priority, i) and lo2 < hi and hi2 > lo:
+                under[max(lo2, lo) - lo:min(hi2, hi) - lo] = True
+        gain = _duck_gain(under, DUCK_SPEECH_DB, ramp) if under.any() else 1.0
+        speech[lo:hi] += samples[:hi - lo] * gain
+        talking[lo:hi] = True
+
+    effects = np.zeros(length)
+    for race_time, samples in sfx:
+        lo = at(race_time)
+        hi = min(lo + len(samples), length)
+        if 0 <= lo < hi:
+            effects[lo:hi] += samples[:hi - lo] * _FULL_SCALE
+    out = speech + effects * _duck_gain(talking, DUCK_SFX_DB, ramp)
+    out = limit(out[None, :], sample_rate=sample_rate)[0]
+    return np.clip(np.round(out), -32768, 32767).astype("<i2")
+
+
+def render_soundtrack(
+    timing_path: str | Path,
+    event: dict,
+    runners: Sequence[dict],
+    *,
+    output_dir: str | Path | None = None,
+    speeds: Sequence[float] = SPEEDS,
+    format: str = "mp3",
+    workers: int | None = None,
+    sample_rate: int = SAMPLE_RATE,
+) -> dict:
+    """Mix the clips listed in `timing_path` (files beside it) with the race's effects; returns the table."""
+    timing_path = Path(timing_path)
+    clip_dir = timing_path.parent
+    output_dir = Path(output_dir) if output_dir is not None else clip_dir
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with open(timing_path) as f:
+        entries = [e for e in json.load(f).get("commentaryTiming", [])
+                   if not e.get("dropped") and e.get("filename") and _trigger(e) is not None]
+
+    cues = sfx_cues(event, runners)
+    finishes = [r["splits"][-1] for r in runners if r.get("splits") and not r.get("dnf")]
+
+    # Each speed uses a clip's time-stretched copy for that speed when it has one.
+    files = {(i, speed): _clip_file(entry, speed) for i, entry in enumerate(entries) for speed in [1.0, *speeds]}
+    with ProcessPoolExecutor(max_workers=workers or default_encoder_workers()) as pool:
+        unique = sorted(set(files.values()))
+        decoded = dict(zip(unique, pool.map(decode_pcm, [str(clip_dir / name) for name in unique])))
+
+        def clips_at(speed: float) -> list[tuple[float, float, np.ndarray]]:
+            return [(_trigger(e), e.get("priority", DEFAULT_PRIORITY),
+                     np.frombuffer(decoded[files[i, speed]], dtype="<i2").astype(np.float64))
+                    for i, e in enumerate(entries)]
+
+        clips = clips_at(1.0)
+        sfx = [(cue["raceTime"], make(sample_rate)) for cue in cues for make in SFX[cue["kind"]]]
+
+        start = min([0.0] + [t for t, _, _ in clips])
+        end = max([max(finishes, default=0.0)] + [t + len(s) / sample_rate for t, _, s in clips]) + TAIL_SEC
+
+        jobs = []
+        for speed in speeds:
+            speed_clips = clips_at(speed)
+            # A clip's length is wall time at any speed; extend the race-time span to fit it.
+            speed_end = max([end] + [t + len(s) / sample_rate * speed + TAIL_SEC for t, _, s in speed_clips])
+            pcm = mix(speed_clips, sfx, speed=speed, start=start, end=speed_end, sample_rate=sample_rate).tobytes()
+            path = output_dir / f"soundtrack_{speed:g}x.{format}"
+            jobs.append((speed, path, pool.submit(encode_clip, pcm, str(path), format)))
+
+        tracks = []
+        for speed, path, job in jobs:
+            samples, size = job.result()
+            tracks.append({"speed": speed, "file": path.name, "duration": round(samples / sample_rate, 3),
+                           "bytes": size})
+
+    table = {
+        "raceTimeStart": start,
+        "sampleRate": sample_rate,
+        "clips": len(clips),
+        "sfx": cues,
+        "tracks": tracks,
+    }
+    write_json_atomic(output_dir / SOUNDTRACK_TABLE, table)
+    return table
@@ -0,0 +1,391 @@
+"""
+Drive a batch of ClipRequests through synthesis and encoding.
+
+The run is split into stages connected by bounded asyncio queues:
+
+    fetch PCM  →  post-process  →  encode (process pool)  →  collect results
+
+Fetching is limited by the RPM token bucket, encoding fans out to one worker
+process per core, so ffmpeg time for clip N overlaps the TTS request for clip
+N+1 instead of adding to it. Queue bounds keep at most a few clips' PCM in
+memory when encoding falls behind.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Sequence
+
+from .audio import Variant, encode_clip, encode_variant
+from .backends import QualityError, RateLimitError, TTSError
+from .cache import ClipCache
+from .clips import SAMPLE_RATE, ClipRequest, ClipResult
+from .journal import DONE, FAILED, QUEUED, RETRY, JobJournal
+from .scheduler import TokenBucket, backoff_delay
+from .timing import TimingFile
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_POSTPROCESS_BATCH = 8
+
+_DONE = object()
+
+
+def default_encoder_workers() -> int:
+    return max(1, os.cpu_count() or 1)
+
+
+def _encode_timed(pcm: bytes, path: str, format: str) -> tuple[int, int, float]:
+    start = time.perf_counter()
+    samples, size = encode_clip(pcm, path, format=format)
+    return samples, size, time.perf_counter() - start
+
+
+def _encode_stretched(pcm: bytes, path: str, speed: float, format: str,
+                      stretched: bytes | None) -> tuple[dict, bytes | None]:
+    from .stretch import encode_stretched  # NumPy is only needed when stretching
+
+    return encode_stretched(pcm, path, speed, format, stretched)
+
+
+async def generate_clips_async(
+    requests: Sequence[ClipRequest],
+    output_dir: Path,
+    backend,
+    *,
+    rpm: float,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    cache: ClipCache | None = None,
+    postprocess: Callable[[bytes], bytes | tuple[bytes, dict]] | None = None,
+    postprocess_batch: int = DEFAULT_POSTPROCESS_BATCH,
+    qa: Callable[[ClipRequest, bytes], list[str]] | None = None,
+    encoder_workers: int | None = None,
+    timing_path: Path | None = None,
+    format: str = "mp3",
+    ladder: Sequence[Variant] = (),
+    speeds: Sequence[float] = (),
+    stretch_cache=None,
+    journal: JobJournal | None = None,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    bucket: TokenBucket | None = None,
+    quota=None,
+    log: Callable[[str], None] | None = print,
+) -> list[ClipResult]:
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    requests = list(requests)
+    keys = [JobJournal.job_key(backend.model, r) for r in requests]
+    workers = encoder_workers or default_encoder_workers()
+    timing = TimingFile(timing_path) if timing_path is not None else None
+    speeds = [s for s in speeds if s != 1]
+
+    bucket = bucket or TokenBucket(rpm)
+    in_flight = asyncio.Semaphore(max(1, concurrency))
+    fetched: asyncio.Queue = asyncio.Queue(maxsize=max(2, concurrency * 2))
+    to_encode: asyncio.Queue = asyncio.Queue(maxsize=max(2, workers * 2))
+    finished: asyncio.Queue = asyncio.Queue()
+
+    def synthesize(request: ClipRequest) -> tuple[bytes, bool]:
+        if cache is not None:
+            pcm, cached = cache.synthesize(backend, request)
+        else:
+            pcm, cached = backend.synthesize(request), False
+        issues = qa(request, pcm) if qa is not None else []
+        if issues:
+            # Keep the bad take out of the cache (and the backend's own store) so
+            # the retry asks the provider again.
+            if cache is not None:
+                cache.discard(cache.key(backend.model, request))
+            if discard is not None:
+                discard(request)
+            raise QualityError(issues)
+        return pcm, cached
+
+    is_ready = getattr(backend, "is_ready", None)
+    claim, release = getattr(backend, "claim", None), getattr(backend, "release", None)
+    discard = getattr(backend, "discard", None)
+    batch_postprocess = getattr(postprocess, "batch", None)
+
+    def describe_error(e: Exception) -> str:
+        return str(e) if isinstance(e, TTSError) else f"Error: {e}"
+
+    async def fetch(i: int) -> None:
+        request = requests[i]
+        # Cache hits cost no quota, so only misses go through the rate limiter.
+        pcm = cache.get(cache.key(backend.model, request)) if cache is not None else None
+        if pcm is not None and qa is not None and (issues := await asyncio.to_thread(qa, request, pcm)):
+            cache.discard(cache.key(backend.model, request))
+            if log:
+                log(f"[{request.index:02d}] cached clip failed QA ({', '.join(issues)}), synthesizing again")
+            pcm = None
+        cached = pcm is not None
+        fetch_sec = 0.0
+        attempt = 0
+        while pcm is None:
+            attempt += 1
+            async with in_flight:
+                # A dialogue backend may already hold this clip's audio, or have
+                # another clip paying for the call that brings it; then there is
+                # no provider call to rate-limit. claim() checks and reserves in
+                # one step, so only one clip per exchange takes a token.
+                paying = claim(request) if claim else not (is_ready and is_ready(request))
+                try:
+                    if paying:
+                        if quota is not None and not quota.try_charge():
+                            await finished.put((i, ClipResult(request, False, error="Daily quota exhausted")))
+                            return
+                        await bucket.acquire()
+                    start = time.perf_counter()
+                    try:
+                        pcm, cached = await asyncio.to_thread(synthesize, request)
+                        fetch_sec = time.perf_counter() - start
+                        break
+                    except Exception as e:
+                        error = e
+                finally:
+                    if paying and claim and release:
+                        release(request)
+
+            if attempt >= max_attempts:
+                await finished.put((i, ClipResult(request, False, error=describe_error(error))))
+                return
+            retry_after = getattr(error, "retry_after", None)
+            delay = backoff_delay(attempt, retry_after)
+            if isinstance(error, RateLimitError):
+                # Everyone backs off, not just this clip: the quota is shared.
+                bucket.defer(delay)
+            if journal is not None:
+                journal.record(keys[i], RETRY, index=request.index, attempt=attempt,
+                               error=describe_error(error), delay=round(delay, 2))
+            if log:
+                log(f"[{request.index:02d}] retry {attempt + 1}/{max_attempts} in {delay:.1f}s ({describe_error(error)})")
+            await asyncio.sleep(delay)
+        await fetched.put((i, pcm, cached, fetch_sec))
+
+    async def fetch_or_fail(i: int) -> None:
+        # Every request must reach collect() exactly once, even if fetch() itself breaks.
+        try:
+            await fetch(i)
+        except Exception as e:
+            await finished.put((i, ClipResult(requests[i], False, error=describe_error(e))))
+
+    async def fetch_all() -> None:
+        pending = []
+        for i, request in enumerate(requests):
+            entry = journal.get(keys[i]) if journal is not None else None
+            if entry and journal.is_done(keys[i], output_dir / request.filename):
+                # Finished by an earlier run: nothing to fetch or encode.
+                await finished.put((i, ClipResult(
+                    request, True, path=output_dir / request.filename,
+                    duration_sec=entry.get("duration_sec", 0.0),
+                    samples=entry.get("samples", 0), bytes=entry.get("bytes", 0),
+                    post=entry.get("post", {}), variants=entry.get("variants", []),
+                    speeds=entry.get("speeds", []), resumed=True,
+                )))
+                continue
+            if journal is not None:
+                journal.record(keys[i], QUEUED, index=request.index, filename=request.filename)
+            pending.append(i)
+        try:
+            await asyncio.gather(*(fetch_or_fail(i) for i in pending))
+        finally:
+            await fetched.put(_DONE)
+
+    def apply_postprocess(pcms: list[bytes]) -> list[tuple[bytes, dict] | Exception]:
+        try:
+            outputs = batch_postprocess(pcms) if batch_postprocess else [postprocess(pcm) for pcm in pcms]
+        except Exception:
+            if len(pcms) == 1:
+                raise
+            # Find the clip that broke the batch; the others still go through.
+            outputs = []
+            for pcm in pcms:
+                try:
+                    outputs.append(postprocess(pcm))
+                except Exception as e:
+                    outputs.append(e)
+        # A hook may return PCM alone or (PCM, info for the manifest).
+        return [out if isinstance(out, (tuple, Exception)) else (out, {}) for out in outputs]
+
+    async def process() -> None:
+        done = False
+        while not done:
+            items = [await fetched.get()]
+            # Take whatever else is already fetched so a batch hook sees it in one go.
+            while batch_postprocess and len(items) < postprocess_batch and not fetched.empty():
+                items.append(fetched.get_nowait())
+            done = items[-1] is _DONE
+            items = [item for item in items if item is not _DONE]
+            try:
+                if postprocess is not None and items:
+                    processed = await asyncio.to_thread(apply_postprocess, [pcm for _, pcm, *_ in items])
+                else:
+                    processed = [(pcm, {}) for _, pcm, *_ in items]
+            except Exception as e:
+                processed = [e] * len(items)
+            for (i, _, cached, fetch_sec), out in zip(items, processed):
+                if isinstance(out, Exception):
+                    await finished.put((i, ClipResult(requests[i], False, error=f"Post-process error: {out}",
+                                                      fetch_sec=fetch_sec)))
+                else:
+                    await to_encode.put((i, out[0], cached, fetch_sec, out[1]))
+        for _ in range(workers):
+            await to_encode.put(_DONE)
+
+    async def encode(pool: ProcessPoolExecutor) -> None:
+        loop = asyncio.get_running_loop()
+        while (item := await to_encode.get()) is not _DONE:
+            i, pcm, cached, fetch_sec, post = item
+            request = requests[i]
+            path = output_dir / request.filename
+            try:
+                # Stretched copies from earlier runs come from the shared cache; the pool
+                # only stretches the rest.
+                reused = (await asyncio.to_thread(lambda: [stretch_cache.get(pcm, s) for s in speeds])
+                          if stretch_cache is not None and speeds else [None] * len(speeds))
+                # The primary file and every ladder rung encode side by side in the pool.
+                (samples, size, encode_sec), *derived = await asyncio.gather(
+                    loop.run_in_executor(pool, _encode_timed, pcm, str(path), format),
+                    *(loop.run_in_executor(pool, encode_variant, pcm, str(path), v) for v in ladder),
+                    *(loop.run_in_executor(pool, _encode_stretched, pcm, str(path), s, format, copy)
+                      for s, copy in zip(speeds, reused)),
+                )
+                variants = derived[:len(ladder)]
+                stretched = [entry for entry, _ in derived[len(ladder):]]
+                if stretch_cache is not None:
+                    fresh = [(s, copy) for s, (_, copy) in zip(speeds, derived[len(ladder):]) if copy is not None]
+                    if fresh:
+                        await asyncio.to_thread(lambda: [stretch_cache.put(pcm, s, copy) for s, copy in fresh])
+            except Exception as e:
+                result = ClipResult(request, False, error=f"Encode error: {e}", fetch_sec=fetch_sec)
+            else:
+                result = ClipResult(
+                    request, True, path=path,
+                    duration_sec=samples / SAMPLE_RATE, samples=samples, bytes=size, cached=cached,
+                    fetch_sec=fetch_sec, encode_sec=encode_sec, post=post,
+                    variants=sorted(variants, key=lambda v: v["bytes"]), speeds=stretched,
+                )
+            await finished.put((i, result))
+
+    async def collect() -> list[ClipResult]:
+        results: list[ClipResult | None] = [None] * len(requests)
+        for _ in range(len(requests)):
+            i, result = await finished.get()
+            results[i] = result
+            if journal is not None and not result.resumed:
+                if result.ok:
+                    journal.record(keys[i], DONE, index=result.request.index, duration_sec=result.duration_sec,
+                                   samples=result.samples, bytes=result.bytes, post=result.post,
+                                   variants=result.variants, speeds=result.speeds)
+                else:
+                    journal.record(keys[i], FAILED, index=result.request.index, error=result.error)
+            if timing is not None and result.ok:
+                timing.update(result.timing_entry())
+            if log:
+                log(result.describe())
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        stages = [
+            asyncio.create_task(fetch_all()),
+            asyncio.create_task(process()),
+            *(asyncio.create_task(encode(pool)) for _ in range(workers)),
+        ]
+        collector = asyncio.create_task(collect())
+        try:
+            # A stage that still dies would leave collect() waiting forever; surface its error instead.
+            await asyncio.wait([collector, *stages], return_when=asyncio.FIRST_EXCEPTION)
+            if not collector.done():
+                failed = next(task for task in stages if task.done() and not task.cancelled() and task.exception())
+                raise failed.exception()
+            results = collector.result()
+        finally:
+            collector.cancel()
+            for task in stages:
+                task.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+    if journal is not None and journal.lines > 4 * max(1, len(journal.state)):
+        journal.compact()
+    return results
+
+
+def generate_clips(
+    requests: Sequence[ClipRequest],
+    output_dir: Path,
+    backend,
+    *,
+    rpm: float,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    cache: ClipCache | None = None,
+    postprocess: Callable[[bytes], bytes | tuple[bytes, dict]] | None = None,
+    postprocess_batch: int = DEFAULT_POSTPROCESS_BATCH,
+    qa: Callable[[ClipRequest, bytes], list[str]] | None = None,
+    encoder_workers: int | None = None,
+    timing_path: Path | None = None,
+    format: str = "mp3",
+    ladder: Sequence[Variant] = (),
+    speeds: Sequence[float] = (),
+    stretch_cache=None,
+    journal: JobJournal | None = None,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    bucket: TokenBucket | None = None,
+    quota=None,
+    log: Callable[[str], None] | None = print,
+) -> list[ClipResult]:
+    """Synthesize every request into `output_dir`; results are in request order.
+
+    With a `cache`, requests whose (model, voice, prompt, pace, text) were
+    synthesized before are re-encoded from the cached PCM without a TTS call.
+    `postprocess` maps PCM to PCM between fetching and encoding; it may
+    also return (PCM, info), and info is added to the clip's manifest and
+    timing entries. A hook with a batch() method (like PostProcessor) is
+    given up to `postprocess_batch` clips that are ready at once. `qa`
+    (e.g. qa.ClipQA) checks each synthesized clip before that and returns
+    its issues; a flagged clip is dropped from the cache and retried like a
+    failed call (QualityError), and a cached one is re-synthesized. With a
+    `timing_path`, each written clip's exact duration is merged into that
+    commentaryTiming file as soon as it is encoded. Each `ladder` Variant
+    (e.g. audio.LADDER) is also encoded from the same PCM, in parallel, and
+    listed smallest first under "variants" in the clip's entries. For each
+    of `speeds` a pitch-preserving time-stretched copy is encoded as well
+    (stretch.wsola) and listed under "speeds"; pass a `stretch_cache`
+    (stretch.StretchCache, opened once per run) to reuse copies stretched
+    before.
+
+    Failed TTS calls are retried up to `max_attempts` times with jittered
+    exponential backoff (never sooner than a 429's Retry-After). With a
+    `journal`, every clip's state is appended to it and clips already done
+    in an earlier run are skipped, so an interrupted run resumes where it
+    stopped.
+
+    Pass a shared `bucket` to keep one per-minute budget across several
+    calls, and a `quota` (QuotaLedger) to charge each provider call against
+    a persisted daily limit; once it is spent the remaining clips fail with
+    "Daily quota exhausted" and are picked up by the next run.
+    """
+    return asyncio.run(generate_clips_async(
+        requests,
+        output_dir,
+        backend,
+        rpm=rpm,
+        concurrency=concurrency,
+        cache=cache,
+        postprocess=postprocess,
+        postprocess_batch=postprocess_batch,
+        qa=qa,
+        encoder_workers=encoder_workers,
+        timing_path=timing_path,
+        format=format,
+        ladder=ladder,
+        speeds=speeds,
+        stretch_cache=stretch_cache,
+        journal=journal,
+        max_attempts=max_attempts,
+        bucket=bucket,
+        quota=quota,
+        log=log,
+    ))
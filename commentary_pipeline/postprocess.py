@@ -0,0 +1,254 @@
+"""
+Vectorized clean-up of synthesized speech before it is encoded.
+
+Gemini, Google Cloud and Azure clips arrive at different levels and with
+uneven leading/trailing silence, which plays as dead air and inflates the
+`duration` the trigger solver has to fit. PostProcessor works on int16 PCM
+as NumPy arrays, a batch of clips at a time (zero-padded into one matrix):
+
+    trim      drop frames more than TRIM_DB below the loudest 10 ms frame
+              (and anything under an absolute floor), keeping a short pad
+    loudness  measure gated integrated loudness (ITU-R BS.1770: K-weighting,
+              400 ms blocks, -70 LUFS absolute and -10 LU relative gates)
+              and apply one gain to reach TARGET_LUFS
+    limit     lookahead peak limiter: the gain each sample needs to stay
+              under CEILING_DB, held across the lookahead window and
+              smoothed, so peaks are caught before they arrive
+
+Every clip reports what was done to it (speech span in the source, measured
+loudness, gain), which the pipeline stores in the manifest and timing entry.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .clips import SAMPLE_RATE
+
+FRAME_MS = 10
+TRIM_DB = -40.0
+TRIM_FLOOR_DB = -60.0
+TRIM_PAD_MS = 25
+
+TARGET_LUFS = -18.0
+MAX_GAIN_DB = 12.0
+CEILING_DB = -1.0
+LOOKAHEAD_MS = 5
+
+BLOCK_MS = 400
+HOP_MS = 100
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+
+_FULL_SCALE = 32768.0
+
+
+def frame_rms_db(batch: np.ndarray, frame: int) -> np.ndarray:
+    """dBFS of each `frame`-sample frame, per row; a trailing partial frame is dropped."""
+    n = batch.shape[-1] // frame
+    frames = batch[..., :n * frame].reshape(*batch.shape[:-1], n, frame)
+    rms = np.sqrt(np.mean(frames * frames, axis=-1))
+    return 20 * np.log10(rms / _FULL_SCALE + 1e-12)
+
+
+def speech_spans(
+    batch: np.ndarray,
+    lengths: Sequence[int],
+    *,
+    threshold_db: float = TRIM_DB,
+    floor_db: float | None = TRIM_FLOOR_DB,
+    pad_ms: int = TRIM_PAD_MS,
+    sample_rate: int = SAMPLE_RATE,
+) -> list[tuple[int, int]]:
+    """(start, end) sample span of the speech in each row of a zero-padded batch."""
+    frame = sample_rate * FRAME_MS // 1000
+    pad = sample_rate * pad_ms // 1000
+    db = frame_rms_db(batch, frame)
+    if db.shape[-1] == 0:
+        # No row spans a whole frame: nothing to measure, keep every clip as it is.
+        return [(0, int(length)) for length in lengths]
+    gate = np.max(db, axis=-1, keepdims=True) + threshold_db
+    if floor_db is not None:
+        gate = np.maximum(gate, floor_db)
+    voiced = db >= gate
+    spans = []
+    for row, length in zip(voiced, lengths):
+        hits = np.flatnonzero(row)
+        if len(hits) == 0 or length < frame:
+            spans.append((0, int(length)))
+            continue
+        start = max(0, int(hits[0]) * frame - pad)
+        end = min(int(length), (int(hits[-1]) + 1) * frame + pad)
+        spans.append((start, end))
+    return spans
+
+
+def trim_silence(samples: np.ndarray, threshold_db: float = TRIM_DB, pad_ms: int = TRIM_PAD_MS,
+                 sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """`samples` without leading/trailing frames quieter than `threshold_db` below the peak frame."""
+    if len(samples) == 0:
+        return samples
+    batch = samples.astype(np.float32)[None, :]
+    (start, end), = speech_spans(batch, [len(samples)], threshold_db=threshold_db, floor_db=None,
+                                 pad_ms=pad_ms, sample_rate=sample_rate)
+    return samples[start:end]
+
+
+def biquad_response(b: Sequence[float], a: Sequence[float], w: np.ndarray) -> np.ndarray:
+    z1 = np.exp(-1j * w)
+    z2 = z1 * z1
+    return (b[0] + b[1] * z1 + b[2] * z2) / (a[0] + a[1] * z1 + a[2] * z2)
+
+
+def k_weighting_response(n_fft: int, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """|H| of the BS.1770 K-weighting filter (shelf + high-pass) on an rfft grid.
+
+    Coefficients are derived for `sample_rate` from the analog prototypes
+    (as libebur128 does) rather than using the 48 kHz table.
+    """
+    w = 2 * np.pi * np.fft.rfftfreq(n_fft)  # radians per sample
+
+    # Stage 1: +4 dB high shelf around 1.7 kHz (head diffraction).
+    gain_db, f0, q = 3.999843853973347, 1681.974450955533, 0.7071752369554196
+    k = np.tan(np.pi * f0 / sample_rate)
+    vh = 10 ** (gain_db / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = biquad_response(
+        [(vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0],
+        [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0], w)
+
+    # Stage 2: RLB high-pass at 38 Hz.
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = np.tan(np.pi * f0 / sample_rate)
+    a0 = 1 + k / q + k * k
+    highpass = biquad_response([1.0, -2.0, 1.0], [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0], w)
+    return np.abs(shelf * highpass)
+
+
+def integrated_loudness(batch: np.ndarray, lengths: Sequence[int], sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Gated integrated loudness in LUFS of each row of a zero-padded batch (-inf for silence)."""
+    lengths = np.asarray(lengths)
+    width = batch.shape[-1]
+    # Filter in the frequency domain; the padding keeps the filter tail from wrapping around.
+    n_fft = 1 << int(np.ceil(np.log2(width + sample_rate // 10)))
+    spectrum = np.fft.rfft(batch / _FULL_SCALE, n=n_fft, axis=-1) * k_weighting_response(n_fft, sample_rate)
+    weighted = np.fft.irfft(spectrum, n=n_fft, axis=-1)[..., :width]
+
+    energy = np.concatenate([np.zeros((len(batch), 1)), np.cumsum(weighted * weighted, axis=-1)], axis=-1)
+    block = sample_rate * BLOCK_MS // 1000
+    hop = sample_rate * HOP_MS // 1000
+    starts = np.arange(0, max(1, width - block + 1), hop)
+    # Clips shorter than one block are measured as a single block of their own length.
+    ends = np.minimum(starts[None, :] + block, np.maximum(lengths, 1)[:, None])
+    power = (np.take_along_axis(energy, ends, axis=-1) - energy[:, starts]) / np.maximum(ends - starts, 1)
+    power = np.maximum(power, 0.0)  # cumsum round-off on silent stretches
+    valid = (starts[None, :] + block <= lengths[:, None]) | ((starts == 0)[None, :] & (lengths < block)[:, None])
+
+    with np.errstate(divide="ignore"):
+        blocks = -0.691 + 10 * np.log10(power)
+    gated = valid & (blocks > ABSOLUTE_GATE_LUFS)
+    mean_power = np.where(gated, power, 0).sum(-1) / np.maximum(gated.sum(-1), 1)
+    with np.errstate(divide="ignore"):
+        relative = -0.691 + 10 * np.log10(mean_power) + RELATIVE_GATE_LU
+    gated &= blocks > relative[:, None]
+    mean_power = np.where(gated, power, 0).sum(-1) / np.maximum(gated.sum(-1), 1)
+    with np.errstate(divide="ignore"):
+        return np.where(gated.any(-1), -0.691 + 10 * np.log10(mean_power), -np.inf)
+
+
+def limit(batch: np.ndarray, *, ceiling_db: float = CEILING_DB, lookahead_ms: int = LOOKAHEAD_MS,
+          sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Lookahead peak limiter over the rows of `batch` (float samples at int16 scale).
+
+    The gain a sample needs is held (running min) over ±lookahead and then
+    averaged over a window half that wide, so the gain is already down when
+    a peak arrives and no sample ends above the ceiling.
+    """
+    ceiling = _FULL_SCALE * 10 ** (ceiling_db / 20)
+    peak = np.abs(batch)
+    if peak.max(initial=0.0) <= ceiling:
+        return batch
+    look = max(1, sample_rate * lookahead_ms // 1000)
+    half = max(1, look // 2)
+    needed = np.minimum(1.0, ceiling / np.maximum(peak, 1e-9))
+    held = sliding_window_view(np.pad(needed, ((0, 0), (look, look)), constant_values=1.0),
+                               2 * look + 1, axis=-1).min(axis=-1)
+    padded = np.pad(held, ((0, 0), (half, half)), mode="edge")
+    csum = np.concatenate([np.zeros((len(batch), 1)), np.cumsum(padded, axis=-1)], axis=-1)
+    smooth = (csum[:, 2 * half + 1:] - csum[:, :-2 * half - 1]) / (2 * half + 1)
+    return batch * smooth
+
+
+class PostProcessor:
+    """Trim, loudness-normalize and limit PCM clips.
+
+    Usable as the pipeline `postprocess` hook: calling it on one clip's PCM
+    returns (pcm, info); batch() does the same for several clips at once.
+    """
+
+    def __init__(
+        self,
+        *,
+        target_lufs: float | None = TARGET_LUFS,
+        max_gain_db: float = MAX_GAIN_DB,
+        ceiling_db: float = CEILING_DB,
+        trim_db: float | None = TRIM_DB,
+        pad_ms: int = TRIM_PAD_MS,
+        lookahead_ms: int = LOOKAHEAD_MS,
+        sample_rate: int = SAMPLE_RATE,
+    ):
+        self.target_lufs = target_lufs
+        self.max_gain_db = max_gain_db
+        self.ceiling_db = ceiling_db
+        self.trim_db = trim_db
+        self.pad_ms = pad_ms
+        self.lookahead_ms = lookahead_ms
+        self.sample_rate = sample_rate
+
+    def __call__(self, pcm: bytes) -> tuple[bytes, dict]:
+        return self.batch([pcm])[0]
+
+    def batch(self, pcms: Sequence[bytes]) -> list[tuple[bytes, dict]]:
+        if not pcms:
+            return []
+        clips = [np.frombuffer(pcm[:len(pcm) - len(pcm) % 2], dtype="<i2") for pcm in pcms]
+        lengths = [len(c) for c in clips]
+        batch = np.zeros((len(clips), max(1, max(lengths))), dtype=np.float64)
+        for row, clip in zip(batch, clips):
+            row[:len(clip)] = clip
+
+        if self.trim_db is not None:
+            spans = speech_spans(batch, lengths, threshold_db=self.trim_db, pad_ms=self.pad_ms,
+                                 sample_rate=self.sample_rate)
+        else:
+            spans = [(0, n) for n in lengths]
+        trimmed = np.zeros((len(clips), max(1, max(end - start for start, end in spans))))
+        for row, source, (start, end) in zip(trimmed, batch, spans):
+            row[:end - start] = source[start:end]
+        trimmed_lengths = [end - start for start, end in spans]
+
+        loudness = integrated_loudness(trimmed, trimmed_lengths, self.sample_rate)
+        if self.target_lufs is not None:
+            gain_db = np.where(np.isfinite(loudness),
+                               np.minimum(self.target_lufs - loudness, self.max_gain_db), 0.0)
+            trimmed *= (10 ** (gain_db / 20))[:, None]
+        else:
+            gain_db = np.zeros(len(clips))
+        trimmed = limit(trimmed, ceiling_db=self.ceiling_db, lookahead_ms=self.lookahead_ms,
+                        sample_rate=self.sample_rate)
+        out = np.clip(np.round(trimmed), -32768, 32767).astype("<i2")
+
+        results = []
+        for i, (start, end) in enumerate(spans):
+            info = {
+                "speech": [round(start / self.sample_rate, 3), round(end / self.sample_rate, 3)],
+                "source_duration": round(lengths[i] / self.sample_rate, 3),
+                "loudness_lufs": round(float(loudness[i]), 1) if np.isfinite(loudness[i]) else None,
+                "gain_db": round(float(gain_db[i]), 1),
+            }
+            results.append((out[i, :end - start].tobytes(), info))
+        return results
@@ -0,0 +1,60 @@
+"""
+The published replay index: which generated artifacts the player may load.
+
+Per-replay output (clips and their manifest.json, commentary_timing.json,
+sprite.json, soundtrack.json, timeline.json/.bin) is written under
+commentary_replays/<replay_id>/, which is committed and deployed with the
+rest of the site (the Pages workflow uploads the repository root). Most
+replays have none of it yet, so rather than probing for each file, and
+getting a 404 per replay load, the player reads commentary_replays/index.json:
+
+    {"version": 1, "replays": {"<replay_id>": {"timeline": "timeline.json", ...}}}
+
+and only requests what is listed. Every command that writes one of these
+artifacts registers it here; commit the index together with the files.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from .timing import write_json_atomic
+
+REPLAY_INDEX = "index.json"
+VERSION = 1
+
+# Artifact kinds the player understands.
+CLIPS = "clips"
+TIMING = "timing"
+SPRITE = "sprite"
+SOUNDTRACK = "soundtrack"
+TIMELINE = "timeline"
+
+
+def load_replay_index(root: str | Path) -> dict:
+    try:
+        with open(Path(root) / REPLAY_INDEX) as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        index = {}
+    index.setdefault("version", VERSION)
+    index.setdefault("replays", {})
+    return index
+
+
+def publish_artifact(replay_dir: str | Path, kind: str, filename: str) -> Path:
+    """List `filename` in `replay_dir` as the replay's `kind` artifact; returns the index path.
+
+    The index lives in the parent of `replay_dir` (the output root) and is
+    keyed by the directory name, which is the replay_id.
+    """
+    replay_dir = Path(replay_dir)
+    root = replay_dir.parent
+    index = load_replay_index(root)
+    entry = index["replays"].setdefault(replay_dir.name, {})
+    if entry.get(kind) != filename:
+        entry[kind] = filename
+        index["replays"] = dict(sorted(index["replays"].items()))
+        write_json_atomic(root / REPLAY_INDEX, index)
+    return root / REPLAY_INDEX
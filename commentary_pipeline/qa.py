@@ -0,0 +1,211 @@
+"""
+Automatic quality checks on synthesized speech.
+
+A provider that answers with no audio part fails loudly (NoAudioError), but
+one that answers with 0.3 s of noise, a line cut off mid-word or a clipped
+take would be encoded into the replay and only found by listening. ClipQA
+measures every clip's PCM as NumPy arrays, a batch at a time (zero-padded
+into one matrix, 10 ms RMS frames as in postprocess), and flags:
+
+    empty       no frame rises above SILENCE_DB
+    short       under MIN_DURATION_SEC in total
+    silence     voiced frames (within VOICED_DB of the loudest frame) make
+                up less than MIN_SPEECH_RATIO of the clip
+    clipped     more than MAX_CLIPPED_FRACTION of samples at full scale
+    truncated   speech span under MIN_RATE_RATIO of the text's expected
+                duration (triggers.estimate_duration)
+    overlong    speech span over MAX_RATE_RATIO of it (runaway generation)
+    cut off     the last TAIL_MS is still within CUTOFF_DB of the loudest
+                frame, i.e. the clip ends mid-word
+
+As the pipeline `qa` hook a flagged clip is dropped from the PCM cache and
+its fetch fails with QualityError, so it goes through the normal retry and
+journal path and is synthesized again. `python -m commentary_pipeline qa`
+runs the same checks over clips already on disk.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+from .cache import ClipCache
+from .clips import SAMPLE_RATE, ClipRequest
+from .journal import FAILED, JobJournal
+from .pipeline import default_encoder_workers
+from .postprocess import FRAME_MS, frame_rms_db
+from .sprite import decode_pcm, sprite_sources
+from .triggers import estimate_duration
+
+SILENCE_DB = -55.0
+VOICED_DB = -35.0
+MIN_DURATION_SEC = 0.4
+MIN_SPEECH_RATIO = 0.4
+CLIP_LEVEL = 32700
+MAX_CLIPPED_FRACTION = 0.001
+MIN_RATE_RATIO = 0.5
+MAX_RATE_RATIO = 2.5
+TAIL_MS = 50
+CUTOFF_DB = -15.0
+
+_CLIP_INDEX = re.compile(r"^commentary_(\d+)_")
+
+
+@dataclass
+class ClipReport:
+    duration_sec: float
+    speech_sec: float
+    expected_sec: float
+    speech_ratio: float
+    peak_db: float
+    clipped: int
+    tail_db: float
+    issues: list[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.issues
+
+    def describe(self) -> str:
+        return ", ".join(self.issues) or "ok"
+
+
+class ClipQA:
+    """Flag synthesized clips that should be regenerated.
+
+    Usable as the pipeline `qa` hook: calling it with a request and its PCM
+    returns the list of issues (empty when the clip passes); audit() checks
+    several clips at once and returns full ClipReports.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_duration_sec: float = MIN_DURATION_SEC,
+        min_speech_ratio: float = MIN_SPEECH_RATIO,
+        max_clipped_fraction: float = MAX_CLIPPED_FRACTION,
+        rate_range: tuple[float, float] = (MIN_RATE_RATIO, MAX_RATE_RATIO),
+        cutoff_db: float | None = CUTOFF_DB,
+        sample_rate: int = SAMPLE_RATE,
+    ):
+        self.min_duration_sec = min_duration_sec
+        self.min_speech_ratio = min_speech_ratio
+        self.max_clipped_fraction = max_clipped_fraction
+        self.rate_range = rate_range
+        self.cutoff_db = cutoff_db
+        self.sample_rate = sample_rate
+
+    def __call__(self, request: ClipRequest, pcm: bytes) -> list[str]:
+        return self.audit([pcm], [request.text])[0].issues
+
+    def audit(self, pcms: Sequence[bytes], texts: Sequence[str],
+              excitements: Sequence[str | None] | None = None) -> list[ClipReport]:
+        if not pcms:
+            return []
+        excitements = excitements or [None] * len(pcms)
+        clips = [np.frombuffer(pcm[:len(pcm) - len(pcm) % 2], dtype="<i2") for pcm in pcms]
+        lengths = np.array([len(c) for c in clips])
+        frame = self.sample_rate * FRAME_MS // 1000
+        # At least one frame plus a tail window of columns, so every index below is in range.
+        tail = max(1, TAIL_MS // FRAME_MS)
+        batch = np.zeros((len(clips), max(frame * tail, int(lengths.max()))), dtype=np.float64)
+        for row, clip in zip(batch, clips):
+            row[:len(clip)] = clip
+
+        db = frame_rms_db(batch, frame)
+        n_frames = lengths // frame
+        valid = np.arange(db.shape[-1])[None, :] < n_frames[:, None]
+        db = np.where(valid, db, -np.inf)
+        peak_db = db.max(axis=-1)
+        voiced = db >= np.maximum(peak_db + VOICED_DB, SILENCE_DB)[:, None]
+        counts = voiced.sum(axis=-1)
+        first = np.argmax(voiced, axis=-1)
+        last = db.shape[-1] - 1 - np.argmax(voiced[:, ::-1], axis=-1)
+        speech_sec = np.where(counts > 0, (last - first + 1) * frame / self.sample_rate, 0.0)
+        speech_ratio = counts / np.maximum(n_frames, 1)
+        clipped = (np.abs(batch) >= CLIP_LEVEL).sum(axis=-1)
+
+        # Mean power of the last TAIL_MS of each clip (padding columns are excluded).
+        tail_idx = np.maximum(n_frames[:, None] - tail + np.arange(tail)[None, :], 0)
+        tail_power = np.mean(10 ** (np.take_along_axis(db, tail_idx, axis=-1) / 10), axis=-1)
+        with np.errstate(divide="ignore"):
+            tail_db = 10 * np.log10(tail_power)
+
+        reports = []
+        for i, (text, excitement) in enumerate(zip(texts, excitements)):
+            report = ClipReport(
+                duration_sec=round(lengths[i] / self.sample_rate, 3),
+                speech_sec=round(float(speech_sec[i]), 3),
+                expected_sec=estimate_duration(text, excitement) if text else 0.0,
+                speech_ratio=round(float(speech_ratio[i]), 3),
+                peak_db=round(float(peak_db[i]), 1) if np.isfinite(peak_db[i]) else -np.inf,
+                clipped=int(clipped[i]),
+                tail_db=round(float(tail_db[i]), 1) if np.isfinite(tail_db[i]) else -np.inf,
+            )
+            report.issues = self._issues(report, voiced=bool(counts[i]), samples=int(lengths[i]))
+            reports.append(report)
+        return reports
+
+    def _issues(self, report: ClipReport, *, voiced: bool, samples: int) -> list[str]:
+        if not voiced or report.peak_db < SILENCE_DB:
+            return ["empty"]
+        issues = []
+        if report.duration_sec < self.min_duration_sec:
+            issues.append(f"short ({report.duration_sec:.2f}s)")
+        if report.speech_ratio < self.min_speech_ratio:
+            issues.append(f"mostly silence ({report.speech_ratio:.0%} speech)")
+        if report.clipped > self.max_clipped_fraction * samples:
+            issues.append(f"clipped ({report.clipped} samples at full scale)")
+        low, high = self.rate_range
+        if report.expected_sec:
+            if report.speech_sec < low * report.expected_sec:
+                issues.append(f"truncated ({report.speech_sec:.1f}s of speech, expected ~{report.expected_sec:.1f}s)")
+            elif report.speech_sec > high * report.expected_sec:
+                issues.append(f"overlong ({report.speech_sec:.1f}s of speech, expected ~{report.expected_sec:.1f}s)")
+        if self.cutoff_db is not None and report.tail_db >= report.peak_db + self.cutoff_db:
+            issues.append("cut off")
+        return issues
+
+
+def audit_dir(directory: str | Path, qa: ClipQA | None = None, workers: int | None = None) -> list[tuple[str, ClipReport]]:
+    """(filename, report) for every clip in `directory`; texts come from its manifest.json."""
+    directory = Path(directory)
+    sources = sprite_sources(directory)
+    try:
+        with open(directory / "manifest.json") as f:
+            entries = {e["index"]: e for e in json.load(f).get("files", []) if "index" in e}
+    except FileNotFoundError:
+        entries = {}
+    events = [entries.get(int(_CLIP_INDEX.match(path.name).group(1)), {}) for path in sources]
+    with ProcessPoolExecutor(max_workers=workers or default_encoder_workers()) as pool:
+        pcms = list(pool.map(decode_pcm, [str(p) for p in sources]))
+    reports = (qa or ClipQA()).audit(pcms, [e.get("text", "") for e in events],
+                                     [e.get("excitement") for e in events])
+    return [(path.name, report) for path, report in zip(sources, reports)]
+
+
+def requeue(directory: str | Path, flagged: Sequence[tuple[str, ClipReport]],
+            cache: ClipCache | None = None) -> list[str]:
+    """Mark flagged clips failed in the directory's journal and drop their cached PCM.
+
+    The next generation run for the directory synthesizes them again.
+    Returns the filenames that had a journal entry to requeue.
+    """
+    journal = JobJournal.for_dir(directory)
+    requeued = []
+    for filename, report in flagged:
+        keys = [key for key in journal.state if key.startswith(f"{filename}:")]
+        for key in keys:
+            journal.record(key, FAILED, index=journal.state[key].get("index"),
+                           error=f"Failed QA: {report.describe()}")
+            if cache is not None:
+                cache.discard(key.split(":", 1)[1])
+        if keys:
+            requeued.append(filename)
+    return requeued
@@ -0,0 +1,101 @@
+"""
+Provider quota that outlives a single run.
+
+TTS quotas are counted per minute and per day, but a TokenBucket only knows
+about the calls made by its own process. QuotaLedger persists both counts to
+a small JSON file: calls in the last minute (so a restarted batch doesn't
+burst past the per-minute limit) and calls made today (so tomorrow's run
+picks up where today's quota ran out instead of failing on 429s). It also
+remembers when each replay was first seen, which the batch planner uses to
+put newly ingested races first.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+from zoneinfo import ZoneInfo
+
+from .scheduler import TokenBucket
+from .timing import write_json_atomic
+
+DEFAULT_QUOTA_PATH = Path(".tts_quota.json")
+# Gemini's per-day limits reset at midnight Pacific time.
+DEFAULT_RESET_TZ = "America/Los_Angeles"
+
+
+class QuotaLedger:
+    def __init__(
+        self,
+        path: str | Path = DEFAULT_QUOTA_PATH,
+        *,
+        rpm: float,
+        rpd: int,
+        tz: str = DEFAULT_RESET_TZ,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = Path(path)
+        self.rpm = rpm
+        self.rpd = rpd
+        self.tz = ZoneInfo(tz)
+        self.clock = clock
+        self.day = ""
+        self.used = 0
+        self.recent: list[float] = []
+        self.first_seen: dict[str, float] = {}
+        if self.path.exists():
+            with open(self.path) as f:
+                data = json.load(f)
+            self.day = data.get("day", "")
+            self.used = data.get("used", 0)
+            self.recent = data.get("recent", [])
+            self.first_seen = data.get("first_seen", {})
+        self._roll()
+
+    def _today(self) -> str:
+        return datetime.fromtimestamp(self.clock(), self.tz).date().isoformat()
+
+    def _roll(self) -> None:
+        today = self._today()
+        if self.day != today:
+            self.day, self.used = today, 0
+
+    def remaining(self) -> int:
+        self._roll()
+        return max(0, self.rpd - self.used)
+
+    def try_charge(self) -> bool:
+        """Count one provider call against today's quota; False once it is spent."""
+        if self.remaining() <= 0:
+            return False
+        now = self.clock()
+        self.used += 1
+        self.recent = [t for t in self.recent if now - t < 60] + [now]
+        self.save()
+        return True
+
+    def bucket(self) -> TokenBucket:
+        """A per-minute bucket already debited for calls made in the last minute."""
+        bucket = TokenBucket(self.rpm)
+        now = self.clock()
+        bucket.tokens -= sum(1 for t in self.recent if now - t < 60)
+        return bucket
+
+    def seen(self, replay_id: str) -> float:
+        """When `replay_id` was first planned; recorded on first sight."""
+        if replay_id not in self.first_seen:
+            self.first_seen[replay_id] = self.clock()
+            self.save()
+        return self.first_seen[replay_id]
+
+    def save(self) -> None:
+        write_json_atomic(self.path, {
+            "day": self.day,
+            "used": self.used,
+            "rpd": self.rpd,
+            "recent": self.recent,
+            "first_seen": self.first_seen,
+        })
@@ -0,0 +1,667 @@
+"""
+Commentary events derived from replay data instead of hand-written tables.
+
+A Python port of analyzeRace / extractCommentaryEvents from
+js/race-analyzer.js, reading any replay in data/custom_800m_heats.json. The
+checkpoint order, lead changes, running styles, split classes and race
+shape follow the browser analyzer's rules (and its tuning tables), so the
+spoken commentary and the on-screen analysis agree about the race.
+
+Each event is {dueTime, distance, subjectId, kind, payload} like the JS
+stream, plus the fields the generators need: `priority`, `slack`,
+`excitement` and a line of `text`. build_requests() turns the list into ClipRequests for
+generate_clips(); subjectId is the runner id heat-data.js assigns.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import re
+from pathlib import Path
+from typing import Sequence
+
+from .clips import ClipRequest
+from .spoken import normalize_text, number_words, spoken_distance, spoken_gap, spoken_time
+
+HEATS_PATH = Path("data/custom_800m_heats.json")
+
+DEFAULT_RACE_DISTANCE = 800
+DEFAULT_TIMING_INTERVAL = 200
+
+# --- Tuning tables, kept in step with js/race-analyzer.js --------------------
+
+PAR_TIMES = {
+    "world_indoor_w": {"opener_200m": 27.5, "total_seconds": 117.0},
+    "world_indoor_m": {"opener_200m": 24.5, "total_seconds": 104.0},
+    "diamond_league_w": {"opener_200m": 27.5, "total_seconds": 117.5},
+    "diamond_league_m": {"opener_200m": 24.5, "total_seconds": 104.5},
+    "hs_varsity_w": {"opener_200m": 29.0, "total_seconds": 130.0},
+    "hs_varsity_m": {"opener_200m": 26.0, "total_seconds": 115.0},
+    "youth_u12_w": {"opener_200m": 35.0, "total_seconds": 170.0},
+    "youth_u12_m": {"opener_200m": 34.0, "total_seconds": 165.0},
+}
+
+RACE_SHAPE_BANDS = {"fast_threshold_pct": -1.5, "par_threshold_pct": 1.0, "avg_threshold_pct": 4.0}
+
+STYLE_THRESHOLDS = {"openerScore_E": 85, "openerScore_EP": 65, "openerScore_P": 30, "closerScore_S": 65}
+
+PACE_PRESSURE_DUEL_THRESHOLD = 3
+
+SPLIT_CLASS_BANDS = {
+    "negative_max_pct": -1.0,
+    "even_max_pct": 1.0,
+    "textbook_max_pct": 4.0,
+    "aggressive_max_pct": 8.0,
+}
+
+# --- Commentary cadence -------------------------------------------------------
+
+# Higher wins when two events compete for the same moment.
+PRIORITY = {
+    "finish": 10,
+    "lead_change": 8,
+    "late_move": 7,
+    "race_shape_intro": 6,
+    "negative_split": 5,
+    "closing_speed_winner": 5,
+    "opener_aggressive": 4,
+    "fastest_segment": 4,
+    "slowest_segment": 3,
+    "checkpoint": 2,
+}
+
+# Excitement vocabulary matches the generators' PACE_INSTRUCTIONS keys.
+EXCITEMENT = {
+    "race_shape_intro": "calm",
+    "opener_aggressive": "analytical",
+    "checkpoint": "observational",
+    "slowest_segment": "analytical",
+    "fastest_segment": "impressed",
+    "lead_change": "excited",
+    "late_move": "very_excited",
+    "closing_speed_winner": "appreciative",
+    "negative_split": "impressed",
+    "finish": "maximum",
+}
+
+# How far (seconds before, after) a call may move from its moment when the
+# trigger solver makes room. Splits can't be read before they happen; the
+# intro can run before the gun; post-race analysis can wait.
+SLACK = {
+    "race_shape_intro": (8.0, 0.0),
+    "opener_aggressive": (1.0, 4.0),
+    "checkpoint": (0.0, 3.0),
+    "lead_change": (0.0, 3.0),
+    "fastest_segment": (0.0, 6.0),
+    "slowest_segment": (0.0, 6.0),
+    "late_move": (1.0, 3.0),
+    "negative_split": (0.0, 10.0),
+    "closing_speed_winner": (0.0, 10.0),
+    "finish": (0.0, 1.5),
+}
+
+# Delivery instruction per excitement level, as in generate_elite_commentary.py.
+PACE_INSTRUCTIONS = {
+    "calm": "Speak at a normal, measured pace.",
+    "analytical": "Speak clearly with slight urgency.",
+    "appreciative": "Warm tone, moderate pace.",
+    "observational": "Engaged, slightly faster pace.",
+    "impressed": "Genuine appreciation, faster delivery.",
+    "excited": "Fast pace, genuine enthusiasm.",
+    "very_excited": "Very fast pace, maximum energy.",
+    "maximum": "Absolute maximum energy and speed. Speak as fast as naturally possible while remaining clear.",
+}
+
+
+# =============================================================================
+# Replay loading (mirrors js/heat-data.js)
+# =============================================================================
+
+def load_replays(path: str | Path = HEATS_PATH) -> dict:
+    with open(path) as f:
+        payload = json.load(f)
+    if "replays" not in payload:
+        # Single-replay payloads predate the replays list.
+        payload = {"default_replay_id": payload.get("replay_id"), "replays": [payload]}
+    return payload
+
+
+def get_replay(payload: dict, replay_id: str | None = None) -> dict:
+    replays = payload["replays"]
+    for wanted in (replay_id, payload.get("default_replay_id")):
+        for replay in replays:
+            if wanted and replay.get("replay_id") == wanted:
+                return replay
+    if replay_id:
+        raise KeyError(f"unknown replay_id {replay_id!r}")
+    return replays[0]
+
+
+def active_heat(replay: dict) -> dict | None:
+    heats = replay.get("heats") or []
+    if not heats:
+        return None
+    wanted = (replay.get("event") or {}).get("active_heat_id") or heats[0].get("heat_id")
+    return next((h for h in heats if h.get("heat_id") == wanted), heats[0])
+
+
+def runner_id(athlete: str | None, index: int) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", f"{athlete or 'runner'}-{index}".lower())
+
+
+def normalize_runners(heat: dict | None) -> list[dict]:
+    """Runner dicts shaped like heat-data.js normalizeEntry (DNS dropped, DNF kept)."""
+    if not heat:
+        return []
+    valid = [
+        e for e in heat.get("entries", [])
+        if len((e.get("splits") or {}).get("cumulative_seconds") or []) >= 2 and e.get("status") != "DNS"
+    ]
+    runners = []
+    fallback_lane = 1
+    for index, entry in enumerate(valid):
+        lane = entry.get("lane")
+        if not isinstance(lane, (int, float)):
+            lane, fallback_lane = fallback_lane, fallback_lane + 1
+        splits = entry["splits"]
+        result = entry.get("result") or {}
+        dnf = entry.get("status") == "DNF"
+        final = result.get("final_time")
+        if final is None:
+            final = splits["cumulative_seconds"][-1]
+        full_name = entry.get("athlete") or "Runner"
+        runners.append({
+            "id": runner_id(entry.get("athlete"), index),
+            "name": full_name.split()[0],
+            "fullName": full_name,
+            "lane": lane,
+            "place": entry.get("place"),
+            "splits": splits["cumulative_seconds"],
+            "splitMarks": splits.get("split_marks_m"),
+            "segmentSplits": splits.get("segment_seconds") or [],
+            # No finish time for a DNF (null in the JS analysis output); sort with finish_sort_key().
+            "finalTime": None if dnf else final,
+            "dnf": dnf,
+            "role": entry.get("role"),
+        })
+    runners.sort(key=lambda r: r["lane"])
+    assign_shared_lane_offsets(runners)
+    return runners
+
+
+SHARED_LANE_SPREAD = 0.28
+
+
+def finish_sort_key(runner: dict) -> float:
+    """Final time for sorting, DNF last: heat-data.js `finalTime ?? Infinity`."""
+    final = runner.get("finalTime")
+    return float("inf") if final is None else final
+
+
+def assign_shared_lane_offsets(runners: Sequence[dict]) -> None:
+    """Set `laneOffset` like heat-data.js: co-lane runners split inner/outer, faster seed on the rail."""
+    by_lane: dict[float, list[dict]] = {}
+    for runner in runners:
+        by_lane.setdefault(runner["lane"], []).append(runner)
+    max_lane = max((r["lane"] for r in runners), default=0)
+    for lane, lane_runners in by_lane.items():
+        if len(lane_runners) < 2:
+            for runner in lane_runners:
+                runner["laneOffset"] = 0.0
+            continue
+        ordered = sorted(lane_runners, key=finish_sort_key)
+        shift = SHARED_LANE_SPREAD if lane <= 1 else -SHARED_LANE_SPREAD if lane >= max_lane else 0.0
+        step = SHARED_LANE_SPREAD * 2 / (len(ordered) - 1)
+        for slot, runner in enumerate(ordered):
+            runner["laneOffset"] = -SHARED_LANE_SPREAD + slot * step + shift
+
+
+def load_race(replay_id: str | None = None, path: str | Path = HEATS_PATH) -> tuple[dict, dict, list[dict]]:
+    """(replay, event, runners) for `replay_id` (default: the payload's default replay)."""
+    replay = get_replay(load_replays(path), replay_id)
+    heat = active_heat(replay)
+    event = dict(replay.get("event") or {})
+    event.setdefault("race_distance_m", DEFAULT_RACE_DISTANCE)
+    return replay, event, normalize_runners(heat)
+
+
+# =============================================================================
+# Per-runner features
+# =============================================================================
+
+def segments(runner: dict) -> list[float]:
+    if runner.get("segmentSplits"):
+        return list(runner["segmentSplits"])
+    cumulative = runner.get("splits") or []
+    return [b - a for a, b in zip(cumulative, cumulative[1:])]
+
+
+def split_marks(runner: dict, race_distance: float) -> list[float]:
+    if runner.get("splitMarks"):
+        return list(runner["splitMarks"])
+    cumulative = runner.get("splits") or []
+    interval = race_distance / max(1, len(cumulative) - 1)
+    return [i * interval for i in range(len(cumulative))]
+
+
+def time_at_distance(runner: dict, distance: float, race_distance: float) -> float:
+    cumulative = runner.get("splits") or []
+    marks = split_marks(runner, race_distance)
+    if distance <= 0:
+        return 0.0
+    if runner.get("dnf") and distance > marks[-1]:
+        # Stepped off before this mark (usually a pacer): never ranks ahead.
+        return float("inf")
+    if distance >= race_distance:
+        return cumulative[-1]
+    for i in range(len(marks) - 1):
+        if marks[i] <= distance <= marks[i + 1]:
+            if marks[i + 1] == marks[i]:
+                return cumulative[i]
+            t = (distance - marks[i]) / (marks[i + 1] - marks[i])
+            return cumulative[i] + t * (cumulative[i + 1] - cumulative[i])
+    return cumulative[-1]
+
+
+def peak_decline_pct(runner: dict) -> float | None:
+    segs = segments(runner)
+    if len(segs) < 2:
+        return None
+    peak = min(segs)
+    return (segs[-1] - peak) / peak * 100
+
+
+def split_class(runner: dict) -> dict | None:
+    segs = segments(runner)
+    if len(segs) < 2:
+        return None
+    mid = len(segs) // 2
+    first, second = sum(segs[:mid]), sum(segs[mid:])
+    if first == 0:
+        return None
+    diff_pct = (second - first) / first * 100
+    if runner.get("role") == "pacer":
+        label = "pacer"
+    elif diff_pct < SPLIT_CLASS_BANDS["negative_max_pct"]:
+        label = "negative_splitter"
+    elif diff_pct < SPLIT_CLASS_BANDS["even_max_pct"]:
+        label = "even"
+    elif diff_pct < SPLIT_CLASS_BANDS["textbook_max_pct"]:
+        label = "textbook_positive"
+    elif diff_pct < SPLIT_CLASS_BANDS["aggressive_max_pct"]:
+        label = "aggressive_front"
+    else:
+        label = "blow_up"
+    return {"label": label, "diffPct": diff_pct, "firstHalfSeconds": first, "secondHalfSeconds": second}
+
+
+def segment_scores(runners: Sequence[dict]) -> dict[str, list[float]]:
+    """Per segment, 100 = fastest in the field and 0 = slowest."""
+    by_runner = {r["id"]: segments(r) for r in runners}
+    count = min((len(s) for s in by_runner.values()), default=0)
+    scores = {r["id"]: [] for r in runners}
+    for s in range(count):
+        field = [by_runner[r["id"]][s] for r in runners]
+        best, worst = min(field), max(field)
+        span = (worst - best) or 1
+        for r in runners:
+            scores[r["id"]].append(100 * (worst - by_runner[r["id"]][s]) / span)
+    return scores
+
+
+def running_style(scores: list[float]) -> dict:
+    if not scores:
+        return {"primary": "NA", "tags": ["NA"], "confidence": 0}
+    opener, closer = scores[0], scores[-1]
+    t = STYLE_THRESHOLDS
+    if opener >= t["openerScore_E"]:
+        tags = ["E"]
+    elif opener >= t["openerScore_EP"]:
+        tags = ["E/P"]
+    elif opener >= t["openerScore_P"]:
+        tags = ["P"]
+    elif closer >= t["closerScore_S"]:
+        tags = ["S"]
+    else:
+        tags = ["NA"]
+    if opener >= t["openerScore_EP"] and closer >= t["closerScore_S"]:
+        tags.append("fast_starter_finisher")
+    return {"primary": tags[0], "tags": tags, "openerScore": opener, "closerScore": closer}
+
+
+# =============================================================================
+# Race-level features
+# =============================================================================
+
+def checkpoints_for(event: dict) -> list[float]:
+    race_distance = event.get("race_distance_m") or DEFAULT_RACE_DISTANCE
+    interval = event.get("timing_interval_m") or DEFAULT_TIMING_INTERVAL
+    marks = list(range(interval, int(race_distance) + 1, interval))
+    # The finish is always a checkpoint, even when the interval doesn't divide it.
+    if not marks or marks[-1] != race_distance:
+        marks.append(race_distance)
+    return marks
+
+
+def ranks_at(runners: Sequence[dict], distance: float, race_distance: float) -> list[str]:
+    return [r["id"] for r in sorted(runners, key=lambda r: time_at_distance(r, distance, race_distance))]
+
+
+def lead_changes(ranks: dict[float, list[str]]) -> list[dict]:
+    changes = []
+    previous = None
+    for cp in sorted(ranks):
+        leader = ranks[cp][0]
+        if previous is not None and leader != previous:
+            changes.append({"at_distance": cp, "from_id": previous, "to_id": leader})
+        previous = leader
+    return changes
+
+
+def biggest_move(runners: Sequence[dict], ranks: dict[float, list[str]], from_cp: float, to_cp: float) -> dict | None:
+    best = None
+    for r in runners:
+        from_rank, to_rank = ranks[from_cp].index(r["id"]), ranks[to_cp].index(r["id"])
+        delta = from_rank - to_rank
+        if best is None or delta > best["delta"]:
+            best = {"runnerId": r["id"], "fromRank": from_rank, "toRank": to_rank,
+                    "delta": delta, "fromCp": from_cp, "toCp": to_cp}
+    return best
+
+
+def closing_speed_winner(runners: Sequence[dict]) -> dict | None:
+    """Smallest peak-to-final slowdown, not fastest final segment."""
+    best = None
+    for r in runners:
+        decline = peak_decline_pct(r)
+        if decline is not None and (best is None or decline < best["peakDeclinePct"]):
+            best = {"runnerId": r["id"], "peakDeclinePct": decline}
+    return best
+
+
+def race_shape(runners: Sequence[dict], event: dict) -> dict:
+    par = PAR_TIMES.get(event.get("competition_level") or "")
+    finishers = [r for r in runners if r["finalTime"] is not None]
+    if not finishers or not par:
+        return {"earlyPaceBand": None, "finalTimeBand": None, "label": None,
+                "reason": "no_field" if par else "no_par_table_entry"}
+
+    race_distance = event.get("race_distance_m") or DEFAULT_RACE_DISTANCE
+    fastest = min(finishers, key=lambda r: r["finalTime"])
+    openers = [t for t in (time_at_distance(r, 200, race_distance) for r in runners) if t > 0]
+    leader_opener = min(openers) if openers else time_at_distance(fastest, 200, race_distance)
+    opener_pct = (leader_opener - par["opener_200m"]) / par["opener_200m"] * 100
+    total_pct = (fastest["finalTime"] - par["total_seconds"]) / par["total_seconds"] * 100
+
+    def band(pct: float) -> str:
+        if pct < RACE_SHAPE_BANDS["fast_threshold_pct"]:
+            return "fast"
+        if pct < RACE_SHAPE_BANDS["par_threshold_pct"]:
+            return "par"
+        if pct < RACE_SHAPE_BANDS["avg_threshold_pct"]:
+            return "avg"
+        return "slow"
+
+    early, final = band(opener_pct), band(total_pct)
+    return {"earlyPaceBand": early, "finalTimeBand": final, "label": f"{early}/{final}",
+            "leaderOpener": leader_opener, "leaderTotal": fastest["finalTime"],
+            "openerDeltaPct": opener_pct, "totalDeltaPct": total_pct}
+
+
+def pace_pressure(styles: dict[str, dict]) -> dict:
+    count = sum(s["primary"] in ("E", "E/P") for s in styles.values())
+    if count <= 1:
+        category = "lone_speed"
+    elif count < PACE_PRESSURE_DUEL_THRESHOLD:
+        category = "competitive"
+    else:
+        category = "pace_duel"
+    return {"count": count, "category": category}
+
+
+def analyze_race(event: dict, runners: Sequence[dict]) -> dict:
+    """Python analogue of analyzeRace(): per-runner features and race-level signals."""
+    race_distance = event.get("race_distance_m") or DEFAULT_RACE_DISTANCE
+    checkpoints = checkpoints_for(event)
+    scores = segment_scores(runners)
+    ranks = {cp: ranks_at(runners, cp, race_distance) for cp in checkpoints}
+
+    per_runner = {}
+    for r in runners:
+        per_runner[r["id"]] = {
+            **r,
+            "segments": segments(r),
+            "segmentMarks": split_marks(r, race_distance),
+            "peakDeclinePct": peak_decline_pct(r),
+            "splitClass": split_class(r),
+            "style": running_style(scores.get(r["id"], [])),
+        }
+    styles = {rid: p["style"] for rid, p in per_runner.items()}
+
+    race = {
+        "raceDistance": race_distance,
+        "checkpoints": checkpoints,
+        "ranksByCheckpoint": ranks,
+        "finishOrder": ranks[race_distance],
+        "leadChanges": lead_changes(ranks),
+        "biggestMoveLate": biggest_move(runners, ranks, checkpoints[-3], checkpoints[-1])
+        if len(checkpoints) >= 3 else None,
+        "closingSpeedWinner": closing_speed_winner(runners),
+        "pacePressure": pace_pressure(styles),
+        "raceShape": race_shape(runners, event),
+    }
+    return {"perRunner": per_runner, "raceLevel": race}
+
+
+# =============================================================================
+# Commentary events
+# =============================================================================
+
+PUNCTUATION = frozenset(",.!?;:")
+
+
+def join_parts(parts: Sequence[str]) -> str:
+    """The line a list of phrase parts reads as; punctuation parts attach to the word before."""
+    text = ""
+    for part in parts:
+        text += part if part in PUNCTUATION or not text else f" {part}"
+    return text[:1].upper() + text[1:]
+
+
+def _event(kind: str, due: float, distance: float, subject: str | None, payload: dict, *parts: str) -> dict:
+    """One event; `parts` are the phrase units of its line (names, numbers, stock phrases)."""
+    return {
+        "dueTime": round(due, 2),
+        "distance": distance,
+        "subjectId": subject,
+        "kind": kind,
+        "payload": payload,
+        "priority": PRIORITY[kind],
+        "excitement": EXCITEMENT[kind],
+        "slack": list(SLACK[kind]),
+        "text": join_parts(parts),
+        "parts": list(parts),
+    }
+
+
+def extract_events(event: dict, runners: Sequence[dict], analysis: dict | None = None) -> list[dict]:
+    """Time-ordered commentary events for one heat."""
+    analysis = analysis or analyze_race(event, runners)
+    per_runner, race = analysis["perRunner"], analysis["raceLevel"]
+    race_distance = race["raceDistance"]
+    checkpoints = race["checkpoints"]
+    racing = [r for r in runners if r.get("role") != "pacer"]
+    # Who is in the race at each mark: no pacers, nobody who has stepped off
+    # (time_at_distance is inf past a DNF's last split), as app.js standings.
+    racing_ids = {r["id"] for r in racing}
+    standings = {
+        cp: [rid for rid in race["ranksByCheckpoint"][cp]
+             if rid in racing_ids and math.isfinite(time_at_distance(per_runner[rid], cp, race_distance))]
+        for cp in checkpoints
+    }
+    name = {rid: p["fullName"] for rid, p in per_runner.items()}
+    short = {rid: p["fullName"].split()[-1] for rid, p in per_runner.items()}
+    events = []
+
+    shape = race["raceShape"]
+    pressure = race["pacePressure"]
+    intro = [number_words(len(racing)), "on the line for the",
+             normalize_text(event.get("name") or f"{race_distance:g} meters"), "."]
+    # Finish-time-only results have a single "segment": no early pace to read.
+    splits_known = all(len(p["segments"]) >= 2 for p in per_runner.values())
+    if shape.get("label") and splits_known:
+        intro.append({
+            "lone_speed": "One clear front-runner in this field.",
+            "competitive": "A couple of runners who like to go from the front.",
+            "pace_duel": "Plenty of early speed here; expect a hot first lap.",
+        }[pressure["category"]])
+    events.append(_event("race_shape_intro", 0, 0, None, {"shape": shape, "pacePressure": pressure}, *intro))
+
+    for rid, p in per_runner.items():
+        if splits_known and p["style"]["primary"] in ("E", "E/P") and p.get("role") != "pacer":
+            events.append(_event(
+                "opener_aggressive", p["segments"][0], p["segmentMarks"][1] if len(p["segmentMarks"]) > 1 else checkpoints[0],
+                rid, {"openerScore": p["style"]["openerScore"], "style": p["style"]["primary"]},
+                short[rid], "goes out hard", ",", spoken_time(p["segments"][0]), "for the opening split."
+            ))
+
+    # Leader through each intermediate checkpoint, with the gap to second.
+    for cp in checkpoints[:-1]:
+        order = standings[cp]
+        if not order:
+            continue
+        leader = per_runner[order[0]]
+        t = time_at_distance(leader, cp, race_distance)
+        gap = time_at_distance(per_runner[order[1]], cp, race_distance) - t if len(order) > 1 else 0.0
+        parts = [short[order[0]], "leads through", spoken_distance(cp), "in", spoken_time(t)]
+        if gap >= 0.5:
+            parts += [",", spoken_gap(gap), "clear."]
+        elif len(order) > 1:
+            parts += [",", "the field right behind."]
+        else:
+            parts.append(".")
+        events.append(_event("checkpoint", t, cp, order[0], {"order": order[:3], "time": t, "gap": gap}, *parts))
+
+    # A change at the finish is the winner, which the finish event calls.
+    for change in lead_changes({cp: order for cp, order in standings.items() if order and cp < race_distance}):
+        leader = per_runner[change["to_id"]]
+        t = time_at_distance(leader, change["at_distance"], race_distance)
+        events.append(_event(
+            "lead_change", t, change["at_distance"], change["to_id"], change,
+            name[change["to_id"]], "takes the lead from", short[change["from_id"]],
+            "at", spoken_distance(change["at_distance"]), "!",
+        ))
+
+    # Fastest segment of the race, and the slowest segment the leaders ran.
+    fastest = None
+    for r in racing if splits_known else []:
+        p = per_runner[r["id"]]
+        for i, seg in enumerate(p["segments"]):
+            if fastest is None or seg < fastest[0]:
+                fastest = (seg, i, r["id"])
+    if fastest:
+        seg, i, rid = fastest
+        p = per_runner[rid]
+        end = p["segmentMarks"][i + 1]
+        events.append(_event(
+            "fastest_segment", p["splits"][i + 1], end, rid, {"segment": i, "seconds": seg},
+            "That's the fastest split of the race", ",", spoken_time(seg), "for", short[rid], "to", spoken_distance(end), ".",
+        ))
+
+    prev_cp, slowest = 0, None
+    for cp in checkpoints:
+        if standings[cp]:
+            # The racing leader at this mark, over the same runner's own segment.
+            leader = per_runner[standings[cp][0]]
+            seg = time_at_distance(leader, cp, race_distance) - time_at_distance(leader, prev_cp, race_distance)
+            per_meter = seg / (cp - prev_cp)
+            if cp < race_distance and (slowest is None or per_meter > slowest[0]):
+                slowest = (per_meter, seg, prev_cp, cp, leader["id"])
+        prev_cp = cp
+    if slowest and len(checkpoints) > 2:
+        _, seg, start, end, rid = slowest
+        events.append(_event(
+            "slowest_segment", time_at_distance(per_runner[rid], end, race_distance), end, rid,
+            {"from": start, "to": end, "seconds": seg},
+            "The pace has eased", ",", spoken_time(seg), "for the leaders from", spoken_distance(start), "to", spoken_distance(end), ".",
+        ))
+
+    # Called as the move happens, at the last mark before the finish, so only
+    # places already gained by then: the finish order is the finish call's.
+    move = None
+    if len(checkpoints) >= 3:
+        start, mid = checkpoints[-3], checkpoints[-2]
+        move = biggest_move([per_runner[rid] for rid in standings[mid] if rid in standings[start]],
+                            standings, start, mid)
+    if move and move["delta"] > 0:
+        mover = per_runner[move["runnerId"]]
+        places = ["a place"] if move["delta"] == 1 else [number_words(move["delta"]), "places"]
+        events.append(_event(
+            "late_move", time_at_distance(mover, mid, race_distance), mid, mover["id"], move,
+            name[mover["id"]], "is flying", ",", "up", *places, "since", spoken_distance(move["fromCp"]), "!",
+        ))
+
+    finish_order = [rid for rid in race["finishOrder"] if per_runner[rid]["finalTime"] is not None]
+    for rid in finish_order:
+        p = per_runner[rid]
+        if (p.get("splitClass") or {}).get("label") == "negative_splitter":
+            sc = p["splitClass"]
+            events.append(_event(
+                "negative_split", p["finalTime"], race_distance, rid, sc,
+                "A negative split for", short[rid], ":", spoken_time(sc["firstHalfSeconds"]), "out", ",",
+                spoken_time(sc["secondHalfSeconds"]), "back.",
+            ))
+
+    closer = race["closingSpeedWinner"]
+    if closer and closer["runnerId"] in finish_order and closer["runnerId"] != (finish_order or [None])[0]:
+        p = per_runner[closer["runnerId"]]
+        events.append(_event(
+            "closing_speed_winner", p["finalTime"], race_distance, p["id"], closer,
+            "Nobody held their speed better than", short[p["id"]], "over the final stretch."
+        ))
+
+    if finish_order:
+        winner = per_runner[finish_order[0]]
+        parts = [winner["fullName"], "wins it in", spoken_time(winner["finalTime"], places=2), "!"]
+        if len(finish_order) > 1:
+            parts += [short[finish_order[1]], "second."]
+        events.append(_event("finish", winner["finalTime"], race_distance, winner["id"],
+                             {"finishOrder": finish_order}, *parts))
+
+    # Stable sort: at equal times the higher-priority call goes first.
+    events.sort(key=lambda e: (e["dueTime"], -e["priority"]))
+    return events
+
+
+def replay_events(replay_id: str | None = None, path: str | Path = HEATS_PATH) -> list[dict]:
+    """Commentary events for one replay of custom_800m_heats.json."""
+    _, event, runners = load_race(replay_id, path)
+    return extract_events(event, runners)
+
+
+def build_requests(
+    events: Sequence[dict],
+    *,
+    voice: str = "Puck",
+    prompt: str = "You are a professional track and field commentator calling the race live.",
+    pace: dict[str, str] = PACE_INSTRUCTIONS,
+    format: str = "mp3",
+) -> list[ClipRequest]:
+    """One ClipRequest per event; `pace` maps excitement level to a delivery instruction."""
+    requests = []
+    for index, e in enumerate(events):
+        requests.append(ClipRequest(
+            index=index,
+            filename=f"commentary_{index:02d}_{e['dueTime']:.1f}s.{format}",
+            text=e["text"],
+            voice=voice,
+            prompt=prompt,
+            pace=pace.get(e["excitement"], ""),
+            time=e["dueTime"],
+            label=f"{e['kind']:20s}",
+            manifest={"subjectId": e["subjectId"], "kind": e["kind"],
+                      "priority": e["priority"], "slack": e["slack"]},
+            parts=e["parts"],
+        ))
+    return requests
@@ -0,0 +1,51 @@
+"""
+Re-encode-only pass over already generated commentary directories.
+
+No TTS calls: every commentary_*/*.mp3 is decoded and encoded again in place
+(e.g. after changing the bitrate), one file per worker process, so the run
+scales with the number of cores.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Iterable
+
+from .assets import LADDER_NAME
+from .audio import reencode_file
+from .pipeline import default_encoder_workers
+
+
+def find_clip_dirs(root: str | Path = ".") -> list[Path]:
+    return sorted(d for d in Path(root).glob("commentary_*") if d.is_dir() and any(d.glob("*.mp3")))
+
+
+def reencode_dirs(
+    dirs: Iterable[str | Path],
+    *,
+    bitrate: str | None = None,
+    workers: int | None = None,
+    log: Callable[[str], None] | None = print,
+) -> tuple[int, int]:
+    """Re-encode every MP3 under `dirs`. Returns (succeeded, failed)."""
+    # Ladder rungs have their own bitrates; only primary clips are re-encoded.
+    files = sorted(str(f) for d in dirs for f in Path(d).glob("*.mp3") if not LADDER_NAME.match(f.name))
+    export_args = {"bitrate": bitrate} if bitrate else {}
+    ok = failed = 0
+
+    with ProcessPoolExecutor(max_workers=workers or default_encoder_workers()) as pool:
+        futures = {pool.submit(reencode_file, f, "mp3", **export_args): f for f in files}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                duration_sec = future.result()
+            except Exception as e:
+                failed += 1
+                if log:
+                    log(f"✗ {path}: {e}")
+                continue
+            ok += 1
+            if log:
+                log(f"✓ {path} ({duration_sec:.1f}s)")
+    return ok, failed
@@ -0,0 +1,109 @@
+"""
+Rate-limit-aware asyncio scheduler for TTS calls.
+
+The old scripts slept a fixed 4-9 s after every request, so a run took
+len(events) * delay seconds even when the provider would have accepted
+requests in parallel. Here requests are admitted by a token bucket refilled at
+the provider's requests-per-minute quota, and up to `concurrency` of them are
+in flight at once, so wall time is bounded by the quota, not by the sum of
+per-call latencies plus sleeps.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from typing import Callable, Iterable, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class TokenBucket:
+    """Requests-per-minute limiter.
+
+    Holds up to `burst` tokens, refilled continuously at rpm / 60 per second.
+    burst=1 spaces requests evenly (the safest reading of an RPM quota);
+    raise it when the provider counts per fixed minute window.
+    """
+
+    def __init__(self, rpm: float, burst: int = 1, clock: Callable[[], float] = time.monotonic):
+        if rpm <= 0:
+            raise ValueError("rpm must be positive")
+        self.rate = rpm / 60.0
+        self.capacity = max(1, int(burst))
+        self.tokens = float(self.capacity)
+        self.clock = clock
+        self.updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        # The lock serializes waiters so tokens are handed out first-come,
+        # first-served instead of every waiter waking at once and racing.
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def defer(self, seconds: float) -> None:
+        """Hold back every waiter for `seconds` (e.g. after a 429 with Retry-After)."""
+        self._refill()
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+def backoff_delay(
+    attempt: int,
+    retry_after: float | None = None,
+    *,
+    base: float = 2.0,
+    cap: float = 60.0,
+    rng: random.Random | None = None,
+) -> float:
+    """Jittered exponential backoff before retry number `attempt` (1-based).
+
+    The delay is drawn from [d/2, d] with d = min(cap, base * 2**(attempt-1)),
+    so clients that failed together don't retry together, and is never
+    shorter than the provider's Retry-After.
+    """
+    exp = min(cap, base * 2 ** (attempt - 1))
+    delay = (rng or random).uniform(exp / 2, exp)
+    return max(delay, retry_after or 0.0)
+
+
+async def run_scheduled(
+    items: Iterable[T],
+    worker: Callable[[T], R],
+    *,
+    rpm: float,
+    concurrency: int = 4,
+    burst: int = 1,
+    on_done: Callable[[R], None] | None = None,
+) -> list[R]:
+    """Run blocking `worker(item)` for every item under the RPM/concurrency limits.
+
+    The worker runs in a thread (the provider SDKs are synchronous). Results
+    come back in input order; `on_done` fires in completion order so progress
+    can be printed as clips land.
+    """
+    bucket = TokenBucket(rpm, burst=burst)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_one(item: T) -> R:
+        async with semaphore:
+            await bucket.acquire()
+            result = await asyncio.to_thread(worker, item)
+        if on_done:
+            on_done(result)
+        return result
+
+    return await asyncio.gather(*(run_one(item) for item in items))
+
@@ -0,0 +1,184 @@
+"""
+Announcer-style spoken forms for times, distances, places and bibs.
+
+Split and finish times are read the way track commentators say them:
+
+    32.9     thirty-two nine          41.0     forty-one flat
+    1:08.4   one oh eight four        1:45     one forty-five
+    2:21.58  two twenty-one fifty-eight
+    3:04.27  three oh four twenty-seven
+    1:40.7   one forty point seven    50.2     fifty point two
+    1:01:00.5  one oh one oh-oh point five
+    2:00:00    two hours flat
+
+(after a round tens word or a whole minute or hour the tenth gets "point",
+or 1:40.7 would be heard as 1:47.)
+
+Every function is a pure, memoized table lookup on its (rounded) input, so a
+given number always produces the same string and therefore the same clip
+cache key and fragment. parse_clock() follows parseClock in
+scripts/ingest-matsport.mjs.
+"""
+
+from __future__ import annotations
+
+import re
+from functools import cache
+
+_ONES = ("zero one two three four five six seven eight nine ten eleven twelve thirteen "
+         "fourteen fifteen sixteen seventeen eighteen nineteen").split()
+_TENS = "_ _ twenty thirty forty fifty sixty seventy eighty ninety".split()
+_ORDINAL = {"one": "first", "two": "second", "three": "third", "five": "fifth",
+            "eight": "eighth", "nine": "ninth", "twelve": "twelfth"}
+
+
+def parse_clock(value) -> float | None:
+    """Seconds from 41.5, "41.5", "1:08.4" or "1:02:03"; None when unparseable."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, str) or not value.strip():
+        return None
+    seconds = 0.0
+    for part in value.strip().split(":"):
+        match = re.match(r"\s*[-+]?(\d+\.?\d*|\.\d+)", part)
+        if not match:
+            return None
+        seconds = seconds * 60 + float(match.group(0))
+    return round(seconds, 2)
+
+
+@cache
+def number_words(n: int) -> str:
+    """Cardinal words: 7 → "seven", 42 → "forty-two", 1500 → "one thousand five hundred"."""
+    if n < 0:
+        return f"minus {number_words(-n)}"
+    if n < 20:
+        return _ONES[n]
+    if n < 100:
+        tens, ones = divmod(n, 10)
+        return _TENS[tens] + (f"-{_ONES[ones]}" if ones else "")
+    if n < 1000:
+        hundreds, rest = divmod(n, 100)
+        return f"{_ONES[hundreds]} hundred" + (f" {number_words(rest)}" if rest else "")
+    thousands, rest = divmod(n, 1000)
+    return f"{number_words(thousands)} thousand" + (f" {number_words(rest)}" if rest else "")
+
+
+@cache
+def ordinal_words(n: int) -> str:
+    """1 → "first", 8 → "eighth", 23 → "twenty-third"."""
+    words = number_words(n)
+    head, sep, last = words.rpartition("-") if "-" in words else words.rpartition(" ")
+    if last in _ORDINAL:
+        last = _ORDINAL[last]
+    elif last.endswith("y"):
+        last = last[:-1] + "ieth"
+    else:
+        last += "th"
+    return f"{head}{sep}{last}"
+
+
+@cache
+def _pair(n: int) -> str:
+    """Two clock digits: 0 → "oh-oh", 8 → "oh eight", 45 → "forty-five"."""
+    if n == 0:
+        return "oh-oh"
+    return f"oh {_ONES[n]}" if n < 10 else number_words(n)
+
+
+@cache
+def _spoken_time(centis: int, places: int) -> str:
+    whole, frac = divmod(centis, 100)
+    minutes, seconds = divmod(whole, 60)
+    hours, minutes = divmod(minutes, 60)
+
+    if hours and (minutes or seconds):
+        words = f"{number_words(hours)} {_pair(minutes)} {_pair(seconds)}"
+    elif hours:
+        words = f"{number_words(hours)} {'hour' if hours == 1 else 'hours'}"
+    elif minutes:
+        unit = "minute" if minutes == 1 else "minutes"
+        words = f"{number_words(minutes)} {_pair(seconds)}" if seconds else f"{number_words(minutes)} {unit}"
+    else:
+        words = number_words(seconds)
+
+    if places == 0:
+        return words
+    if frac == 0:
+        return f"{words} flat"
+    if places == 1:
+        # "fifty two" would be heard as 52 (and "one minute four" as 1:04): a tenth
+        # after a round tens word, or after whole minutes or hours, gets a "point".
+        round_word = (seconds >= 20 and seconds % 10 == 0) or ((minutes or hours) and not seconds)
+        sep = " point " if round_word else " "
+        return f"{words}{sep}{_ONES[frac // 10]}"
+    return f"{words} {_pair(frac)}"
+
+
+def spoken_time(seconds: float, places: int = 1) -> str:
+    """A split or finish time read to `places` decimals (0, 1 or 2)."""
+    places = max(0, min(2, places))
+    step = 10 ** (2 - places)
+    # Round half up on whole hundredths (as Math.round does), so 13.65 reads "thirteen seven".
+    centis = round(seconds * 100)
+    return _spoken_time((centis + step // 2) // step * step, places)
+
+
+def spoken_clock(value: str) -> str:
+    """A clock string as written: "1:45" → "one forty-five", "2:21.58" → "two twenty-one fifty-eight"."""
+    seconds = parse_clock(value)
+    if seconds is None:
+        return value
+    decimals = value.strip().rpartition(".")[2] if "." in value else ""
+    return spoken_time(seconds, places=len(decimals))
+
+
+@cache
+def spoken_distance(meters: float) -> str:
+    """Track distances as said: 200 → "two hundred", 1500 → "fifteen hundred", 1000 → "one thousand"."""
+    m = int(round(meters))
+    if 1000 < m < 10000 and m % 100 == 0 and m % 1000:
+        return f"{number_words(m // 100)} hundred"
+    return number_words(m)
+
+
+@cache
+def spoken_gap(seconds: float) -> str:
+    """A margin in seconds: 0.9 → "nine tenths", 1.5 → "one point five", 3.0 → "three"."""
+    tenths = int(round(seconds * 10))
+    whole, frac = divmod(tenths, 10)
+    if not frac:
+        return number_words(whole)
+    if not whole:
+        return f"{_ONES[frac]} tenth" + ("s" if frac > 1 else "")
+    return f"{number_words(whole)} point {_ONES[frac]}"
+
+
+@cache
+def spoken_bib(bib: int) -> str:
+    """Bib numbers are read in pairs: 8 → "eight", 153 → "one fifty-three", 1207 → "twelve oh seven"."""
+    if bib < 100:
+        return number_words(bib)
+    head, tail = divmod(bib, 100)
+    return f"{number_words(head)} {_pair(tail)}" if tail else f"{number_words(head)} hundred"
+
+
+_CLOCK = re.compile(r"\b\d{1,2}:\d{2}(?:\.\d{1,2})?\b")
+_DISTANCE = re.compile(r"\b(\d+)(?:\s*m\b|(?=\s+met(?:er|re)s?\b))")
+_ORDINAL_NUM = re.compile(r"\b(\d+)(?:st|nd|rd|th)\b")
+_DECIMAL = re.compile(r"\b\d+\.\d{1,2}\b")
+_INTEGER = re.compile(r"\b\d+\b")
+
+
+@cache
+def normalize_text(text: str) -> str:
+    """Replace every number in free commentary text with its spoken form.
+
+    Clock strings and bare decimals are times; "200 meters"/"800m" are
+    distances; "8th" is an ordinal; other integers are cardinals.
+    """
+    text = _CLOCK.sub(lambda m: spoken_clock(m.group(0)), text)
+    text = _DISTANCE.sub(lambda m: spoken_distance(int(m.group(1))) + (" meters" if m.group(0).endswith("m") else ""), text)
+    text = _ORDINAL_NUM.sub(lambda m: ordinal_words(int(m.group(1))), text)
+    text = _DECIMAL.sub(lambda m: spoken_clock(m.group(0)), text)
+    return _INTEGER.sub(lambda m: number_words(int(m.group(0))), text)
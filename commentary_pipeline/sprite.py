@@ -0,0 +1,117 @@
+"""
+Audio sprite: a replay's clips packed into one file plus an offset table.
+
+A page view otherwise fetches and decodes every commentary_*.mp3 on its own
+(one request and one decoder per clip). build_sprite() decodes a clip
+directory's clips to PCM (one worker process per core), lays them end to
+end with a guard gap of silence around each, encodes the result once (plus
+any ladder rungs) and writes sprite.json:
+
+    {"file": "sprite.mp3", "sampleRate": 24000, "guardMs": 300, "duration": ...,
+     "bytes": ..., "variants": [...],
+     "clips": [{"index", "file", "start", "duration"}, ...]}
+
+`start`/`duration` are seconds into the sprite. The guard absorbs MP3
+encoder delay and the coarse stop timing of <audio> playback, so a clip
+never bleeds into the next one. AudioManager plays sub-ranges of the sprite
+from a decoded Web Audio buffer, or from a single <audio> element until the
+buffer is ready.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Sequence
+
+from pydub import AudioSegment
+
+from .assets import LADDER_NAME
+from .audio import Variant, encode_clip, encode_variant
+from .clips import CHANNELS, SAMPLE_RATE, SAMPLE_WIDTH
+from .pipeline import default_encoder_workers
+from .timing import write_json_atomic
+
+SPRITE_NAME = "sprite"
+SPRITE_TABLE = "sprite.json"
+DEFAULT_GUARD_MS = 300
+
+_CLIP_INDEX = re.compile(r"^commentary_(\d+)_")
+
+
+def sprite_sources(directory: str | Path, extensions: Sequence[str] = (".mp3", ".wav")) -> list[Path]:
+    """The directory's clips in index order, without ladder rungs."""
+    clips = []
+    for path in Path(directory).iterdir():
+        match = _CLIP_INDEX.match(path.name)
+        if match and path.suffix in extensions and not LADDER_NAME.match(path.name):
+            clips.append((int(match.group(1)), path.name, path))
+    return [path for _, _, path in sorted(clips)]
+
+
+def decode_pcm(path: str) -> bytes:
+    """Process-pool entry point: any clip file as 24 kHz mono 16-bit PCM."""
+    segment = AudioSegment.from_file(path)
+    segment = segment.set_frame_rate(SAMPLE_RATE).set_channels(CHANNELS).set_sample_width(SAMPLE_WIDTH)
+    return segment.raw_data
+
+
+def build_sprite(
+    directory: str | Path,
+    *,
+    format: str = "mp3",
+    guard_ms: int = DEFAULT_GUARD_MS,
+    ladder: Sequence[Variant] = (),
+    workers: int | None = None,
+) -> dict:
+    """Pack every clip in `directory` into sprite.<format> and write sprite.json; returns the table."""
+    directory = Path(directory)
+    sources = sprite_sources(directory)
+    if not sources:
+        raise FileNotFoundError(f"No commentary clips in {directory}")
+
+    frame = SAMPLE_WIDTH * CHANNELS
+    guard = b"\0" * (SAMPLE_RATE * guard_ms // 1000 * frame)
+    with ProcessPoolExecutor(max_workers=workers or default_encoder_workers()) as pool:
+        pcms = list(pool.map(decode_pcm, [str(p) for p in sources]))
+
+        parts, clips = [guard], []
+        offset = len(guard)
+        for path, pcm in zip(sources, pcms):
+            pcm = pcm[:len(pcm) - len(pcm) % frame]
+            clips.append({
+                "index": int(_CLIP_INDEX.match(path.name).group(1)),
+                "file": path.name,
+                "start": round(offset / frame / SAMPLE_RATE, 4),
+                "duration": round(len(pcm) / frame / SAMPLE_RATE, 4),
+            })
+            parts += [pcm, guard]
+            offset += len(pcm) + len(guard)
+        sprite_pcm = b"".join(parts)
+
+        sprite_path = directory / f"{SPRITE_NAME}.{format}"
+        primary = pool.submit(encode_clip, sprite_pcm, str(sprite_path), format)
+        rungs = [pool.submit(encode_variant, sprite_pcm, str(sprite_path), v) for v in ladder]
+        samples, size = primary.result()
+        variants = sorted((r.result() for r in rungs), key=lambda v: v["bytes"])
+
+    table = {
+        "file": sprite_path.name,
+        "sampleRate": SAMPLE_RATE,
+        "guardMs": guard_ms,
+        "duration": round(samples / SAMPLE_RATE, 3),
+        "bytes": size,
+        **({"variants": variants} if variants else {}),
+        "clips": clips,
+    }
+    write_json_atomic(directory / SPRITE_TABLE, table)
+    return table
+
+
+def sprite_savings(directory: str | Path, table: dict) -> tuple[int, int]:
+    """(bytes of the separate clips, bytes of the sprite) for reporting."""
+    directory = Path(directory)
+    separate = sum(os.path.getsize(directory / c["file"]) for c in table["clips"])
+    return separate, table["bytes"]
@@ -0,0 +1,354 @@
+"""
+Offline trajectory timeline: every marker's path through a replay, computed once.
+
+A replay's positions are a pure function of its splits and the track
+geometry, yet the player re-derives them every frame: split interpolation,
+lane packing and the merge in race-model.js, then the speed governor in
+app.js. build_timeline() evaluates the same model with NumPy at FPS frames
+per second of race time. Distances, race order, lane packing, lanes and
+phases are computed over all runners × all frames at once. The governor eases
+each marker from where it was last frame, so it steps through the frames in
+order, vectorized over runners. The output is:
+
+    timeline.bin    frame-major planes ([frame][runner]):
+                    distance float32 (m), x/y int16 (svg px × XY_SCALE),
+                    lane int16 (× LANE_SCALE), place int16, phase uint8
+    timeline.json   the index: fps, frame count, runner ids, scales, the svg
+                    geometry the positions were drawn in, and each plane's
+                    dtype and byte offset in timeline.bin
+
+x, y and lane are where the marker is drawn at 1x (governor applied; a
+dropped-out runner parked in the infield). place and phase follow the model
+(phase indexes RUNNER_PHASES). js/timeline.js plays the file back by
+interpolating between keyframes, so every device draws the same race and
+seeking is a lookup; it only looks for timelines listed in the published
+replay index (publish.py).
+"""
+
+from __future__ import annotations
+
+import math
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+from .publish import TIMELINE, publish_artifact
+from .race_events import HEATS_PATH, finish_sort_key, load_race
+from .timing import write_json_atomic
+
+TIMELINE_INDEX = "timeline.json"
+TIMELINE_DATA = "timeline.bin"
+VERSION = 1
+FPS = 30
+XY_SCALE = 32
+LANE_SCALE = 1024
+
+# Order of js/race-model.js RUNNER_PHASES.
+PHASES = ("stagger_start", "merge", "packed", "finished", "dnf")
+STAGGER_START, MERGE, PACKED, FINISHED, DNF = range(len(PHASES))
+
+# --- Kept in step with js/utils.js, js/race-model.js and js/app.js -----------
+
+TRACK_LENGTH = 200
+RACE_DISTANCE = 800
+LANE_COUNT = 8
+LANE_WIDTH_METERS = 1.0
+DEFAULT_SVG = {"centerX": 175, "topY": 175, "bottomY": 375, "outerRadius": 150, "innerRadius": 25}
+VIEWBOX = {"width": 350, "height": 550, "pad": 16}
+LABEL_GUTTER = 30
+OUTDOOR_400 = {"straightM": 84.39, "turnRadiusM": 20, "laneWidthM": 2.0, "straightDrawScale": 0.6}
+LANE_FAIR_BLEND = 0.4
+FIELD_SURGE_MARGIN = 1.25
+LANE_RESPONSE = 3.2
+INFIELD_INSET = 0.42
+
+
+# =============================================================================
+# Geometry (utils.js)
+# =============================================================================
+
+def track_svg(event: dict) -> dict:
+    """configureTrackGeometry(): the svg oval the replay is drawn on."""
+    track_length = event.get("track_length_m") or TRACK_LENGTH
+    if track_length < 400:
+        return dict(DEFAULT_SVG)
+    lane_count = event.get("lane_count") or LANE_COUNT
+    profile = OUTDOOR_400
+    rail_m = profile["turnRadiusM"]
+    outer_m = rail_m + lane_count * profile["laneWidthM"]
+    drawn_straight_m = profile["straightM"] * profile["straightDrawScale"]
+    usable_w = VIEWBOX["width"] - VIEWBOX["pad"] - LABEL_GUTTER
+    usable_h = VIEWBOX["height"] - 2 * VIEWBOX["pad"]
+    scale = min(usable_w / (2 * outer_m), usable_h / (drawn_straight_m + 2 * outer_m))
+    outer_radius = outer_m * scale
+    straight_px = drawn_straight_m * scale
+    top_y = (VIEWBOX["height"] - (straight_px + 2 * outer_radius)) / 2 + outer_radius
+    return {
+        "centerX": VIEWBOX["pad"] + usable_w / 2,
+        "topY": top_y,
+        "bottomY": top_y + straight_px,
+        "outerRadius": outer_radius,
+        "innerRadius": rail_m * scale,
+    }
+
+
+def clamp_lane(lane, lane_count: int) -> np.ndarray:
+    lane = np.asarray(lane, dtype=np.float64)
+    return np.minimum(lane_count, np.maximum(1, np.where(np.isfinite(lane), lane, 1.0)))
+
+
+def lane_radius(lane, lane_count: int, svg: dict) -> np.ndarray:
+    # The visual lane width always divides the band by TRACK_CONFIG.laneCount.
+    width = (svg["outerRadius"] - svg["innerRadius"]) / LANE_COUNT
+    return svg["outerRadius"] - lane_count * width + (clamp_lane(lane, lane_count) - 0.5) * width
+
+
+def lane_path_length(lane, lane_count: int, svg: dict) -> np.ndarray:
+    return 2 * (svg["bottomY"] - svg["topY"]) + 2 * math.pi * lane_radius(lane, lane_count, svg)
+
+
+def track_xy(meters, lane, svg: dict, lap: float, lane_count: int) -> tuple[np.ndarray, np.ndarray]:
+    """getTrackCoordinates() over arrays of distances (start offset already added) and lanes."""
+    progress = np.mod(meters, lap) / lap
+    radius = lane_radius(lane, lane_count, svg)
+    inner = lane_radius(1, lane_count, svg)
+    half = math.pi * (inner + LANE_FAIR_BLEND * (radius - inner))
+    straight = svg["bottomY"] - svg["topY"]
+    total = 2 * straight + 2 * half
+    path = np.mod(progress * total + 2 * straight + half, total)
+
+    cx, top, bottom = svg["centerX"], svg["topY"], svg["bottomY"]
+    bend = np.where(path <= straight + half, path - straight, path - 2 * straight - half) / half * math.pi
+    x = np.select(
+        [path <= straight, path <= straight + half, path <= 2 * straight + half],
+        [cx - radius, cx - radius * np.cos(bend), cx + radius],
+        cx + radius * np.cos(bend),
+    )
+    y = np.select(
+        [path <= straight, path <= straight + half, path <= 2 * straight + half],
+        [top + path, bottom + radius * np.sin(bend), bottom - (path - straight - half)],
+        top - radius * np.sin(bend),
+    )
+    return x, y
+
+
+# =============================================================================
+# Race model (race-model.js), all runners × all frames
+# =============================================================================
+
+def event_config(event: dict) -> dict:
+    """buildEventConfig()."""
+    return {
+        "track_length_m": event.get("track_length_m") or TRACK_LENGTH,
+        "race_distance_m": event.get("race_distance_m") or RACE_DISTANCE,
+        "lane_count": event.get("lane_count") or LANE_COUNT,
+        "start_offset_turns": event.get("start_offset_turns") or 1,
+        "break_distance_m": event.get("break_distance_m") or 55,
+        "merge_complete_distance_m": event.get("merge_complete_distance_m") or 85,
+        "extra_packed_lane_spacing": 0.2,
+        "crowding_gap_m": 2.2,
+    }
+
+
+def segment_marks(runner: dict, race_distance: float) -> list[float]:
+    """getRunnerSegmentMarks(): explicit marks when they line up with the splits, else an even split."""
+    marks = runner.get("splitMarks")
+    splits = runner["splits"]
+    if isinstance(marks, list) and len(marks) == len(splits):
+        return marks
+    interval = race_distance / max(1, len(splits) - 1)
+    return [i * interval for i in range(len(splits))]
+
+
+def speed_ceiling(runners: Sequence[dict], config: dict) -> float:
+    """computeFieldSpeedCeiling(): fastest segment pace in the field × FIELD_SURGE_MARGIN."""
+    fastest = 0.0
+    for runner in runners:
+        times = np.asarray(runner["splits"], dtype=np.float64)
+        marks = np.asarray(segment_marks(runner, config["race_distance_m"]), dtype=np.float64)
+        seconds, meters = np.diff(times), np.diff(marks)
+        usable = (seconds > 0) & (meters > 0)
+        if usable.any():
+            fastest = max(fastest, float(np.max(meters[usable] / seconds[usable])))
+    if fastest <= 0:
+        fastest = config["race_distance_m"] / 120
+    return fastest * FIELD_SURGE_MARGIN
+
+
+def packed_lane(cluster_index: np.ndarray, config: dict) -> np.ndarray:
+    """getPackedLane() for an array of cluster positions."""
+    c = cluster_index
+    spread = np.minimum(config["lane_count"], 3 + (c - 3) * config["extra_packed_lane_spacing"])
+    return np.select([c <= 0, c == 1, c == 2, c == 3], [1.0, 2.0, 2.6, 3.0], spread)
+
+
+def model_frames(runners: Sequence[dict], config: dict, times: np.ndarray) -> dict[str, np.ndarray]:
+    """The race model's state at every time in `times`, as (frames, runners) arrays."""
+    race = config["race_distance_m"]
+    frames, count = len(times), len(runners)
+    marks = [np.asarray(segment_marks(r, race), dtype=np.float64) for r in runners]
+
+    # getDistanceAtTime(): 0 before the gun, pinned at the last mark after the last split.
+    distance = np.empty((frames, count))
+    for i, runner in enumerate(runners):
+        splits = np.asarray(runner["splits"], dtype=np.float64)
+        d = np.interp(times, splits, marks[i])
+        d = np.where(times < splits[0], marks[i][-1], d)
+        distance[:, i] = np.where(times <= 0, 0.0, d)
+
+    max_distance = np.array([m[-1] for m in marks])
+    dropped = (max_distance < race) & (distance >= max_distance - 1e-6)
+
+    # ranksAhead(): running before dropped, then distance, final time, listing order.
+    index = np.broadcast_to(np.arange(count), distance.shape)
+    final = np.broadcast_to(np.array([finish_sort_key(r) for r in runners], dtype=np.float64), distance.shape)
+    order = np.lexsort((index, final, -distance, dropped))
+    place = np.empty_like(order)
+    np.put_along_axis(place, order, np.broadcast_to(np.arange(count), order.shape), axis=1)
+
+    # fillPackedLaneTargets(): a gap over crowding_gap_m to the runner ahead starts a new cluster.
+    ranked = np.take_along_axis(distance, order, axis=1)
+    starts = np.zeros(order.shape, dtype=bool)
+    starts[:, 0] = True
+    starts[:, 1:] = ranked[:, :-1] - ranked[:, 1:] > config["crowding_gap_m"]
+    position = np.broadcast_to(np.arange(count), order.shape)
+    cluster = position - np.maximum.accumulate(np.where(starts, position, 0), axis=1)
+    packed = np.empty_like(distance)
+    np.put_along_axis(packed, order, packed_lane(cluster, config), axis=1)
+
+    # getDisplayLane() / getDisplayStartOffset().
+    lane_count = config["lane_count"]
+    base = clamp_lane([r["lane"] for r in runners], lane_count)
+    start_lane = base + np.array([r.get("laneOffset") or 0.0 for r in runners])
+    brk, merge_end = config["break_distance_m"], config["merge_complete_distance_m"]
+    merge = np.clip((distance - brk) / (merge_end - brk), 0.0, 1.0)
+    display_lane = np.where(merge == 0, start_lane, start_lane + (packed - start_lane) * merge)
+    initial = np.where(base > 1, config["start_offset_turns"] * math.pi * LANE_WIDTH_METERS * (base - 1), 0.0)
+    offset = np.select([distance <= 0, distance >= brk], [np.broadcast_to(initial, distance.shape), 0.0],
+                       initial * (1 - distance / brk))
+
+    phase = np.select(
+        [dropped, distance >= race, distance < brk, distance < merge_end],
+        [DNF, FINISHED, STAGGER_START, MERGE],
+        PACKED,
+    ).astype(np.uint8)
+    return {
+        "distance": distance,
+        "place": place,
+        "phase": phase,
+        "display_lane": display_lane,
+        "offset": offset,
+    }
+
+
+def governed_frames(model: dict[str, np.ndarray], config: dict, svg: dict, max_speed: float,
+                    fps: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Marker x, y and lane per frame as app.js draws them at 1x (updateRunnerPositions)."""
+    distance, phase = model["distance"], model["phase"]
+    target_lane, offset = model["display_lane"], model["offset"]
+    lap, lane_count = config["track_length_m"], config["lane_count"]
+    dt = 1.0 / fps
+    blend = 1 - math.exp(-dt * LANE_RESPONSE)
+    center_x, center_y = svg["centerX"], (svg["topY"] + svg["bottomY"]) / 2
+
+    xs, ys, lanes = (np.empty_like(distance) for _ in range(3))
+    # Frame 0 is resetRace(): every marker at its model position.
+    lane = target_lane[0].copy()
+    progress = distance[0] + offset[0]
+    xs[0], ys[0] = track_xy(progress, lane, svg, lap, lane_count)
+    lanes[0] = lane
+    for f in range(1, len(distance)):
+        next_lane = lane + (target_lane[f] - lane) * blend
+        next_progress = np.maximum(progress, distance[f] + offset[f])
+        prev_x, prev_y = track_xy(progress, lane, svg, lap, lane_count)
+        x, y = track_xy(next_progress, next_lane, svg, lap, lane_count)
+        budget = max_speed * dt * (lane_path_length(next_lane, lane_count, svg) / lap)
+        step = np.hypot(x - prev_x, y - prev_y)
+        over = (step > budget) & (step > 0)
+        if over.any():
+            scale = np.where(over, budget / np.where(over, step, 1.0), 1.0)
+            next_progress = np.where(over, progress + (next_progress - progress) * scale, next_progress)
+            next_lane = np.where(over, lane + (next_lane - lane) * scale, next_lane)
+            x, y = track_xy(next_progress, next_lane, svg, lap, lane_count)
+
+        # A dropped-out runner is parked in the infield, inset from their current lane.
+        out = phase[f] == DNF
+        if out.any():
+            drop_x, drop_y = track_xy(distance[f], lane, svg, lap, lane_count)
+            x = np.where(out, drop_x + (center_x - drop_x) * INFIELD_INSET, x)
+            y = np.where(out, drop_y + (center_y - drop_y) * INFIELD_INSET, y)
+            next_lane = np.where(out, lane, next_lane)
+            next_progress = np.where(out, progress, next_progress)
+        xs[f], ys[f], lanes[f] = x, y, next_lane
+        lane, progress = next_lane, next_progress
+    return xs, ys, lanes
+
+
+# =============================================================================
+# Timeline files
+# =============================================================================
+
+def _quantize(values: np.ndarray, scale: float) -> np.ndarray:
+    return np.clip(np.round(values * scale), -32768, 32767).astype("<i2")
+
+
+def build_timeline(event: dict, runners: Sequence[dict], output_dir: str | Path, *, fps: int = FPS) -> dict:
+    """Write timeline.bin and timeline.json for one replay into `output_dir`; returns the index."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    config = event_config(event)
+    svg = track_svg(config)
+    # The race is complete once the last runner has finished or dropped out.
+    end = max((r["splits"][-1] for r in runners), default=0.0)
+    frame_count = int(math.ceil(end * fps)) + 1
+    times = np.arange(frame_count) / fps
+
+    model = model_frames(runners, config, times)
+    x, y, lane = governed_frames(model, config, svg, speed_ceiling(runners, config), fps)
+
+    # Widest dtype first so every plane stays aligned for a typed-array view.
+    planes = [
+        ("distance", model["distance"].astype("<f4")),
+        ("x", _quantize(x, XY_SCALE)),
+        ("y", _quantize(y, XY_SCALE)),
+        ("lane", _quantize(lane, LANE_SCALE)),
+        ("place", model["place"].astype("<i2")),
+        ("phase", model["phase"].astype("u1")),
+    ]
+    dtypes = {"<f4": "float32", "<i2": "int16", "u1": "uint8"}
+    offset = 0
+    entries = []
+    with open(output_dir / f".{TIMELINE_DATA}.tmp", "wb") as f:
+        for name, data in planes:
+            data = np.ascontiguousarray(data)
+            f.write(data.tobytes())
+            entries.append({"name": name, "type": dtypes[data.dtype.str.replace("|", "")], "offset": offset})
+            offset += data.nbytes
+    (output_dir / f".{TIMELINE_DATA}.tmp").replace(output_dir / TIMELINE_DATA)
+
+    index = {
+        "version": VERSION,
+        "file": TIMELINE_DATA,
+        "fps": fps,
+        "frames": frame_count,
+        "duration": round(times[-1], 6),
+        "runnerIds": [r["id"] for r in runners],
+        "xyScale": XY_SCALE,
+        "laneScale": LANE_SCALE,
+        "svg": svg,
+        "planes": entries,
+        "bytes": offset,
+    }
+    write_json_atomic(output_dir / TIMELINE_INDEX, index)
+    return index
+
+
+def build_replay_timeline(replay_id: str | None, output_root: str | Path, *, heats: str | Path = HEATS_PATH,
+                          fps: int = FPS) -> tuple[dict, dict]:
+    """(replay, index) after writing <output_root>/<replay_id>/timeline.* and listing it for the player."""
+    replay, event, runners = load_race(replay_id, heats)
+    directory = Path(output_root) / (replay.get("replay_id") or "default-replay")
+    index = build_timeline(event, runners, directory, fps=fps)
+    publish_artifact(directory, TIMELINE, TIMELINE_INDEX)
+    return replay, index
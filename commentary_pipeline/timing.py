@@ -0,0 +1,49 @@
+"""
+Browser-facing commentary timing file (data/commentary_timing.json).
+
+The file has the shape {"commentaryTiming": [{index, filename, duration, ...}]}.
+TimingFile keeps the entries keyed by clip index and rewrites the file
+atomically after every update, so durations land as clips are written instead
+of in a separate decode-and-measure pass.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from pathlib import Path
+
+DEFAULT_TIMING_PATH = Path("data/commentary_timing.json")
+
+
+def write_json_atomic(path: Path, data) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class TimingFile:
+    def __init__(self, path: str | Path = DEFAULT_TIMING_PATH, replace: bool = False):
+        self.path = Path(path)
+        self.entries: dict[int, dict] = {}
+        if not replace and self.path.exists():
+            with open(self.path) as f:
+                for entry in json.load(f).get("commentaryTiming", []):
+                    self.entries[entry["index"]] = entry
+
+    def update(self, entry: dict) -> None:
+        self.entries[entry["index"]] = entry
+        self.save()
+
+    def save(self) -> None:
+        timing = [self.entries[i] for i in sorted(self.entries)]
+        write_json_atomic(self.path, {"commentaryTiming": timing})
@@ -0,0 +1,206 @@
+"""
+Duration-aware trigger times: schedule clips so they never talk over each other.
+
+Each clip is a Cue with an ideal time (the split it talks about), a slack
+window it may move within, a priority and a duration (exact once encoded, or
+estimate_duration() from the text before synthesis). solve_triggers() picks
+a start time for as many cues as it can so that no two overlap, as a
+weighted interval scheduling problem: every cue contributes a set of
+candidate intervals (its window on a 0.1 s grid), each worth its priority
+less a penalty for drifting from the ideal time, and a DP over candidates in
+cue order with a prefix-max tree over end times finds the best chain. Cues
+that cannot fit without pushing something more important off its moment
+are dropped.
+
+schedule_timing() applies the result to a commentaryTiming file in place.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Sequence
+
+from .assets import CLIP_NAME
+from .timing import write_json_atomic
+
+# Characters per second of synthesized speech by excitement level, measured
+# from the committed commentary_audio_v2 clips (other levels use the default).
+CHARS_PER_SEC = {
+    "calm": 12.0,
+    "appreciative": 14.1,
+    "very_excited": 14.3,
+    "celebratory": 14.8,
+    "observational": 16.5,
+    "intense": 16.9,
+    "analytical": 17.1,
+    "building": 17.1,
+    "impressed": 17.7,
+    "excited": 18.5,
+    "maximum": 18.5,
+}
+DEFAULT_CHARS_PER_SEC = 14.5
+SENTENCE_PAUSE_SEC = 0.25
+
+DEFAULT_PRIORITY = 5
+DEFAULT_SLACK = (0.0, 3.0)
+DEFAULT_GAP = 0.3
+RESOLUTION = 0.1
+# Value kept at the edge of the slack window, as a fraction of the priority.
+EDGE_VALUE = 0.5
+
+
+def estimate_duration(text: str, excitement: str | None = None) -> float:
+    """Seconds `text` takes to speak at the pace of `excitement`."""
+    rate = CHARS_PER_SEC.get(excitement or "", DEFAULT_CHARS_PER_SEC)
+    pauses = len(re.findall(r"[.!?](?:\s|$)", text.strip())) - 1
+    return round(len(text) / rate + SENTENCE_PAUSE_SEC * max(0, pauses), 2)
+
+
+@dataclass
+class Cue:
+    index: int
+    ideal: float
+    duration: float
+    priority: float = DEFAULT_PRIORITY
+    slack_before: float = DEFAULT_SLACK[0]
+    slack_after: float = DEFAULT_SLACK[1]
+    start: float | None = None
+
+    @property
+    def dropped(self) -> bool:
+        return self.start is None
+
+    def candidates(self, resolution: float = RESOLUTION) -> list[tuple[float, float]]:
+        """(start, value) on the grid across the slack window, ideal time first."""
+        steps_before = int(self.slack_before / resolution + 1e-9)
+        steps_after = int(self.slack_after / resolution + 1e-9)
+        out = []
+        for step in range(-steps_before, steps_after + 1):
+            side = self.slack_after if step > 0 else self.slack_before
+            drift = abs(step) * resolution
+            value = self.priority * (1 - (1 - EDGE_VALUE) * drift / side) if side else self.priority
+            out.append((self.ideal + step * resolution, value))
+        return out
+
+
+class _PrefixMax:
+    """Fenwick tree: best (value, ref) over positions <= i."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.tree: list[tuple[float, object]] = [(0.0, None)] * (size + 1)
+
+    def update(self, i: int, item: tuple[float, object]) -> None:
+        i += 1
+        while i <= self.size:
+            if item[0] > self.tree[i][0]:
+                self.tree[i] = item
+            i += i & -i
+
+    def query(self, i: int) -> tuple[float, object]:
+        best = (0.0, None)
+        i = min(i + 1, self.size)
+        while i > 0:
+            if self.tree[i][0] > best[0]:
+                best = self.tree[i]
+            i -= i & -i
+        return best
+
+
+def solve_triggers(cues: Sequence[Cue], *, gap: float = DEFAULT_GAP, resolution: float = RESOLUTION) -> list[Cue]:
+    """Set `start` on every cue (None = dropped) for the best non-overlapping schedule.
+
+    Cues keep their ideal-time order; at least `gap` seconds separate clips.
+    """
+    ordered = sorted(cues, key=lambda c: (c.ideal, -c.priority, c.index))
+    if not ordered:
+        return list(cues)
+    t0 = min(c.ideal - c.slack_before for c in ordered)
+    horizon = max(c.ideal + c.slack_after + c.duration for c in ordered) + gap
+
+    def tick(t: float) -> int:
+        return int(math.floor((t - t0) / resolution + 1e-6))
+
+    tree = _PrefixMax(tick(horizon) + 2)
+    best_total = (0.0, None)
+    for cue in ordered:
+        placed = []
+        for start, value in cue.candidates(resolution):
+            # Only clips ending `gap` before this start can precede it.
+            prev_value, prev = tree.query(tick(start - gap)) if start - gap >= t0 else (0.0, None)
+            placed.append((prev_value + value, (cue, start, prev)))
+        # Insert after scoring so a cue never chains onto itself.
+        for total, ref in placed:
+            _, start, _ = ref
+            tree.update(int(math.ceil((start + cue.duration - t0) / resolution - 1e-6)), (total, ref))
+            if total > best_total[0]:
+                best_total = (total, ref)
+
+    for cue in cues:
+        cue.start = None
+    ref = best_total[1]
+    while ref is not None:
+        cue, start, ref = ref
+        cue.start = round(start, 2)
+    return list(cues)
+
+
+def plan_events(events: Sequence[dict], *, gap: float = DEFAULT_GAP) -> list[Cue]:
+    """Schedule race_events events before synthesis, from estimated durations."""
+    cues = [
+        Cue(i, e["dueTime"], estimate_duration(e["text"], e.get("excitement")),
+            priority=e.get("priority", DEFAULT_PRIORITY), slack_before=e.get("slack", DEFAULT_SLACK)[0],
+            slack_after=e.get("slack", DEFAULT_SLACK)[1])
+        for i, e in enumerate(events)
+    ]
+    return solve_triggers(cues, gap=gap)
+
+
+def _ideal(entry: dict) -> float | None:
+    for key in ("idealTime", "triggerTime", "time"):
+        if entry.get(key) is not None:
+            return float(entry[key])
+    match = CLIP_NAME.match(entry.get("filename", ""))
+    return float(match["time"]) if match else None
+
+
+def schedule_timing(path: str | Path, *, gap: float = DEFAULT_GAP) -> list[Cue]:
+    """Solve trigger times for a commentaryTiming file and write them back.
+
+    Scheduled entries get `triggerTime` (and keep the target as `idealTime`);
+    entries that don't fit are marked "dropped": true. Entries may carry
+    `priority` and `slack` ([before, after] seconds); `duration` is exact.
+    """
+    path = Path(path)
+    with open(path) as f:
+        data = json.load(f)
+    entries = data.get("commentaryTiming", [])
+
+    cues = []
+    for entry in entries:
+        ideal = _ideal(entry)
+        if ideal is None or not entry.get("duration"):
+            continue
+        before, after = entry.get("slack") or DEFAULT_SLACK
+        cues.append(Cue(entry["index"], ideal, float(entry["duration"]),
+                        priority=entry.get("priority", DEFAULT_PRIORITY), slack_before=before, slack_after=after))
+    solve_triggers(cues, gap=gap)
+
+    by_index = {cue.index: cue for cue in cues}
+    for entry in entries:
+        cue = by_index.get(entry["index"])
+        if cue is None:
+            continue
+        entry["idealTime"] = cue.ideal
+        if cue.dropped:
+            entry["dropped"] = True
+            entry.pop("triggerTime", None)
+        else:
+            entry.pop("dropped", None)
+            entry["triggerTime"] = cue.start
+    write_json_atomic(path, data)
+    return cues
@@ -1,5 +1,4 @@
-import json
-import os
+from commentary_pipeline import AssetIndex
 
 manifest = {
     "model": "gemini-2.5-pro-preview-tts",
@@ -31,8 +30,10 @@ manifest = {
     ]
 }
 
-with open("./commentary_audio_v2/manifest.json", "w") as f:
-    json.dump(manifest, f, indent=2)
+# Audio fields (filename, duration, samples, bytes) come from the asset index
+index = AssetIndex("./commentary_audio_v2")
+index.refresh()
+index.write_manifest(manifest)
 
 print("Manifest created successfully!")
 print(f"Total clips: {manifest['total_clips']}")
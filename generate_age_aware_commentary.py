@@ -9,9 +9,6 @@ Key narrative: Skye is 10, racing against 13-14 year olds (3-4 years older)
 """
 
 import os
-import re
-import wave
-import time
 import json
 from pathlib import Path
 from dotenv import load_dotenv
@@ -19,8 +16,9 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from google import genai
-from google.genai import types
-from pydub import AudioSegment
+
+from commentary_pipeline import ClipCache, ClipRequest, GeminiBackend, JobJournal, generate_clips
+from commentary_pipeline.dialogue import DialogueBackend
 
 # Load race data
 with open("./data/race_data.json") as f:
@@ -212,63 +210,31 @@ COMMENTARY_EVENTS = [
 ]
 
 MODEL = "gemini-2.5-pro-preview-tts"
-RATE_LIMIT_DELAY = 6
-
-def save_pcm_as_wav(pcm_data: bytes, output_path: str, sample_rate: int = 24000):
-    with wave.open(output_path, 'wb') as wav_file:
-        wav_file.setnchannels(1)
-        wav_file.setsampwidth(2)
-        wav_file.setframerate(sample_rate)
-        wav_file.writeframes(pcm_data)
+RPM = 10
+CONCURRENCY = 4
 
-def generate_clip(client, event, output_dir: Path):
-    """Generate a single commentary clip."""
-    safe_name = f"commentary_{event['index']:02d}_{event['time']:.0f}s"
-    filename = f"{safe_name}.mp3"
-    output_path = output_dir / filename
-    wav_path = str(output_path).replace('.mp3', '.wav')
-    
-    full_prompt = f"{event['prompt']}\n\n{event['text']}"
-    voice = event.get('voice', 'Puck')
-    
-    try:
-        print(f"[{event['index']:02d}] {event['speaker']:6s}: {event['text'][:50]}...", end=" ", flush=True)
-        
-        response = client.models.generate_content(
-            model=MODEL,
-            contents=full_prompt,
-            config=types.GenerateContentConfig(
-                response_modalities=["AUDIO"],
-                speech_config=types.SpeechConfig(
-                    voice_config=types.VoiceConfig(
-                        prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                            voice_name=voice
-                        )
-                    )
-                )
-            )
-        )
-        
-        if not response.candidates or not response.candidates[0].content.parts:
-            print("✗ No audio")
-            return False
-            
-        audio_data = response.candidates[0].content.parts[0].inline_data.data
-        
-        save_pcm_as_wav(audio_data, wav_path)
-        audio = AudioSegment.from_wav(wav_path)
-        audio.export(str(output_path), format="mp3")
-        os.remove(wav_path)
-        
-        duration_sec = len(audio) / 1000
-        print(f"✓ ({duration_sec:.1f}s)")
-        return True
-        
-    except Exception as e:
-        print(f"✗ Error: {e}")
-        return False
+def build_request(event) -> ClipRequest:
+    """Turn a commentary event into a synthesis request."""
+    return ClipRequest(
+        index=event['index'],
+        filename=f"commentary_{event['index']:02d}_{event['time']:.0f}s.mp3",
+        text=event['text'],
+        voice=event.get('voice', 'Puck'),
+        speaker=event['speaker'],
+        prompt=event['prompt'],
+        time=event['time'],
+        label=f"{event['speaker']:6s}",
+    )
 
 def main():
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--multi-speaker", action="store_true",
+                        help="Synthesize each exchange in one multi-speaker request and split it per event")
+    parser.add_argument("--exchange", type=int, default=None,
+                        help="Lines per multi-speaker request (default: the whole race)")
+    args = parser.parse_args()
+    
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
         print("Error: GEMINI_API_KEY not found")
@@ -276,19 +242,28 @@ def main():
     
     client = genai.Client(api_key=api_key)
     output_dir = Path("commentary_age_aware")
-    output_dir.mkdir(parents=True, exist_ok=True)
     
     print("Generating Age-Aware Dual Commentary")
     print("Jim (Play-by-Play) + Sarah (Elite Coach)")
     print(f"Race Context: 10-year-old vs 13-14 year olds")
     print("-" * 80)
     
-    success_count = 0
-    for i, event in enumerate(COMMENTARY_EVENTS):
-        if generate_clip(client, event, output_dir):
-            success_count += 1
-        if i < len(COMMENTARY_EVENTS) - 1:
-            time.sleep(RATE_LIMIT_DELAY)
+    requests = [build_request(e) for e in COMMENTARY_EVENTS]
+    backend = GeminiBackend(client, MODEL)
+    if args.multi_speaker:
+        backend = DialogueBackend(backend, requests, exchange_size=args.exchange)
+        print(f"Multi-speaker mode: {len(backend.exchanges)} requests for {len(requests)} clips")
+    
+    results = generate_clips(
+        requests,
+        output_dir,
+        backend,
+        rpm=RPM,
+        concurrency=CONCURRENCY,
+        cache=ClipCache(),
+        journal=JobJournal.for_dir(output_dir),
+    )
+    success_count = sum(r.ok for r in results)
     
     print("-" * 80)
     print(f"Done! Generated {success_count}/{len(COMMENTARY_EVENTS)} clips")
@@ -302,8 +277,8 @@ def main():
         "total_clips": len(COMMENTARY_EVENTS),
         "generated": success_count,
         "files": [{"index": e["index"], "time": e["time"], "speaker": e["speaker"], 
-                   "text": e["text"], "subjectId": e["subjectId"]} 
-                  for e in COMMENTARY_EVENTS]
+                   "text": e["text"], "subjectId": e["subjectId"], **r.audio_fields()} 
+                  for e, r in zip(COMMENTARY_EVENTS, results)]
     }
     
     manifest_path = output_dir / "manifest.json"
@@ -6,19 +6,18 @@ Commentary is precisely timed to match actual race events from split data
 
 import os
 import json
-import wave
-import time
 from pathlib import Path
 from dotenv import load_dotenv
 
 load_dotenv()
 
 from google import genai
-from google.genai import types
-from pydub import AudioSegment
+
+from commentary_pipeline import ClipCache, ClipRequest, GeminiBackend, JobJournal, generate_clips
 
 MODEL = "gemini-2.5-flash-preview-tts"
-RATE_LIMIT_DELAY = 9  # Stay under 7 RPM limit
+RPM = 7  # Stay under 7 RPM limit
+CONCURRENCY = 4
 VOICE = "Puck"
 
 # Race data - actual split times
@@ -215,54 +214,17 @@ COMMENTARY_EVENTS = [
     }
 ]
 
-def save_pcm_as_wav(pcm_data, output_path, sample_rate=24000):
-    with wave.open(output_path, 'wb') as wav_file:
-        wav_file.setnchannels(1)
-        wav_file.setsampwidth(2)
-        wav_file.setframerate(sample_rate)
-        wav_file.writeframes(pcm_data)
-
-def generate_clip(client, event, output_dir):
-    filename = f"commentary_{event['index']:02d}_{event['trigger_time']:.0f}s.mp3"
-    output_path = output_dir / filename
-    wav_path = str(output_path).replace('.mp3', '.wav')
-    
-    full_prompt = f"{event['prompt']}\n\n{event['text']}"
-    
-    try:
-        print(f"[{event['index']:02d}] t={event['trigger_time']:3.0f}s: {event['text'][:45]}...", end=" ", flush=True)
-        
-        response = client.models.generate_content(
-            model=MODEL,
-            contents=full_prompt,
-            config=types.GenerateContentConfig(
-                response_modalities=["AUDIO"],
-                speech_config=types.SpeechConfig(
-                    voice_config=types.VoiceConfig(
-                        prebuilt_voice_config=types.PrebuiltVoiceConfig(voice_name=VOICE)
-                    )
-                )
-            )
-        )
-        
-        if not response.candidates or not response.candidates[0].content.parts:
-            print("✗ No audio")
-            return False, 0
-            
-        audio_data = response.candidates[0].content.parts[0].inline_data.data
-        
-        save_pcm_as_wav(audio_data, wav_path)
-        audio = AudioSegment.from_wav(wav_path)
-        audio.export(str(output_path), format="mp3")
-        os.remove(wav_path)
-        
-        duration_sec = len(audio) / 1000
-        print(f"✓ ({duration_sec:.1f}s)")
-        return True, duration_sec
-        
-    except Exception as e:
-        print(f"✗ {e}")
-        return False, 0
+def build_request(event) -> ClipRequest:
+    """Turn a commentary event into a synthesis request."""
+    return ClipRequest(
+        index=event['index'],
+        filename=f"commentary_{event['index']:02d}_{event['trigger_time']:.0f}s.mp3",
+        text=event['text'],
+        voice=VOICE,
+        prompt=event['prompt'],
+        time=event['trigger_time'],
+        label=f"t={event['trigger_time']:3.0f}s",
+    )
 
 def main():
     api_key = os.getenv("GEMINI_API_KEY")
@@ -272,29 +234,35 @@ def main():
     
     client = genai.Client(api_key=api_key)
     output_dir = Path("commentary_aligned")
-    output_dir.mkdir(parents=True, exist_ok=True)
     
     print(f"Generating {len(COMMENTARY_EVENTS)} race-aligned clips with {MODEL}")
-    print(f"Voice: {VOICE} | Delay: {RATE_LIMIT_DELAY}s between calls")
+    print(f"Voice: {VOICE} | Rate limit: {RPM} RPM, up to {CONCURRENCY} concurrent")
     print("-" * 80)
     
-    success_count = 0
-    manifest = []
+    results = generate_clips(
+        [build_request(e) for e in COMMENTARY_EVENTS],
+        output_dir,
+        GeminiBackend(client, MODEL),
+        rpm=RPM,
+        concurrency=CONCURRENCY,
+        cache=ClipCache(),
+        journal=JobJournal.for_dir(output_dir),
+    )
     
-    for i, event in enumerate(COMMENTARY_EVENTS):
-        success, duration = generate_clip(client, event, output_dir)
-        if success:
-            success_count += 1
+    manifest = []
+    for event, result in zip(COMMENTARY_EVENTS, results):
+        if result.ok:
             manifest.append({
                 "index": event["index"],
                 "trigger_time": event["trigger_time"],
                 "subject_id": event["subject_id"],
                 "text": event["text"],
-                "duration": duration,
-                "filename": f"commentary_{event['index']:02d}_{event['trigger_time']:.0f}s.mp3"
+                "duration": result.duration_sec,
+                "samples": result.samples,
+                "bytes": result.bytes,
+                "filename": result.request.filename
             })
-        if i < len(COMMENTARY_EVENTS) - 1:
-            time.sleep(RATE_LIMIT_DELAY)
+    success_count = len(manifest)
     
     print("-" * 80)
     print(f"Done! Generated {success_count}/{len(COMMENTARY_EVENTS)} clips")
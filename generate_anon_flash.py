@@ -6,19 +6,18 @@ Using existing API key - 82 requests available (18/100 RPD used)
 
 import os
 import json
-import wave
-import time
 from pathlib import Path
 from dotenv import load_dotenv
 
 load_dotenv()
 
 from google import genai
-from google.genai import types
-from pydub import AudioSegment
+
+from commentary_pipeline import ClipCache, ClipRequest, GeminiBackend, JobJournal, generate_clips
 
 MODEL = "gemini-2.5-flash-preview-tts"  # Has 82 requests remaining
-RATE_LIMIT_DELAY = 9  # Stay under 7 RPM limit
+RPM = 7  # Stay under 7 RPM limit
+CONCURRENCY = 4
 
 VOICE = "Puck"  # Energetic announcer voice
 
@@ -48,57 +47,16 @@ COMMENTARY_EVENTS = [
     { "index": 21, "time": 198, "text": "What a race. From Melodi's dominant front-running to Skye's brilliant negative split. Two different strategies, both executed beautifully.", "prompt": "You are wrapping up with appreciation. Celebratory, satisfied." }
 ]
 
-def save_pcm_as_wav(pcm_data, output_path, sample_rate=24000):
-    with wave.open(output_path, 'wb') as wav_file:
-        wav_file.setnchannels(1)
-        wav_file.setsampwidth(2)
-        wav_file.setframerate(sample_rate)
-        wav_file.writeframes(pcm_data)
-
-def generate_clip(client, event, output_dir):
-    safe_name = f"commentary_{event['index']:02d}_{event['time']:.0f}s"
-    filename = f"{safe_name}.mp3"
-    output_path = output_dir / filename
-    wav_path = str(output_path).replace('.mp3', '.wav')
-    
-    full_prompt = f"{event['prompt']}\n\n{event['text']}"
-    
-    try:
-        print(f"[{event['index']:02d}] {event['text'][:45]}...", end=" ", flush=True)
-        
-        response = client.models.generate_content(
-            model=MODEL,
-            contents=full_prompt,
-            config=types.GenerateContentConfig(
-                response_modalities=["AUDIO"],
-                speech_config=types.SpeechConfig(
-                    voice_config=types.VoiceConfig(
-                        prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                            voice_name=VOICE
-                        )
-                    )
-                )
-            )
-        )
-        
-        if not response.candidates or not response.candidates[0].content.parts:
-            print("✗ No audio")
-            return False
-            
-        audio_data = response.candidates[0].content.parts[0].inline_data.data
-        
-        save_pcm_as_wav(audio_data, wav_path)
-        audio = AudioSegment.from_wav(wav_path)
-        audio.export(str(output_path), format="mp3")
-        os.remove(wav_path)
-        
-        duration_sec = len(audio) / 1000
-        print(f"✓ ({duration_sec:.1f}s)")
-        return True
-        
-    except Exception as e:
-        print(f"✗ {e}")
-        return False
+def build_request(event) -> ClipRequest:
+    """Turn a commentary event into a synthesis request."""
+    return ClipRequest(
+        index=event['index'],
+        filename=f"commentary_{event['index']:02d}_{event['time']:.0f}s.mp3",
+        text=event['text'],
+        voice=VOICE,
+        prompt=event['prompt'],
+        time=event['time'],
+    )
 
 def main():
     api_key = os.getenv("GEMINI_API_KEY")
@@ -108,18 +66,21 @@ def main():
     
     client = genai.Client(api_key=api_key)
     output_dir = Path("commentary_anonymized")
-    output_dir.mkdir(parents=True, exist_ok=True)
     
     print(f"Generating {len(COMMENTARY_EVENTS)} anonymized clips with {MODEL}")
-    print(f"Voice: {VOICE} | Delay: {RATE_LIMIT_DELAY}s between calls")
+    print(f"Voice: {VOICE} | Rate limit: {RPM} RPM, up to {CONCURRENCY} concurrent")
     print("-" * 70)
     
-    success_count = 0
-    for i, event in enumerate(COMMENTARY_EVENTS):
-        if generate_clip(client, event, output_dir):
-            success_count += 1
-        if i < len(COMMENTARY_EVENTS) - 1:
-            time.sleep(RATE_LIMIT_DELAY)
+    results = generate_clips(
+        [build_request(e) for e in COMMENTARY_EVENTS],
+        output_dir,
+        GeminiBackend(client, MODEL),
+        rpm=RPM,
+        concurrency=CONCURRENCY,
+        cache=ClipCache(),
+        journal=JobJournal.for_dir(output_dir),
+    )
+    success_count = sum(r.ok for r in results)
     
     print("-" * 70)
     print(f"Done! Generated {success_count}/{len(COMMENTARY_EVENTS)} clips")
@@ -131,7 +92,7 @@ def main():
         "removed_pii": ["surnames", "venues", "team_names", "meet_names"],
         "total_clips": len(COMMENTARY_EVENTS),
         "generated": success_count,
-        "files": [{"index": e["index"], "time": e["time"], "text": e["text"]} for e in COMMENTARY_EVENTS]
+        "files": [{"index": e["index"], "time": e["time"], "text": e["text"], **r.audio_fields()} for e, r in zip(COMMENTARY_EVENTS, results)]
     }
     
     with open(output_dir / "manifest.json", "w") as f:
@@ -4,9 +4,6 @@ Regenerate commentary audio with cleaned text (no fake data)
 """
 
 import os
-import re
-import wave
-import time
 import json
 from pathlib import Path
 from dotenv import load_dotenv
@@ -14,8 +11,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from google import genai
-from google.genai import types
-from pydub import AudioSegment
+
+from commentary_pipeline import ClipCache, ClipRequest, GeminiBackend, JobJournal, generate_clips
 
 # Clean commentary - NO fake data (turnover, form, lactate, etc.)
 # Based ONLY on: splits, positions, gaps, pacing strategy
@@ -51,60 +48,19 @@ COMMENTARY_EVENTS = [
 ]
 
 MODEL = "gemini-2.5-pro-preview-tts"
-RATE_LIMIT_DELAY = 6
-
-def save_pcm_as_wav(pcm_data, output_path, sample_rate=24000):
-    with wave.open(output_path, 'wb') as wav_file:
-        wav_file.setnchannels(1)
-        wav_file.setsampwidth(2)
-        wav_file.setframerate(sample_rate)
-        wav_file.writeframes(pcm_data)
+RPM = 10
+CONCURRENCY = 4
 
-def generate_clip(client, event, output_dir):
-    safe_name = f"commentary_{event['index']:02d}_{event['time']:.0f}s"
-    filename = f"{safe_name}.mp3"
-    output_path = output_dir / filename
-    wav_path = str(output_path).replace('.mp3', '.wav')
-    
-    full_prompt = f"{event['prompt']}\n\n{event['text']}"
-    voice = event.get('voice', 'Puck')
-    
-    try:
-        print(f"[{event['index']:02d}] {voice}: {event['text'][:50]}...", end=" ", flush=True)
-        
-        response = client.models.generate_content(
-            model=MODEL,
-            contents=full_prompt,
-            config=types.GenerateContentConfig(
-                response_modalities=["AUDIO"],
-                speech_config=types.SpeechConfig(
-                    voice_config=types.VoiceConfig(
-                        prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                            voice_name=voice
-                        )
-                    )
-                )
-            )
-        )
-        
-        if not response.candidates or not response.candidates[0].content.parts:
-            print("✗ No audio")
-            return False
-            
-        audio_data = response.candidates[0].content.parts[0].inline_data.data
-        
-        save_pcm_as_wav(audio_data, wav_path)
-        audio = AudioSegment.from_wav(wav_path)
-        audio.export(str(output_path), format="mp3")
-        os.remove(wav_path)
-        
-        duration_sec = len(audio) / 1000
-        print(f"✓ ({duration_sec:.1f}s)")
-        return True
-        
-    except Exception as e:
-        print(f"✗ Error: {e}")
-        return False
+def build_request(event) -> ClipRequest:
+    """Turn a commentary event into a synthesis request."""
+    return ClipRequest(
+        index=event['index'],
+        filename=f"commentary_{event['index']:02d}_{event['time']:.0f}s.mp3",
+        text=event['text'],
+        voice=event.get('voice', 'Puck'),
+        prompt=event['prompt'],
+        time=event['time'],
+    )
 
 def main():
     api_key = os.getenv("GEMINI_API_KEY")
@@ -114,19 +70,22 @@ def main():
     
     client = genai.Client(api_key=api_key)
     output_dir = Path("commentary_final")
-    output_dir.mkdir(parents=True, exist_ok=True)
     
     print("Generating CLEAN commentary - NO fake data")
     print("Removed: turnover, lactate, form breakdown, aerobic strength")
     print("Keeping: splits, positions, gaps, pacing strategy only")
     print("-" * 80)
     
-    success_count = 0
-    for i, event in enumerate(COMMENTARY_EVENTS):
-        if generate_clip(client, event, output_dir):
-            success_count += 1
-        if i < len(COMMENTARY_EVENTS) - 1:
-            time.sleep(RATE_LIMIT_DELAY)
+    results = generate_clips(
+        [build_request(e) for e in COMMENTARY_EVENTS],
+        output_dir,
+        GeminiBackend(client, MODEL),
+        rpm=RPM,
+        concurrency=CONCURRENCY,
+        cache=ClipCache(),
+        journal=JobJournal.for_dir(output_dir),
+    )
+    success_count = sum(r.ok for r in results)
     
     print("-" * 80)
     print(f"Done! Generated {success_count}/{len(COMMENTARY_EVENTS)} clips")
@@ -139,8 +98,8 @@ def main():
         "kept": ["splits", "positions", "gaps", "pacing_strategy"],
         "total_clips": len(COMMENTARY_EVENTS),
         "generated": success_count,
-        "files": [{"index": e["index"], "time": e["time"], "text": e["text"], "voice": e["voice"]} 
-                  for e in COMMENTARY_EVENTS]
+        "files": [{"index": e["index"], "time": e["time"], "text": e["text"], "voice": e["voice"], **r.audio_fields()} 
+                  for e, r in zip(COMMENTARY_EVENTS, results)]
     }
     
     manifest_path = output_dir / "manifest.json"
@@ -17,6 +17,8 @@ load_dotenv()
 
 from google.cloud import texttospeech
 
+from commentary_pipeline.spoken import normalize_text
+
 # Commentary events from the race replay
 COMMENTARY_EVENTS = [
     { "time": 0, "text": "Runners are at the line... The gun goes off! Clean start.", "subjectId": None },
@@ -81,8 +83,9 @@ def generate_commentary_audio(output_dir: Path, voice_key: str = "energetic_male
         filename = f"commentary_{i:02d}_{event['time']:.1f}s.mp3"
         output_path = output_dir / filename
         
-        # Add SSML for emphasis and pauses where appropriate
-        text = event['text']
+        # Add SSML for emphasis and pauses where appropriate. Times and
+        # distances are spelled out so "2:21.58" isn't read as a clock time.
+        text = normalize_text(event['text'])
         if '!' in text or 'Winner' in text or 'PR' in text:
             # Excited delivery for climactic moments
             ssml = f'''<speak>
@@ -9,8 +9,6 @@ Outputs MP3 files that can be synced with the race replay.
 import os
 import json
 import re
-import wave
-import time
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -18,8 +16,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from google import genai
-from google.genai import types
-from pydub import AudioSegment
+
+from commentary_pipeline import ClipCache, ClipRequest, GeminiBackend, JobJournal, generate_clips, mp3_info
 
 # Commentary events from the race replay
 COMMENTARY_EVENTS = [
@@ -41,7 +39,8 @@ COMMENTARY_EVENTS = [
 
 # Gemini TTS Configuration
 MODEL = "gemini-2.5-flash-preview-tts"  # or gemini-2.5-pro-preview-tts
-RATE_LIMIT_DELAY = 4  # seconds between API calls
+RPM = 15  # requests per minute
+CONCURRENCY = 4
 
 # Voice personalities
 VOICE_PERSONALITIES = {
@@ -64,13 +63,22 @@ VOICE_PERSONALITIES = {
 }
 
 
-def save_pcm_as_wav(pcm_data: bytes, output_path: str, sample_rate: int = 24000):
-    """Convert PCM to WAV."""
-    with wave.open(output_path, 'wb') as wav_file:
-        wav_file.setnchannels(1)
-        wav_file.setsampwidth(2)
-        wav_file.setframerate(sample_rate)
-        wav_file.writeframes(pcm_data)
+def clip_filename(i: int, event: dict) -> str:
+    safe_name = re.sub(r'[^\w\s-]', '', event['text'][:30]).replace(' ', '_')
+    return f"commentary_{i:02d}_{event['time']:.1f}s_{safe_name}.mp3"
+
+
+def manifest_entry(i: int, event: dict, filename: str, duration_sec: float, samples: int, size: int) -> dict:
+    return {
+        "index": i,
+        "time": event["time"],
+        "text": event["text"],
+        "filename": filename,
+        "duration_sec": round(duration_sec, 3),
+        "samples": samples,
+        "bytes": size,
+        "subjectId": event["subjectId"]
+    }
 
 
 def generate_commentary_audio(output_dir: Path, personality: str = "excited_announcer"):
@@ -99,83 +107,51 @@ def generate_commentary_audio(output_dir: Path, personality: str = "excited_anno
     
     print(f"Generating {len(COMMENTARY_EVENTS)} commentary clips...")
     print(f"Voice: {voice_config['voice']} ({personality})")
-    print(f"Rate limit: {RATE_LIMIT_DELAY}s between calls")
+    print(f"Rate limit: {RPM} RPM, up to {CONCURRENCY} concurrent")
     print("-" * 60)
     
+    pending = []
     for i, event in enumerate(COMMENTARY_EVENTS):
-        safe_name = re.sub(r'[^\w\s-]', '', event['text'][:30]).replace(' ', '_')
-        filename = f"commentary_{i:02d}_{event['time']:.1f}s_{safe_name}.mp3"
+        filename = clip_filename(i, event)
         output_path = output_dir / filename
-        wav_path = str(output_path).replace('.mp3', '.wav')
         
         # Skip if already exists
         if output_path.stem in existing_files:
             print(f"  [{i+1:02d}/{len(COMMENTARY_EVENTS)}] {event['text'][:50]}... ✓ (exists)")
-            # Get duration from existing file
-            audio = AudioSegment.from_mp3(output_path)
-            manifest["files"].append({
-                "index": i,
-                "time": event["time"],
-                "text": event["text"],
-                "filename": filename,
-                "duration_sec": len(audio) / 1000,
-                "subjectId": event["subjectId"]
-            })
+            # Get duration from the existing file's MP3 headers
+            info = mp3_info(output_path)
+            manifest["files"].append(
+                manifest_entry(i, event, filename, info["duration_sec"], info["samples"], info["bytes"])
+            )
             continue
         
-        # Build prompt with personality
-        prompt = f"{voice_config['prompt']}\n\n{event['text']}"
-        
-        try:
-            print(f"  [{i+1:02d}/{len(COMMENTARY_EVENTS)}] {event['text'][:50]}...", end=" ", flush=True)
-            
-            response = client.models.generate_content(
-                model=MODEL,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_modalities=["AUDIO"],
-                    speech_config=types.SpeechConfig(
-                        voice_config=types.VoiceConfig(
-                            prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                                voice_name=voice_config["voice"]
-                            )
-                        )
-                    )
-                )
+        pending.append(ClipRequest(
+            index=i,
+            filename=filename,
+            text=event["text"],
+            voice=voice_config["voice"],
+            prompt=voice_config["prompt"],
+            time=event["time"],
+            label=f"{i+1:02d}/{len(COMMENTARY_EVENTS)}",
+        ))
+    
+    results = generate_clips(
+        pending,
+        output_dir,
+        GeminiBackend(client, MODEL),
+        rpm=RPM,
+        concurrency=CONCURRENCY,
+        cache=ClipCache(),
+        journal=JobJournal.for_dir(output_dir),
+    )
+    for result in results:
+        if result.ok:
+            i = result.request.index
+            manifest["files"].append(
+                manifest_entry(i, COMMENTARY_EVENTS[i], result.request.filename,
+                               result.duration_sec, result.samples, result.bytes)
             )
-            
-            # Check if response has audio data
-            if not response.candidates or not response.candidates[0].content.parts:
-                print(f"✗ No audio data received")
-                continue
-                
-            audio_data = response.candidates[0].content.parts[0].inline_data.data
-            
-            # Convert PCM -> WAV -> MP3
-            save_pcm_as_wav(audio_data, wav_path)
-            audio = AudioSegment.from_wav(wav_path)
-            audio.export(str(output_path), format="mp3")
-            os.remove(wav_path)
-            
-            duration_sec = len(audio) / 1000
-            print(f"✓ ({duration_sec:.1f}s)")
-            
-            manifest["files"].append({
-                "index": i,
-                "time": event["time"],
-                "text": event["text"],
-                "filename": filename,
-                "duration_sec": duration_sec,
-                "subjectId": event["subjectId"]
-            })
-            
-            # Rate limiting
-            if i < len(COMMENTARY_EVENTS) - 1:
-                time.sleep(RATE_LIMIT_DELAY)
-                
-        except Exception as e:
-            print(f"✗ Error: {e}")
-            continue
+    manifest["files"].sort(key=lambda f: f["index"])
     
     # Save manifest
     manifest_path = output_dir / "commentary_manifest.json"
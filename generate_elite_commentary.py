@@ -12,17 +12,15 @@ High-level coach/sportscaster perspective with:
 """
 
 import os
-import re
-import wave
-import time
+import json
 from pathlib import Path
 from dotenv import load_dotenv
 
 load_dotenv()
 
 from google import genai
-from google.genai import types
-from pydub import AudioSegment
+
+from commentary_pipeline import ClipCache, ClipRequest, GeminiBackend, JobJournal, generate_clips
 
 # Elite sportscaster commentary - builds excitement, analytical insights
 COMMENTARY_EVENTS = [
@@ -197,90 +195,47 @@ COMMENTARY_EVENTS = [
 ]
 
 MODEL = "gemini-2.5-pro-preview-tts"
-RATE_LIMIT_DELAY = 6
+RPM = 10
+CONCURRENCY = 4
+TIMING_PATH = Path("./data/commentary_timing.json")
 
-def save_pcm_as_wav(pcm_data: bytes, output_path: str, sample_rate: int = 24000):
-    with wave.open(output_path, 'wb') as wav_file:
-        wav_file.setnchannels(1)
-        wav_file.setsampwidth(2)
-        wav_file.setframerate(sample_rate)
-        wav_file.writeframes(pcm_data)
+# Speaking pace instruction appended to the prompt, by excitement level
+PACE_INSTRUCTIONS = {
+    'calm': 'Speak at a normal, measured pace.',
+    'analytical': 'Speak clearly with slight urgency.',
+    'appreciative': 'Warm tone, moderate pace.',
+    'observational': 'Engaged, slightly faster pace.',
+    'building': 'Building energy, speak faster.',
+    'impressed': 'Genuine appreciation, faster delivery.',
+    'intense': 'High focus, quick delivery.',
+    'excited': 'Fast pace, genuine enthusiasm.',
+    'very_excited': 'Very fast pace, maximum energy.',
+    'celebratory': 'Celebratory energy, quick delivery.',
+    'maximum': 'Absolute maximum energy and speed. Speak as fast as naturally possible while remaining clear.'
+}
 
-def generate_clip(client, event, output_dir: Path):
-    """Generate a single commentary clip with appropriate personality."""
-    safe_name = f"commentary_{event['index']:02d}_{event['time']:.1f}s"
-    filename = f"{safe_name}.mp3"
-    output_path = output_dir / filename
-    wav_path = str(output_path).replace('.mp3', '.wav')
-    
-    # Build prompt based on excitement level
-    base_prompt = event.get('prompt', 'You are a professional track and field sportscaster.')
-    
-    # Add speaking pace instruction based on excitement
-    pace_instructions = {
-        'calm': 'Speak at a normal, measured pace.',
-        'analytical': 'Speak clearly with slight urgency.',
-        'appreciative': 'Warm tone, moderate pace.',
-        'observational': 'Engaged, slightly faster pace.',
-        'building': 'Building energy, speak faster.',
-        'impressed': 'Genuine appreciation, faster delivery.',
-        'intense': 'High focus, quick delivery.',
-        'excited': 'Fast pace, genuine enthusiasm.',
-        'very_excited': 'Very fast pace, maximum energy.',
-        'celebratory': 'Celebratory energy, quick delivery.',
-        'maximum': 'Absolute maximum energy and speed. Speak as fast as naturally possible while remaining clear.'
-    }
-    
-    excitement = event.get('excitement', 'analytical')
-    pace_instruction = pace_instructions.get(excitement, 'Speak naturally.')
-    
-    full_prompt = f"{base_prompt} {pace_instruction}\n\n{event['text']}"
-    
-    # Select voice based on excitement level
-    # Use different voices for variety
+def voice_for(excitement: str) -> str:
+    """Select voice based on excitement level, using different voices for variety."""
     if excitement in ['maximum', 'very_excited', 'celebratory']:
-        voice = "Puck"  # Energetic
-    elif excitement in ['intense', 'excited', 'building']:
-        voice = "Fenrir"  # Professional but intense
-    else:
-        voice = "Leda"  # Warm, analytical
-    
-    try:
-        print(f"[{event['index']:02d}] {excitement:15s}: {event['text'][:50]}...", end=" ", flush=True)
-        
-        response = client.models.generate_content(
-            model=MODEL,
-            contents=full_prompt,
-            config=types.GenerateContentConfig(
-                response_modalities=["AUDIO"],
-                speech_config=types.SpeechConfig(
-                    voice_config=types.VoiceConfig(
-                        prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                            voice_name=voice
-                        )
-                    )
-                )
-            )
-        )
-        
-        if not response.candidates or not response.candidates[0].content.parts:
-            print("✗ No audio data")
-            return False
-            
-        audio_data = response.candidates[0].content.parts[0].inline_data.data
-        
-        save_pcm_as_wav(audio_data, wav_path)
-        audio = AudioSegment.from_wav(wav_path)
-        audio.export(str(output_path), format="mp3")
-        os.remove(wav_path)
-        
-        duration_sec = len(audio) / 1000
-        print(f"✓ ({duration_sec:.1f}s) [{voice}]")
-        return True
-        
-    except Exception as e:
-        print(f"✗ Error: {e}")
-        return False
+        return "Puck"  # Energetic
+    if excitement in ['intense', 'excited', 'building']:
+        return "Fenrir"  # Professional but intense
+    return "Leda"  # Warm, analytical
+
+def build_request(event) -> ClipRequest:
+    """Build a commentary clip request with appropriate personality."""
+    excitement = event.get('excitement', 'analytical')
+    return ClipRequest(
+        index=event['index'],
+        filename=f"commentary_{event['index']:02d}_{event['time']:.1f}s.mp3",
+        text=event['text'],
+        voice=voice_for(excitement),
+        prompt=event.get('prompt', 'You are a professional track and field sportscaster.'),
+        pace=PACE_INSTRUCTIONS.get(excitement, 'Speak naturally.'),
+        time=event['time'],
+        label=f"{excitement:15s}",
+        manifest={"subjectId": event['subjectId']},
+    )
 
 def main():
     api_key = os.getenv("GEMINI_API_KEY")
@@ -290,18 +245,22 @@ def main():
     
     client = genai.Client(api_key=api_key)
     output_dir = Path("commentary_audio_v2")
-    output_dir.mkdir(parents=True, exist_ok=True)
     
     print(f"Generating {len(COMMENTARY_EVENTS)} elite sportscaster commentary clips...")
-    print(f"Model: {MODEL}")
+    print(f"Model: {MODEL} | Rate limit: {RPM} RPM, up to {CONCURRENCY} concurrent")
     print("-" * 80)
     
-    success_count = 0
-    for i, event in enumerate(COMMENTARY_EVENTS):
-        if generate_clip(client, event, output_dir):
-            success_count += 1
-        if i < len(COMMENTARY_EVENTS) - 1:
-            time.sleep(RATE_LIMIT_DELAY)
+    results = generate_clips(
+        [build_request(e) for e in COMMENTARY_EVENTS],
+        output_dir,
+        GeminiBackend(client, MODEL),
+        rpm=RPM,
+        concurrency=CONCURRENCY,
+        cache=ClipCache(),
+        journal=JobJournal.for_dir(output_dir),
+        timing_path=TIMING_PATH,
+    )
+    success_count = sum(r.ok for r in results)
     
     print("-" * 80)
     print(f"Done! Generated {success_count}/{len(COMMENTARY_EVENTS)} clips")
@@ -314,14 +273,15 @@ def main():
         "total_clips": len(COMMENTARY_EVENTS),
         "generated": success_count,
         "files": [{"index": e["index"], "time": e["time"], "text": e["text"], 
-                   "excitement": e["excitement"], "subjectId": e["subjectId"]} 
-                  for e in COMMENTARY_EVENTS]
+                   "excitement": e["excitement"], "subjectId": e["subjectId"], **r.audio_fields()} 
+                  for e, r in zip(COMMENTARY_EVENTS, results)]
     }
     
     manifest_path = output_dir / "manifest.json"
     with open(manifest_path, "w") as f:
         json.dump(manifest, f, indent=2)
     print(f"Manifest: {manifest_path}")
+    print(f"Timing: {TIMING_PATH}")
 
 if __name__ == "__main__":
     main()
@@ -5,16 +5,14 @@ Generate missing commentary audio clips (indices 3 and 10)
 
 import os
 import re
-import wave
-import time
 from pathlib import Path
 from dotenv import load_dotenv
 
 load_dotenv()
 
 from google import genai
-from google.genai import types
-from pydub import AudioSegment
+
+from commentary_pipeline import ClipCache, ClipRequest, GeminiBackend, JobJournal, generate_clips
 
 # Missing commentary events
 MISSING_EVENTS = [
@@ -23,64 +21,25 @@ MISSING_EVENTS = [
 ]
 
 MODEL = "gemini-2.5-flash-preview-tts"
-RATE_LIMIT_DELAY = 4
+RPM = 15
+CONCURRENCY = 4
 
 VOICE_CONFIG = {
     "voice": "Puck",
     "prompt": "You are an energetic track and field announcer. Speak with excitement and enthusiasm, like you're calling a championship race."
 }
 
-def save_pcm_as_wav(pcm_data: bytes, output_path: str, sample_rate: int = 24000):
-    with wave.open(output_path, 'wb') as wav_file:
-        wav_file.setnchannels(1)
-        wav_file.setsampwidth(2)
-        wav_file.setframerate(sample_rate)
-        wav_file.writeframes(pcm_data)
-
-def generate_clip(client, event, output_dir):
+def build_request(event) -> ClipRequest:
     safe_name = re.sub(r'[^\w\s-]', '', event['text'][:40]).replace(' ', '_')
-    filename = f"commentary_{event['index']:02d}_{event['time']:.1f}s_{safe_name}.mp3"
-    output_path = output_dir / filename
-    wav_path = str(output_path).replace('.mp3', '.wav')
-    
-    prompt = f"{VOICE_CONFIG['prompt']}\n\n{event['text']}"
-    
-    try:
-        print(f"Generating: {event['text'][:50]}...", end=" ", flush=True)
-        
-        response = client.models.generate_content(
-            model=MODEL,
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                response_modalities=["AUDIO"],
-                speech_config=types.SpeechConfig(
-                    voice_config=types.VoiceConfig(
-                        prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                            voice_name=VOICE_CONFIG["voice"]
-                        )
-                    )
-                )
-            )
-        )
-        
-        if not response.candidates or not response.candidates[0].content.parts:
-            print("✗ No audio data")
-            return None
-            
-        audio_data = response.candidates[0].content.parts[0].inline_data.data
-        
-        save_pcm_as_wav(audio_data, wav_path)
-        audio = AudioSegment.from_wav(wav_path)
-        audio.export(str(output_path), format="mp3")
-        os.remove(wav_path)
-        
-        duration_sec = len(audio) / 1000
-        print(f"✓ ({duration_sec:.1f}s)")
-        return filename
-        
-    except Exception as e:
-        print(f"✗ Error: {e}")
-        return None
+    return ClipRequest(
+        index=event['index'],
+        filename=f"commentary_{event['index']:02d}_{event['time']:.1f}s_{safe_name}.mp3",
+        text=event['text'],
+        voice=VOICE_CONFIG["voice"],
+        prompt=VOICE_CONFIG["prompt"],
+        time=event['time'],
+        label="Generating",
+    )
 
 def main():
     api_key = os.getenv("GEMINI_API_KEY")
@@ -90,16 +49,20 @@ def main():
     
     client = genai.Client(api_key=api_key)
     output_dir = Path("commentary_audio")
-    output_dir.mkdir(parents=True, exist_ok=True)
     
     print(f"Generating {len(MISSING_EVENTS)} missing commentary clips...")
     print(f"Voice: {VOICE_CONFIG['voice']}")
     print("-" * 60)
     
-    for i, event in enumerate(MISSING_EVENTS):
-        generate_clip(client, event, output_dir)
-        if i < len(MISSING_EVENTS) - 1:
-            time.sleep(RATE_LIMIT_DELAY)
+    generate_clips(
+        [build_request(e) for e in MISSING_EVENTS],
+        output_dir,
+        GeminiBackend(client, MODEL),
+        rpm=RPM,
+        concurrency=CONCURRENCY,
+        cache=ClipCache(),
+        journal=JobJournal.for_dir(output_dir),
+    )
     
     print("-" * 60)
     print("Done!")
@@ -8,12 +8,18 @@ import {
   getTrackVisualGeometry,
   escapeHtml,
 } from "./utils.js";
+import { AudioManager } from "./audio-manager.js";
 import { SfxManager } from "./sfx-manager.js";
-import { loadHeatData } from "./heat-data.js";
+import { SoundtrackPlayer } from "./soundtrack.js";
+import { loadHeatData, loadReplayArtifacts } from "./heat-data.js";
 import { createRaceModel } from "./race-model.js";
+import { TrajectoryTimeline } from "./timeline.js";
 
 const CONFIG = {
   sfxEnabled: true,
+  // A commentary clip still waiting (the previous one is talking) this many
+  // race seconds after its trigger time is skipped rather than played late.
+  clipLateToleranceSeconds: 3,
 };
 
 const state = {
@@ -30,13 +36,29 @@ const state = {
   activeHeat: null,
   runners: [],
   raceModel: null,
+  // True when the race model plays back a precomputed timeline.bin: snapshot
+  // positions are then already governed and markers are placed directly.
+  usingTimeline: false,
   currentSnapshot: null,
+  // Generated commentary clips for the replay (AudioManager over its
+  // commentary_timing.json), played in triggerTime order from nextClipIndex.
+  commentaryAudio: null,
+  nextClipIndex: 0,
   renderLaneByRunnerId: {},
   renderProgressByRunnerId: {},
+  // Per-replay lookups built once in init/initRunners so the per-frame render
+  // path never scans the field or queries the DOM by id.
+  focusRunnerIndex: 0,
+  runnerDots: [],
+  runnerBadges: [],
+  badgedRunnerIndices: [],
+  splitCells: new Map(),
 };
 
 const sfxManager = new SfxManager();
 if (CONFIG.sfxEnabled) sfxManager.init();
+// Pre-rendered commentary + effects for the replay, when one was mixed.
+const soundtrack = new SoundtrackPlayer();
 
 const runnersLayer = document.getElementById("runnersLayer");
 const startListContainer = document.getElementById("startListContainer");
@@ -70,13 +92,13 @@ function getSnapshot() {
 }
 
 function getFocusRunner() {
-  return state.runners.find((runner) => runner.highlight) || state.runners[0] || null;
+  return state.runners[state.focusRunnerIndex] || null;
 }
 
 function getLeader() {
   const snapshot = getSnapshot();
   if (!snapshot || snapshot.leaderId == null) return null;
-  return state.runners.find((runner) => runner.id === snapshot.leaderId) || null;
+  return snapshot.getRunnerConfig(snapshot.leaderId);
 }
 
 // The 1/2/3 badges rank by TRUE race order — distance covered (officialDistance,
@@ -87,16 +109,16 @@ function getLeader() {
 // start and the lane merge decouple the visual order from the real order, so
 // ranking on pixels would drop a runner below her true placing during the merge.
 // Dropped-out runners (a DNF pacer) are excluded — they're out of the standings.
-function getRaceOrderForBadges() {
+// Returns indices into state.runners, stopping after `limit` runners.
+function getRaceOrderForBadges(limit = Infinity) {
   const snapshot = getSnapshot();
-  if (!snapshot) return [];
-  const droppedIds = new Set(
-    snapshot.runnerStates.filter((s) => s.phase === "dnf").map((s) => s.id),
-  );
-  return snapshot.orderedRunnerIds
-    .filter((id) => !droppedIds.has(id))
-    .map((id) => state.runners.find((runner) => runner.id === id))
-    .filter(Boolean);
+  const order = [];
+  if (!snapshot) return order;
+  for (const runnerIndex of snapshot.buffers.order) {
+    if (order.length >= limit) break;
+    if (snapshot.runnerStates[runnerIndex].phase !== "dnf") order.push(runnerIndex);
+  }
+  return order;
 }
 
 function getSplitSegments(snapshot = getSnapshot()) {
@@ -114,12 +136,14 @@ function renderSplitGrid() {
   if (!splitGridEl) return;
 
   splitGridEl.innerHTML = "";
+  state.splitCells = new Map();
   getSplitSegments().forEach(({ mark, label }) => {
     const cell = document.createElement("div");
     cell.dataset.state = "pending";
     cell.dataset.mark = String(mark);
     cell.innerHTML = `${escapeHtml(label)}<br><span class="text-white" data-role="split-value">--</span>`;
     splitGridEl.appendChild(cell);
+    state.splitCells.set(mark, { cell, valueEl: cell.querySelector("[data-role='split-value']") });
   });
 }
 
@@ -365,20 +389,24 @@ function updateLiveSplitsPanel() {
     ? (focusRunner.displayTime || formatTime(focusRunner.finalTime))
     : `${focusState.officialDistance.toFixed(0)}m`;
 
-  getSplitSegments(snapshot).forEach(({ mark }, index) => {
+  snapshot.event.split_marks_m.forEach((mark, index) => {
     const split = focusRunner.segmentSplits[index];
-    const cell = splitGridEl?.querySelector(`[data-mark="${mark}"]`);
+    const { cell, valueEl } = state.splitCells.get(mark) || {};
     if (!cell) return;
-    const isReached = raceComplete || focusState.checkpoints[mark];
-    const valueEl = cell.querySelector("[data-role='split-value']");
-    if (valueEl) valueEl.textContent = Number.isFinite(split) && isReached ? split.toFixed(2) : "--";
-    cell.dataset.state = isReached ? "reached" : "pending";
+    const isReached = raceComplete || focusState.officialDistance >= mark;
+    const text = Number.isFinite(split) && isReached ? split.toFixed(2) : "--";
+    if (valueEl && valueEl.textContent !== text) valueEl.textContent = text;
+    const cellState = isReached ? "reached" : "pending";
+    if (cell.dataset.state !== cellState) cell.dataset.state = cellState;
   });
 }
 
 function initRunners() {
   runnersLayer.querySelectorAll(".runner-dot").forEach((node) => node.remove());
   startListContainer.innerHTML = "";
+  state.runnerDots = [];
+  state.runnerBadges = [];
+  state.badgedRunnerIndices = [];
 
   state.runners.forEach((runner) => {
     const dot = document.createElement("div");
@@ -397,6 +425,8 @@ function initRunners() {
     dot.appendChild(badge);
 
     runnersLayer.appendChild(dot);
+    state.runnerDots.push(dot);
+    state.runnerBadges.push(badge);
 
     const medalIcon = { Gold: "🥇", Silver: "🥈", Bronze: "🥉" }[runner.medal] || "";
     const subtitleParts = [escapeHtml(runner.team)];
@@ -466,10 +496,6 @@ function updateLapUI() {
 }
 
 function updateLeaderHighlight() {
-  document.querySelectorAll(".runner-dot").forEach((dot) => {
-    dot.classList.remove("position-1", "position-2", "position-3");
-  });
-
   // Hold the 1/2/3 badges until the field has an officially-timed order to
   // show: the leader reaching the first split mark. Before that, the gaps are
   // sub-meter interpolation noise and the lane stagger still places outer-lane
@@ -479,25 +505,21 @@ function updateLeaderHighlight() {
   const snapshot = getSnapshot();
   const firstSplitMark = snapshot?.event?.split_marks_m?.[0] ?? Infinity;
   const positionsAvailable = (snapshot?.leaderDistance ?? 0) >= firstSplitMark;
-
-  if (!positionsAvailable) {
-    document.querySelectorAll(".position-badge").forEach((badge) => {
-      badge.style.display = "none";
-    });
-    return;
-  }
-
-  // Hide every badge first, then reveal only the top 3. (Hiding the complement
-  // of the top-3 isn't enough: dropped-out runners are excluded from the render
-  // order entirely, so they'd keep a stale badge from when they were leading.)
-  state.runners.forEach((runner) => {
-    const badge = document.getElementById(`badge-${runner.id}`);
+  const podium = positionsAvailable ? getRaceOrderForBadges(3) : [];
+
+  // Clear the badges shown last frame, then reveal the current top 3. (Clearing
+  // only the runners who left the top 3 isn't enough: dropped-out runners are
+  // excluded from the render order entirely, so they'd keep a stale badge from
+  // when they were leading.) Only these few runners are touched, not the field.
+  state.badgedRunnerIndices.forEach((runnerIndex) => {
+    state.runnerDots[runnerIndex]?.classList.remove("position-1", "position-2", "position-3");
+    const badge = state.runnerBadges[runnerIndex];
     if (badge) badge.style.display = "none";
   });
 
-  getRaceOrderForBadges().slice(0, 3).forEach((runner, index) => {
-    const dot = document.getElementById(`runner-${runner.id}`);
-    const badge = document.getElementById(`badge-${runner.id}`);
+  podium.forEach((runnerIndex, index) => {
+    const dot = state.runnerDots[runnerIndex];
+    const badge = state.runnerBadges[runnerIndex];
     if (!dot || !badge) return;
 
     dot.classList.add(`position-${index + 1}`);
@@ -505,11 +527,12 @@ function updateLeaderHighlight() {
     badge.className = `position-badge ${["gold", "silver", "bronze"][index]}`;
     badge.style.display = "block";
   });
+  state.badgedRunnerIndices = podium;
 }
 
 function updateFocusIndicator() {
   const focusRunner = getFocusRunner();
-  const targetRunner = focusRunner ? document.getElementById(`runner-${focusRunner.id}`) : null;
+  const targetRunner = focusRunner ? state.runnerDots[state.focusRunnerIndex] : null;
 
   if (!targetRunner) {
     focusIndicator.classList.remove("active");
@@ -521,6 +544,10 @@ function updateFocusIndicator() {
   focusIndicator.classList.add("active");
 }
 
+// Scratch points for the speed governor, refilled for every runner each frame.
+const previousPosition = { x: 0, y: 0 };
+const nextPosition = { x: 0, y: 0 };
+
 function updateRunnerPositions(deltaSeconds = 0) {
   let finishedCount = 0;
   const snapshot = getSnapshot();
@@ -536,9 +563,12 @@ function updateRunnerPositions(deltaSeconds = 0) {
   // so the cap throttles real running speed, not the user's fast-forward.
   const raceSecondsThisFrame = Math.max(0, deltaSeconds) * state.speed;
 
-  state.runners.forEach((runner) => {
-    const runnerState = snapshot.getRunnerState(runner.id);
-    const dot = document.getElementById(`runner-${runner.id}`);
+  if (state.usingTimeline) return placeRunnersFromTimeline(snapshot);
+
+  // Snapshot states are index-aligned with state.runners (the model's runners).
+  state.runners.forEach((runner, runnerIndex) => {
+    const runnerState = snapshot.runnerStates[runnerIndex];
+    const dot = state.runnerDots[runnerIndex];
 
     if (!dot || !runnerState) return;
 
@@ -548,7 +578,7 @@ function updateRunnerPositions(deltaSeconds = 0) {
       // CURRENT render lane (not lane 1) so they veer inward from where they
       // are rather than jumping laterally first; the CSS transition glides it.
       const anchorLane = state.renderLaneByRunnerId[runner.id] ?? runnerState.displayLane;
-      const dropPosition = getTrackCoordinates(runnerState.officialDistance, anchorLane, geomOptions);
+      const dropPosition = getTrackCoordinates(runnerState.officialDistance, anchorLane, geomOptions, nextPosition);
       const centerX = TRACK_CONFIG.svg.centerX;
       const centerY = (TRACK_CONFIG.svg.topY + TRACK_CONFIG.svg.bottomY) / 2;
       const infieldInset = 0.42;
@@ -580,10 +610,10 @@ function updateRunnerPositions(deltaSeconds = 0) {
     //    budget implied by the field ceiling. The budget uses this lane's
     //    average px-per-meter so the cap means the same physical speed
     //    regardless of which lane the runner is cutting across.
-    const previousPosition = getTrackCoordinates(previousVisualProgress, previousLane, geomOptions);
+    getTrackCoordinates(previousVisualProgress, previousLane, geomOptions, previousPosition);
     let nextLane = unclampedLane;
     let nextVisualProgress = unclampedVisualProgress;
-    let nextPosition = getTrackCoordinates(nextVisualProgress, nextLane, geomOptions);
+    getTrackCoordinates(nextVisualProgress, nextLane, geomOptions, nextPosition);
 
     const pxPerMeter = getLanePathLengthPx(nextLane, laneCount) / lapDistance;
     const budgetPx = maxSpeedMps * raceSecondsThisFrame * pxPerMeter;
@@ -597,7 +627,7 @@ function updateRunnerPositions(deltaSeconds = 0) {
       const scale = budgetPx / stepPx;
       nextVisualProgress = previousVisualProgress + ((unclampedVisualProgress - previousVisualProgress) * scale);
       nextLane = previousLane + ((unclampedLane - previousLane) * scale);
-      nextPosition = getTrackCoordinates(nextVisualProgress, nextLane, geomOptions);
+      getTrackCoordinates(nextVisualProgress, nextLane, geomOptions, nextPosition);
     }
 
     state.renderLaneByRunnerId[runner.id] = nextLane;
@@ -617,6 +647,40 @@ function updateRunnerPositions(deltaSeconds = 0) {
   return finishedCount;
 }
 
+// Timeline playback: the snapshot already holds each marker's drawn position
+// (lane easing, speed governor and the DNF infield park were applied offline).
+function placeRunnersFromTimeline(snapshot) {
+  let finishedCount = 0;
+  state.runners.forEach((runner, runnerIndex) => {
+    const runnerState = snapshot.runnerStates[runnerIndex];
+    const dot = state.runnerDots[runnerIndex];
+
+    if (!dot || !runnerState) return;
+
+    const position = runnerState.trackPosition;
+    dot.style.left = `${position.x}px`;
+    dot.style.top = `${position.y}px`;
+    if (runnerState.phase === "dnf") {
+      dot.style.opacity = "";
+      dot.classList.add("dnf");
+      dot.classList.remove("position-1", "position-2", "position-3");
+      dot.style.zIndex = "5";
+      return;
+    }
+    dot.classList.remove("dnf");
+    dot.style.opacity = runnerState.phase === "finished" ? "0.35" : "1";
+    dot.style.zIndex = runner.highlight ? "50" : "10";
+
+    if (runnerState.phase === "finished") {
+      finishedCount += 1;
+    }
+  });
+
+  updateLeaderHighlight();
+  updateFocusIndicator();
+  return finishedCount;
+}
+
 function getLeaderDistance() {
   return getSnapshot()?.leaderDistance || 0;
 }
@@ -655,11 +719,14 @@ function updatePositions(timestampMs) {
   const deltaSeconds = Math.max(0, (timestampMs - state.lastFrameTs) / 1000);
   state.lastFrameTs = timestampMs;
   state.raceTime += deltaSeconds * state.speed;
-  state.currentSnapshot = state.raceModel.getSnapshot(state.raceTime);
+  state.currentSnapshot = state.raceModel.getSnapshot(state.raceTime, state.currentSnapshot);
   timerEl.innerText = formatTime(state.raceTime);
+  // With a soundtrack for this speed the effects are already in the mix.
+  const liveSfx = !soundtrack.sync(state.raceTime, state.speed, true);
+  playDueCommentary(liveSfx);
 
   if (state.raceTime >= 0 && state.raceTime < 0.5 && !state.startHornPlayed) {
-    sfxManager.playStartHorn();
+    if (liveSfx) sfxManager.playStartHorn();
     state.startHornPlayed = true;
   }
 
@@ -670,7 +737,7 @@ function updatePositions(timestampMs) {
   const lapLength = state.event?.track_length_m || TRACK_CONFIG.trackLength;
   const raceDistance = state.event?.race_distance_m || TRACK_CONFIG.raceDistance;
   const bellDistance = raceDistance - lapLength;
-  if (leaderDistance >= bellDistance && state.lastLapBellDistance < bellDistance) {
+  if (leaderDistance >= bellDistance && state.lastLapBellDistance < bellDistance && liveSfx) {
     sfxManager.playLapBell();
   }
   state.lastLapBellDistance = leaderDistance;
@@ -681,8 +748,10 @@ function updatePositions(timestampMs) {
 
   const finishedCount = updateRunnerPositions(deltaSeconds);
   if (finishedCount > 0 && !state.finishPlayed) {
-    sfxManager.playFinishWhistle();
-    sfxManager.playCrowdCheer();
+    if (liveSfx) {
+      sfxManager.playFinishWhistle();
+      sfxManager.playCrowdCheer();
+    }
     state.finishPlayed = true;
   }
 
@@ -704,9 +773,52 @@ export function startRace() {
   requestAnimationFrame(updatePositions);
 }
 
+// Start the next commentary clip once race time reaches it. With a
+// soundtrack playing (live === false) its mix already has the clips, so the
+// queue just keeps up with race time.
+function playDueCommentary(live) {
+  const audio = state.commentaryAudio;
+  if (!audio) return;
+  const clips = audio.audioClips;
+  while (state.nextClipIndex < clips.length && clips[state.nextClipIndex].triggerTime <= state.raceTime) {
+    const late = state.raceTime - clips[state.nextClipIndex].triggerTime > CONFIG.clipLateToleranceSeconds;
+    if (live && !late) {
+      if (!audio.play(state.nextClipIndex)) return;
+    }
+    state.nextClipIndex += 1;
+  }
+}
+
+async function loadCommentaryAudio(artifacts) {
+  if (!artifacts.timing) return null;
+  try {
+    const response = await fetch(artifacts.timing);
+    if (!response.ok) return null;
+    const dir = artifacts.timing.slice(0, artifacts.timing.lastIndexOf("/"));
+    const clips = AudioManager.clipsFromManifest(await response.json(), dir)
+      .filter((clip) => clip.triggerTime !== null)
+      .sort((a, b) => a.triggerTime - b.triggerTime);
+    if (clips.length === 0) return null;
+    const sprite = artifacts.sprite
+      ? await AudioManager.loadSprite(artifacts.sprite).catch((e) => {
+        console.warn("Audio sprite unavailable, loading clips separately:", e.message);
+        return null;
+      })
+      : null;
+    const audio = new AudioManager(clips, { sprite });
+    audio.setSpeed(state.speed);
+    return audio;
+  } catch (error) {
+    console.warn("Commentary audio unavailable:", error.message);
+    return null;
+  }
+}
+
 export function pauseRace() {
   state.isRunning = false;
   state.lastFrameTs = null;
+  soundtrack.pause();
+  state.commentaryAudio?.stop();
   setButtonToStartResumeState();
 }
 
@@ -723,7 +835,10 @@ export function resetRace() {
   state.startHornPlayed = false;
   state.lastLapBellDistance = 0;
   state.finishPlayed = false;
-  state.currentSnapshot = state.raceModel.getSnapshot(state.raceTime);
+  soundtrack.reset();
+  state.commentaryAudio?.stop();
+  state.nextClipIndex = 0;
+  state.currentSnapshot = state.raceModel.getSnapshot(state.raceTime, state.currentSnapshot);
   state.renderLaneByRunnerId = {};
   state.renderProgressByRunnerId = {};
 
@@ -743,10 +858,11 @@ export function resetRace() {
     cell.dataset.state = "pending";
   });
 
-  state.runners.forEach((runner) => {
-    const runnerState = state.currentSnapshot.getRunnerState(runner.id);
-    const dot = document.getElementById(`runner-${runner.id}`);
-    const badge = document.getElementById(`badge-${runner.id}`);
+  state.badgedRunnerIndices = [];
+  state.runners.forEach((runner, runnerIndex) => {
+    const runnerState = state.currentSnapshot.runnerStates[runnerIndex];
+    const dot = state.runnerDots[runnerIndex];
+    const badge = state.runnerBadges[runnerIndex];
 
     if (dot && runnerState) {
       state.renderLaneByRunnerId[runner.id] = runnerState.displayLane;
@@ -781,6 +897,8 @@ if (speedSlider) {
   speedSlider.addEventListener("input", (event) => {
     state.speed = parseFloat(event.target.value);
     speedDisplay.innerText = `${state.speed}x`;
+    // Clips with a time-stretched copy for this speed switch to it.
+    state.commentaryAudio?.setSpeed(state.speed);
   });
 }
 
@@ -791,11 +909,22 @@ async function init() {
   state.event = replayData.event;
   state.activeHeat = replayData.activeHeat;
   state.runners = replayData.runners;
+  state.focusRunnerIndex = Math.max(0, state.runners.findIndex((runner) => runner.highlight));
+  const artifacts = await loadReplayArtifacts(state.replayId);
+  if (artifacts.soundtrack) soundtrack.load(artifacts.soundtrack);
+  state.commentaryAudio = await loadCommentaryAudio(artifacts);
   // Reshape the oval before anything reads its geometry (the snapshot positions
   // runners, the outline/markers are drawn from svg{}). Outdoor 400m → realistic
   // long-straight oval; indoor 200m → unchanged stylised oval.
   configureTrackGeometry(state.event);
   state.raceModel = createRaceModel(state.event, state.runners);
+  // Prefer the replay's precomputed trajectory timeline when one was built
+  // (python -m commentary_pipeline timeline); otherwise model it live.
+  const timeline = artifacts.timeline ? await TrajectoryTimeline.load(artifacts.timeline) : null;
+  state.usingTimeline = state.raceModel.useTimeline(timeline);
+  if (timeline && !state.usingTimeline) {
+    console.warn("timeline.json does not match this replay's runners or track; modelling it live");
+  }
   state.currentSnapshot = state.raceModel.getSnapshot(0);
 
   updateHeatMeta();
@@ -8,30 +8,168 @@ export class AudioManager {
     this.onEndedCallback = null;
     this.onErrorCallback = null;
 
+    // Optional { table, dir }: sprite.json from the pipeline's sprite command
+    // and the directory it lives in. Clips then play as sub-ranges of one file.
+    this.sprite = options.sprite || null;
+    this.spriteAudio = null;
+    this.spriteBuffer = null;
+    this.spriteSource = null;
+    this.spriteStopAt = null;
+    this.audioContext = null;
+
+    // Playback speed of the race; clips with time-stretched copies
+    // (clip.speeds [{ speed, file }]) play the one made for it.
+    this.speed = 1;
+    this.speedElements = {};
+
     if (this.enabled) {
       this.preload();
     }
   }
 
+  static async loadSprite(url) {
+    const response = await fetch(url);
+    if (!response.ok) throw new Error(`Sprite table ${url}: HTTP ${response.status}`);
+    return { table: await response.json(), dir: url.slice(0, url.lastIndexOf("/")) || "." };
+  }
+
+  // Clips from a ladder manifest list encodings smallest first as
+  // clip.variants [{ file, mime, bytes }]; use the smallest one this browser
+  // can play, falling back to clip.file.
+  static pickSource(clip, probe = new Audio()) {
+    const variants = (clip.variants || [])
+      .filter((v) => v.file && (!v.mime || probe.canPlayType(v.mime) !== ""))
+      .sort((a, b) => (a.bytes ?? Infinity) - (b.bytes ?? Infinity));
+    if (variants.length === 0) return clip.file;
+    const dir = clip.file ? clip.file.slice(0, clip.file.lastIndexOf("/") + 1) : "";
+    return variants[0].file.includes("/") ? variants[0].file : dir + variants[0].file;
+  }
+
+  // AUDIO_CLIPS-style entries from a pipeline manifest.json or
+  // commentary_timing.json in `dir`. triggerTime is the scheduled race time
+  // (timing files) or the event time (manifests); dropped clips are left out.
+  static clipsFromManifest(manifest, dir) {
+    return (manifest.files || manifest.commentaryTiming || [])
+      .filter((f) => f.filename && !f.dropped)
+      .map((f) => ({
+        file: `${dir}/${f.filename}`,
+        text: f.text,
+        subjectId: f.subjectId ?? null,
+        triggerTime: f.triggerTime ?? f.time ?? null,
+        variants: (f.variants || []).map((v) => ({ ...v, file: `${dir}/${v.file}` })),
+        speeds: (f.speeds || []).map((v) => ({ ...v, file: `${dir}/${v.file}` })),
+      }));
+  }
+
   preload() {
+    this.preloadSpeeds();
+    if (this.sprite) {
+      this.preloadSprite();
+      return;
+    }
+    const probe = new Audio();
     this.audioClips.forEach((clip, idx) => {
-      const audio = new Audio(clip.file);
+      const audio = new Audio(AudioManager.pickSource(clip, probe));
       audio.preload = "auto";
-      audio.onended = () => {
-        this.isPlaying = false;
-        this.currentAudioIdx = -1;
-        if (this.onEndedCallback) this.onEndedCallback();
-      };
+      audio.onended = () => this.handleEnded();
       audio.onerror = (e) => {
         console.warn(`Audio load error for clip ${idx}:`, e);
-        this.isPlaying = false;
-        this.currentAudioIdx = -1;
-        if (this.onErrorCallback) this.onErrorCallback(e);
+        this.handleError(e);
       };
       this.audioElements[idx] = audio;
     });
   }
 
+  // Time-stretched copies are loaded up front too, so the first clip after a
+  // fast-forward doesn't wait on a fetch. Sprite mode plays them the same way:
+  // the sprite only holds the 1x audio.
+  preloadSpeeds() {
+    this.audioClips.forEach((clip, idx) => {
+      (clip.speeds || []).forEach((variant) => {
+        const audio = new Audio(variant.file);
+        audio.preload = "auto";
+        audio.onended = () => this.handleEnded();
+        audio.onerror = (e) => {
+          console.warn(`Audio load error for clip ${idx} at ${variant.speed}x:`, e);
+          this.handleError(e);
+        };
+        this.speedElements[`${idx}@${variant.speed}`] = audio;
+      });
+    });
+  }
+
+  // One request and one decode for the whole replay. The <audio> element is
+  // usable right away; once the Web Audio buffer is decoded, clips start and
+  // stop sample-accurately from it instead.
+  preloadSprite() {
+    const { table, dir } = this.sprite;
+    this.spriteClips = new Map(table.clips.map((c) => [c.file, c]));
+    const src = AudioManager.pickSource({
+      file: `${dir}/${table.file}`,
+      variants: (table.variants || []).map((v) => ({ ...v, file: `${dir}/${v.file}` })),
+    });
+
+    const audio = new Audio(src);
+    audio.preload = "auto";
+    audio.ontimeupdate = () => {
+      if (this.spriteStopAt !== null && audio.currentTime >= this.spriteStopAt) {
+        audio.pause();
+        this.spriteStopAt = null;
+        this.handleEnded();
+      }
+    };
+    audio.onerror = (e) => {
+      console.warn("Audio sprite load error:", e);
+      this.handleError(e);
+    };
+    this.spriteAudio = audio;
+
+    const Context = typeof window !== "undefined" && (window.AudioContext || window.webkitAudioContext);
+    if (!Context || typeof fetch !== "function") return;
+    this.audioContext = new Context();
+    fetch(src)
+      .then((response) => response.arrayBuffer())
+      .then((data) => this.audioContext.decodeAudioData(data))
+      .then((buffer) => {
+        this.spriteBuffer = buffer;
+      })
+      .catch((e) => console.warn("Audio sprite decode failed, using <audio> playback:", e));
+  }
+
+  spriteClipFor(audioIdx) {
+    const file = this.audioClips[audioIdx]?.file;
+    const name = file ? file.slice(file.lastIndexOf("/") + 1) : null;
+    return (name && this.spriteClips.get(name)) || this.sprite.table.clips.find((c) => c.index === audioIdx);
+  }
+
+  handleEnded() {
+    this.isPlaying = false;
+    this.currentAudioIdx = -1;
+    if (this.onEndedCallback) this.onEndedCallback();
+  }
+
+  handleError(e) {
+    this.isPlaying = false;
+    this.currentAudioIdx = -1;
+    if (this.onErrorCallback) this.onErrorCallback(e);
+  }
+
+  setSpeed(speed) {
+    this.speed = speed;
+  }
+
+  speedVariant(audioIdx) {
+    return (this.audioClips[audioIdx].speeds || []).find((v) => Math.abs(v.speed - this.speed) < 1e-6);
+  }
+
+  // The stretched copy for the current speed when the clip has one,
+  // otherwise the 1x element (none in sprite mode).
+  elementFor(audioIdx) {
+    const variant = this.speedVariant(audioIdx);
+    if (!variant) return this.audioElements[audioIdx];
+    return this.speedElements[`${audioIdx}@${variant.speed}`];
+  }
+
   setOnEnded(callback) {
     this.onEndedCallback = callback;
   }
@@ -44,8 +182,9 @@ export class AudioManager {
     if (!this.enabled) return false;
     if (this.isPlaying) return false;
     if (audioIdx < 0 || audioIdx >= this.audioClips.length) return false;
+    if (this.sprite && !this.speedVariant(audioIdx)) return this.playSprite(audioIdx);
 
-    const audio = this.audioElements[audioIdx];
+    const audio = this.elementFor(audioIdx);
     if (!audio) return false;
 
     this.isPlaying = true;
@@ -64,10 +203,57 @@ export class AudioManager {
     return true;
   }
 
+  playSprite(audioIdx) {
+    const clip = this.spriteClipFor(audioIdx);
+    if (!clip) return false;
+
+    this.isPlaying = true;
+    this.currentAudioIdx = audioIdx;
+
+    if (this.spriteBuffer) {
+      if (this.audioContext.state === "suspended") this.audioContext.resume();
+      const source = this.audioContext.createBufferSource();
+      source.buffer = this.spriteBuffer;
+      source.connect(this.audioContext.destination);
+      source.onended = () => {
+        // stop() clears spriteSource first, so only natural ends report.
+        if (this.spriteSource !== source) return;
+        this.spriteSource = null;
+        this.handleEnded();
+      };
+      this.spriteSource = source;
+      source.start(0, clip.start, clip.duration);
+      return true;
+    }
+
+    const audio = this.spriteAudio;
+    audio.currentTime = clip.start;
+    this.spriteStopAt = clip.start + clip.duration;
+    const playPromise = audio.play();
+    if (playPromise !== undefined) {
+      playPromise.catch((e) => {
+        console.warn("Audio play failed:", e.message);
+        this.spriteStopAt = null;
+        this.isPlaying = false;
+        this.currentAudioIdx = -1;
+      });
+    }
+    return true;
+  }
+
   stop() {
     if (!this.enabled) return;
-    
-    Object.values(this.audioElements).forEach((audio) => {
+
+    if (this.spriteSource) {
+      const source = this.spriteSource;
+      this.spriteSource = null;
+      source.stop();
+    }
+    if (this.spriteAudio && !this.spriteAudio.paused) {
+      this.spriteAudio.pause();
+    }
+    this.spriteStopAt = null;
+    [...Object.values(this.audioElements), ...Object.values(this.speedElements)].forEach((audio) => {
       if (!audio.paused) {
         audio.pause();
       }
@@ -1,8 +1,17 @@
-import { deepClone, getDistanceAtTime, getTimeAtDistance } from "./utils.js";
+import { compileSplitTable, deepClone, lookupDistanceAtTime, lookupTimeAtDistance } from "./utils.js";
 
 export class CommentaryEngine {
   constructor({ runners, audioClips, runnerCheckpointTemplate, globalEventsTemplate }) {
     this.runners = runners;
+    // Checkpoint templates are keyed by String(runner.id); index once instead
+    // of scanning the field for every entry on every call.
+    this.runnerById = new Map();
+    runners.forEach((runner) => {
+      if (!this.runnerById.has(String(runner.id))) this.runnerById.set(String(runner.id), runner);
+    });
+    // Interpolation tables compiled once, so each poll is a cursor check or
+    // a binary search per runner rather than a scan of every split.
+    this.splitTables = new Map(runners.map((runner) => [runner, compileSplitTable(runner.splits)]));
     this.audioClips = audioClips;
     this.runnerCheckpointTemplate = runnerCheckpointTemplate;
     this.globalEventsTemplate = globalEventsTemplate;
@@ -23,7 +32,7 @@ export class CommentaryEngine {
   getLeaderDistance(raceTime) {
     let maxDist = 0;
     this.runners.forEach((runner) => {
-      const dist = getDistanceAtTime(runner.splits, raceTime);
+      const dist = lookupDistanceAtTime(this.splitTables.get(runner), raceTime);
       if (dist > maxDist) maxDist = dist;
     });
     return maxDist;
@@ -49,7 +58,7 @@ export class CommentaryEngine {
       const dueTime =
         event.type === "time"
           ? event.trigger
-          : Math.min(...this.runners.map((runner) => getTimeAtDistance(runner.splits, event.trigger)));
+          : Math.min(...this.runners.map((runner) => lookupTimeAtDistance(this.splitTables.get(runner), event.trigger)));
 
       dueEvents.push({
         kind: "global",
@@ -61,10 +70,10 @@ export class CommentaryEngine {
 
     // 2) Collect due RUNNER checkpoint events
     for (const [runnerId, checkpoints] of Object.entries(this.runnerCheckpoints)) {
-      const runner = this.runners.find((r) => String(r.id) === String(runnerId));
+      const runner = this.runnerById.get(runnerId);
       if (!runner) continue;
 
-      const currentDist = getDistanceAtTime(runner.splits, raceTime);
+      const currentDist = lookupDistanceAtTime(this.splitTables.get(runner), raceTime);
 
       for (const checkpoint of checkpoints) {
         if (checkpoint.played) continue;
@@ -74,7 +83,7 @@ export class CommentaryEngine {
           kind: "checkpoint",
           ref: checkpoint,
           runnerId: Number(runnerId),
-          dueTime: getTimeAtDistance(runner.splits, checkpoint.distance),
+          dueTime: lookupTimeAtDistance(this.splitTables.get(runner), checkpoint.distance),
           audioIdx: checkpoint.audioIdx,
         });
       }
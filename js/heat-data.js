@@ -192,3 +192,20 @@ export async function loadHeatData() {
     runners,
   };
 }
+
+// Generated per-replay artifacts (commentary_pipeline/publish.py): URLs of
+// those commentary_replays/index.json lists for this replay, by kind
+// ("timing", "sprite", "soundtrack", "timeline"). Unlisted ones are never
+// requested, so replays without generated audio make no failing fetches.
+export async function loadReplayArtifacts(replayId) {
+  try {
+    const response = await fetch("./commentary_replays/index.json");
+    if (!response.ok) return {};
+    const index = await response.json();
+    const entry = index.replays?.[replayId] || {};
+    return Object.fromEntries(Object.entries(entry)
+      .map(([kind, file]) => [kind, `commentary_replays/${replayId}/${file}`]));
+  } catch {
+    return {};
+  }
+}
@@ -4,7 +4,7 @@
 // field-relative scores, race-level signals, and time-ordered commentary events.
 // No DOM, no fetch, no LLM. Safe to run on load and on every replay swap.
 
-import { TRACK_CONFIG } from "./utils.js";
+import { TRACK_CONFIG, compileSplitTable, lookupTimeAtDistance } from "./utils.js";
 
 // =====================================================================
 // CONFIGURATION TABLES
@@ -104,23 +104,22 @@ function safeSplitMarks(runner, raceDistance) {
   return cumulative.map((_, i) => i * interval);
 }
 
-function pickInterpolated(mark, prevMark, prevTime, nextMark, nextTime) {
-  if (nextMark === prevMark) return prevTime;
-  const t = (mark - prevMark) / (nextMark - prevMark);
-  return prevTime + t * (nextTime - prevTime);
+// Interpolation tables per runner, compiled on first use: checkpoint ranks,
+// field spread and commentary all look up the same runners many times.
+const splitTableCache = new WeakMap();
+
+function getSplitTable(runner, raceDistance) {
+  let table = splitTableCache.get(runner);
+  if (!table || table.raceDistance !== raceDistance || table.source !== runner.splits) {
+    table = compileSplitTable(runner.splits || [], safeSplitMarks(runner, raceDistance), raceDistance);
+    table.source = runner.splits;
+    splitTableCache.set(runner, table);
+  }
+  return table;
 }
 
 function timeAtDistance(runner, distance, raceDistance) {
-  const cumulative = runner.splits || [];
-  const marks = safeSplitMarks(runner, raceDistance);
-  if (distance <= 0) return 0;
-  if (distance >= raceDistance) return cumulative[cumulative.length - 1];
-  for (let i = 0; i < marks.length - 1; i += 1) {
-    if (distance >= marks[i] && distance <= marks[i + 1]) {
-      return pickInterpolated(distance, marks[i], cumulative[i], marks[i + 1], cumulative[i + 1]);
-    }
-  }
-  return cumulative[cumulative.length - 1];
+  return lookupTimeAtDistance(getSplitTable(runner, raceDistance), distance);
 }
 
 // =====================================================================
@@ -1,10 +1,11 @@
 import {
   TRACK_CONFIG,
-  getDistanceAtTime,
+  compileSplitTable,
   getLaneStartOffsetMeters,
-  getTimeAtDistance,
   getTrackCoordinates,
   getVisualLane,
+  lookupDistanceAtTime,
+  lookupTimeAtDistance,
 } from "./utils.js";
 
 function getMergeProgress(distance, eventConfig) {
@@ -25,37 +26,20 @@ function getPackedLane(baseLaneIndex, eventConfig) {
   return Math.min(eventConfig.lane_count, 3 + ((baseLaneIndex - 3) * eventConfig.extra_packed_lane_spacing));
 }
 
-function buildPackedLaneTargets(orderedStates, eventConfig) {
-  const packedLaneByRunnerId = new Map();
-  let currentCluster = [];
-
-  function flushCluster() {
-    currentCluster.forEach((state, clusterIndex) => {
-      packedLaneByRunnerId.set(state.id, getPackedLane(clusterIndex, eventConfig));
-    });
-    currentCluster = [];
-  }
-
-  orderedStates.forEach((state, index) => {
-    if (index === 0) {
-      currentCluster.push(state);
-      return;
-    }
-
-    const previous = orderedStates[index - 1];
-    const gapToPrevious = previous.officialDistance - state.officialDistance;
-
-    if (gapToPrevious <= eventConfig.crowding_gap_m) {
-      currentCluster.push(state);
-      return;
+// Packed-lane target for every runner, written into `packedLane` (indexed by
+// runner). `order` lists runner indices in race order; a runner within
+// crowding_gap_m of the one ahead joins that runner's cluster, and each
+// cluster packs onto the rail from lane 1 outward.
+function fillPackedLaneTargets(order, distance, packedLane, eventConfig) {
+  let clusterIndex = 0;
+  for (let k = 0; k < order.length; k += 1) {
+    const runnerIndex = order[k];
+    if (k > 0 && distance[order[k - 1]] - distance[runnerIndex] > eventConfig.crowding_gap_m) {
+      clusterIndex = 0;
     }
-
-    flushCluster();
-    currentCluster.push(state);
-  });
-
-  flushCluster();
-  return packedLaneByRunnerId;
+    packedLane[runnerIndex] = getPackedLane(clusterIndex, eventConfig);
+    clusterIndex += 1;
+  }
 }
 
 function getDisplayLane(baseLane, laneOffset, officialDistance, packedLane, eventConfig) {
@@ -83,11 +67,19 @@ function getDisplayStartOffset(baseLane, officialDistance, eventConfig) {
   return initialOffset * (1 - fadeProgress);
 }
 
+// Snapshot buffers store a runner's phase as an index into RUNNER_PHASES.
+export const RUNNER_PHASES = ["stagger_start", "merge", "packed", "finished", "dnf"];
+const PHASE_STAGGER_START = 0;
+const PHASE_MERGE = 1;
+const PHASE_PACKED = 2;
+const PHASE_FINISHED = 3;
+const PHASE_DNF = 4;
+
 function getRunnerPhase(officialDistance, eventConfig) {
-  if (officialDistance >= eventConfig.race_distance_m) return "finished";
-  if (officialDistance < eventConfig.break_distance_m) return "stagger_start";
-  if (officialDistance < eventConfig.merge_complete_distance_m) return "merge";
-  return "packed";
+  if (officialDistance >= eventConfig.race_distance_m) return PHASE_FINISHED;
+  if (officialDistance < eventConfig.break_distance_m) return PHASE_STAGGER_START;
+  if (officialDistance < eventConfig.merge_complete_distance_m) return PHASE_MERGE;
+  return PHASE_PACKED;
 }
 
 function buildEventConfig(event) {
@@ -181,130 +173,278 @@ function computeFieldSpeedCeiling(runners, eventConfig) {
   return fastestPace * FIELD_SURGE_MARGIN;
 }
 
+
+// Struct-of-arrays storage for one snapshot, indexed by runner (the order of
+// the runners passed to createRaceModel). `order` holds runner indices in
+// race order. Reused across frames by getSnapshot(raceTime, previous).
+function createSnapshotBuffers(count) {
+  const order = new Int16Array(count);
+  for (let i = 0; i < count; i += 1) order[i] = i;
+  return {
+    distance: new Float64Array(count),
+    dropped: new Uint8Array(count),
+    order,
+    place: new Int16Array(count),
+    lapIndex: new Int16Array(count),
+    phase: new Uint8Array(count),
+    packedLane: new Float64Array(count),
+    displayLane: new Float64Array(count),
+    longitudinalOffset: new Float64Array(count),
+    x: new Float64Array(count),
+    y: new Float64Array(count),
+  };
+}
+
+// Whether runner a is ranked ahead of runner b. Dropped-out runners (a pacer
+// who has stepped off) sort to the back regardless of distance — they're no
+// longer in the standings. While still running, a pacer is ordered normally
+// and can legitimately lead. Ties on distance go to the faster final time,
+// then to the runner listed first, so the order never depends on last frame's.
+function ranksAhead(a, b, buffers, finalTimes) {
+  if (buffers.dropped[a] !== buffers.dropped[b]) return buffers.dropped[b] === 1;
+  const distanceDiff = buffers.distance[b] - buffers.distance[a];
+  if (distanceDiff !== 0) return distanceDiff < 0;
+  // Equality check before subtracting guards against Infinity - Infinity
+  // (= NaN) when multiple DNF runners, both with finalTime Infinity, tie.
+  if (finalTimes[a] !== finalTimes[b] && finalTimes[a] - finalTimes[b]) return finalTimes[a] < finalTimes[b];
+  return a < b;
+}
+
+// Re-sort buffers.order in place. Race order barely changes between frames,
+// so an insertion sort over last frame's order is close to one linear pass
+// and allocates nothing.
+function sortRaceOrder(buffers, finalTimes) {
+  const { order } = buffers;
+  for (let k = 1; k < order.length; k += 1) {
+    const runnerIndex = order[k];
+    let j = k - 1;
+    while (j >= 0 && ranksAhead(runnerIndex, order[j], buffers, finalTimes)) {
+      order[j + 1] = order[j];
+      j -= 1;
+    }
+    order[j + 1] = runnerIndex;
+  }
+}
+
+// One runner's state in a snapshot, read lazily from the snapshot buffers.
+// Views are created once per snapshot and always show its latest frame.
+class RunnerStateView {
+  constructor(snapshot, index) {
+    this.snapshot = snapshot;
+    this.index = index;
+    this.runner = snapshot.model.runners[index];
+    this.id = this.runner.id;
+    this.finalTime = this.runner.finalTime;
+    this.position = { x: 0, y: 0 };
+    this.checkpointFlags = null;
+  }
+
+  get officialDistance() { return this.snapshot.buffers.distance[this.index]; }
+  get dropped() { return this.snapshot.buffers.dropped[this.index] === 1; }
+  get placeIndex() { return this.snapshot.buffers.place[this.index]; }
+  get lapIndex() { return this.snapshot.buffers.lapIndex[this.index]; }
+  get distanceIntoLap() { return this.officialDistance % this.snapshot.event.track_length_m; }
+  get phase() { return RUNNER_PHASES[this.snapshot.buffers.phase[this.index]]; }
+  get packedLane() { return this.snapshot.buffers.packedLane[this.index]; }
+  get displayLane() { return this.snapshot.buffers.displayLane[this.index]; }
+  get longitudinalOffset() { return this.snapshot.buffers.longitudinalOffset[this.index]; }
+
+  get trackPosition() {
+    this.position.x = this.snapshot.buffers.x[this.index];
+    this.position.y = this.snapshot.buffers.y[this.index];
+    return this.position;
+  }
+
+  // { [mark]: reached } for every split mark, as live getters.
+  get checkpoints() {
+    if (!this.checkpointFlags) {
+      this.checkpointFlags = {};
+      this.snapshot.event.split_marks_m.forEach((mark) => {
+        Object.defineProperty(this.checkpointFlags, mark, {
+          enumerable: true,
+          get: () => this.officialDistance >= mark,
+        });
+      });
+    }
+    return this.checkpointFlags;
+  }
+}
+
+class RaceSnapshot {
+  constructor(model) {
+    this.model = model;
+    this.event = model.event;
+    this.buffers = createSnapshotBuffers(model.runners.length);
+    this.runnerStates = model.runners.map((_, index) => new RunnerStateView(this, index));
+    this.frame = 0;
+    this.orderedIdsFrame = -1;
+    this.orderedIds = [];
+    this.raceTime = 0;
+    this.effectiveTime = 0;
+    this.isComplete = false;
+    this.leaderId = null;
+    this.leaderDistance = 0;
+  }
+
+  get orderedRunnerIds() {
+    if (this.orderedIdsFrame !== this.frame) {
+      const { order } = this.buffers;
+      this.orderedIds.length = order.length;
+      for (let k = 0; k < order.length; k += 1) this.orderedIds[k] = this.runnerStates[order[k]].id;
+      this.orderedIdsFrame = this.frame;
+    }
+    return this.orderedIds;
+  }
+
+  getRunnerState(id) {
+    const index = this.model.runnerIndexById.get(id);
+    return index === undefined ? null : this.runnerStates[index];
+  }
+
+  getRunnerConfig(id) {
+    return this.model.runnerMap.get(id) || null;
+  }
+
+  getSplitTimeForRunner(id, distanceMark) {
+    const index = this.model.runnerIndexById.get(id);
+    if (index === undefined) return null;
+    return lookupTimeAtDistance(this.model.splitTables[index], distanceMark);
+  }
+}
+
 export function createRaceModel(event, runners) {
   const eventConfig = buildEventConfig(event);
   eventConfig.max_plausible_speed_mps = computeFieldSpeedCeiling(runners, eventConfig);
   const runnerMap = new Map(runners.map((runner) => [runner.id, runner]));
+  // Position of each runner in `runners` (and in every snapshot's buffers and
+  // runnerStates), so per-frame lookups by id are O(1) instead of a scan.
+  const runnerIndexById = new Map();
+  runners.forEach((runner, index) => {
+    if (!runnerIndexById.has(runner.id)) runnerIndexById.set(runner.id, index);
+  });
+  // Resolved once so per-frame interpolation never rebuilds them.
+  const segmentMarks = runners.map((runner) => getRunnerSegmentMarks(runner, eventConfig.race_distance_m));
+  const splitTables = runners.map((runner, index) => (
+    compileSplitTable(runner.splits, segmentMarks[index], eventConfig.race_distance_m)
+  ));
+  const finalTimes = runners.map((runner) => runner.finalTime);
   // The last distance each runner has data for. For a full runner this is the
   // race distance; for a partial runner (a DNF pacer) it's their drop point.
-  const runnerMaxDistance = new Map(runners.map((runner) => {
-    const marks = getRunnerSegmentMarks(runner, eventConfig.race_distance_m);
-    return [runner.id, marks[marks.length - 1]];
-  }));
+  const runnerMaxDistance = segmentMarks.map((marks) => marks[marks.length - 1]);
+  const lastLapIndex = Math.floor(eventConfig.race_distance_m / eventConfig.track_length_m);
+  const geometryOptions = {
+    lapDistance: eventConfig.track_length_m,
+    laneCount: eventConfig.lane_count,
+    startOffsetMeters: 0,
+  };
 
-  function isDropped(runner, officialDistance) {
-    const maxDistance = runnerMaxDistance.get(runner.id) ?? eventConfig.race_distance_m;
+  function isDropped(index, officialDistance) {
+    const maxDistance = runnerMaxDistance[index] ?? eventConfig.race_distance_m;
     return maxDistance < eventConfig.race_distance_m
       && officialDistance >= maxDistance - 1e-6;
   }
 
-  function getSnapshot(raceTime) {
+  // Write the state at raceTime into snapshot's buffers. Allocation-free:
+  // everything lives in the preallocated typed arrays.
+  function fillSnapshot(snapshot, raceTime) {
+    const buffers = snapshot.buffers;
     const effectiveTime = Math.max(0, raceTime);
-    const baseStates = runners.map((runner) => {
-      const officialDistance = getDistanceAtTime(
-        runner.splits,
-        effectiveTime,
-        runner.splitMarks,
-        eventConfig.race_distance_m,
-      );
-
-      return {
-        id: runner.id,
-        runner,
-        officialDistance,
-        finalTime: runner.finalTime,
-        dropped: isDropped(runner, officialDistance),
-      };
-    });
-
-    const orderedStates = [...baseStates].sort((a, b) => {
-      // Dropped-out runners (a pacer who has stepped off) sort to the back
-      // regardless of distance — they're no longer in the standings. While
-      // still running, a pacer is ordered normally and can legitimately lead.
-      if (a.dropped !== b.dropped) return a.dropped ? 1 : -1;
-      const distanceDiff = b.officialDistance - a.officialDistance;
-      if (distanceDiff !== 0) return distanceDiff;
-      // Equality check before subtracting guards against Infinity - Infinity
-      // (= NaN) when multiple DNF runners, both with finalTime Infinity, tie.
-      if (a.finalTime === b.finalTime) return 0;
-      return a.finalTime - b.finalTime;
-    });
-
-    const orderByRunnerId = new Map(orderedStates.map((state, index) => [state.id, index]));
-    const packedLaneTargets = buildPackedLaneTargets(orderedStates, eventConfig);
-
-    const runnerStates = baseStates.map((baseState) => {
-      const placeIndex = orderByRunnerId.get(baseState.id) ?? runners.length - 1;
-      const lapIndex = Math.min(
-        Math.floor(baseState.officialDistance / eventConfig.track_length_m),
-        Math.floor(eventConfig.race_distance_m / eventConfig.track_length_m),
-      );
-      const distanceIntoLap = baseState.officialDistance % eventConfig.track_length_m;
-      const packedLane = packedLaneTargets.get(baseState.id) || 1;
-      const displayLane = getDisplayLane(baseState.runner.lane, baseState.runner.laneOffset, baseState.officialDistance, packedLane, eventConfig);
-      const longitudinalOffset = getDisplayStartOffset(baseState.runner.lane, baseState.officialDistance, eventConfig);
-      const trackPosition = getTrackCoordinates(baseState.officialDistance, displayLane, {
-        lapDistance: eventConfig.track_length_m,
-        laneCount: eventConfig.lane_count,
-        startOffsetMeters: longitudinalOffset,
-      });
-      const checkpoints = Object.fromEntries(
-        eventConfig.split_marks_m.map((mark) => [mark, baseState.officialDistance >= mark]),
-      );
-
-      return {
-        ...baseState,
-        placeIndex,
-        lapIndex,
-        distanceIntoLap,
-        phase: baseState.dropped ? "dnf" : getRunnerPhase(baseState.officialDistance, eventConfig),
-        packedLane,
-        displayLane,
-        longitudinalOffset,
-        trackPosition,
-        checkpoints,
-      };
-    });
-
-    const leader = runnerStates.find((state) => state.placeIndex === 0) || null;
-    const racingStates = runnerStates.filter((state) => state.phase !== "dnf");
-    const isComplete = racingStates.length > 0
-      && racingStates.every((state) => state.officialDistance >= eventConfig.race_distance_m);
-
-    return {
-      raceTime,
-      effectiveTime,
-      event: eventConfig,
-      runnerStates,
-      isComplete,
-      leaderId: leader?.id || null,
-      leaderDistance: leader?.officialDistance || 0,
-      orderedRunnerIds: runnerStates
-        .slice()
-        .sort((a, b) => a.placeIndex - b.placeIndex)
-        .map((state) => state.id),
-      getRunnerState(id) {
-        return runnerStates.find((state) => state.id === id) || null;
-      },
-      getRunnerConfig(id) {
-        return runnerMap.get(id) || null;
-      },
-      getSplitTimeForRunner(id, distanceMark) {
-        const runner = runnerMap.get(id);
-        if (!runner) return null;
-        return getTimeAtDistance(
-          runner.splits,
-          distanceMark,
-          runner.splitMarks,
-          eventConfig.race_distance_m,
-        );
-      },
-    };
+
+    for (let i = 0; i < runners.length; i += 1) {
+      const officialDistance = lookupDistanceAtTime(splitTables[i], effectiveTime);
+      buffers.distance[i] = officialDistance;
+      buffers.dropped[i] = isDropped(i, officialDistance) ? 1 : 0;
+    }
+
+    sortRaceOrder(buffers, finalTimes);
+    for (let k = 0; k < buffers.order.length; k += 1) buffers.place[buffers.order[k]] = k;
+    fillPackedLaneTargets(buffers.order, buffers.distance, buffers.packedLane, eventConfig);
+
+    const point = { x: 0, y: 0 };
+    let isComplete = false;
+    let racing = 0;
+    let finished = 0;
+    for (let i = 0; i < runners.length; i += 1) {
+      const runner = runners[i];
+      const officialDistance = buffers.distance[i];
+      const displayLane = getDisplayLane(runner.lane, runner.laneOffset, officialDistance, buffers.packedLane[i], eventConfig);
+      const longitudinalOffset = getDisplayStartOffset(runner.lane, officialDistance, eventConfig);
+      geometryOptions.startOffsetMeters = longitudinalOffset;
+      getTrackCoordinates(officialDistance, displayLane, geometryOptions, point);
+
+      buffers.lapIndex[i] = Math.min(Math.floor(officialDistance / eventConfig.track_length_m), lastLapIndex);
+      buffers.phase[i] = buffers.dropped[i] ? PHASE_DNF : getRunnerPhase(officialDistance, eventConfig);
+      buffers.displayLane[i] = displayLane;
+      buffers.longitudinalOffset[i] = longitudinalOffset;
+      buffers.x[i] = point.x;
+      buffers.y[i] = point.y;
+
+      if (!buffers.dropped[i]) {
+        racing += 1;
+        if (officialDistance >= eventConfig.race_distance_m) finished += 1;
+      }
+    }
+    isComplete = racing > 0 && finished === racing;
+    return stampSnapshot(snapshot, raceTime, effectiveTime, isComplete);
   }
 
-  return {
+  // Fill snapshot's buffers from the attached trajectory timeline. Positions
+  // and lanes there are the drawn ones (speed governor applied offline), so
+  // packedLane mirrors displayLane and there is no longitudinal offset left.
+  function fillSnapshotFromTimeline(snapshot, raceTime) {
+    const buffers = snapshot.buffers;
+    const effectiveTime = Math.max(0, raceTime);
+    model.timeline.sample(effectiveTime, buffers);
+
+    let racing = 0;
+    let finished = 0;
+    for (let i = 0; i < runners.length; i += 1) {
+      buffers.order[buffers.place[i]] = i;
+      buffers.dropped[i] = buffers.phase[i] === PHASE_DNF ? 1 : 0;
+      buffers.lapIndex[i] = Math.min(Math.floor(buffers.distance[i] / eventConfig.track_length_m), lastLapIndex);
+      buffers.packedLane[i] = buffers.displayLane[i];
+      buffers.longitudinalOffset[i] = 0;
+      if (!buffers.dropped[i]) {
+        racing += 1;
+        if (buffers.phase[i] === PHASE_FINISHED) finished += 1;
+      }
+    }
+    return stampSnapshot(snapshot, raceTime, effectiveTime, racing > 0 && finished === racing);
+  }
+
+  function stampSnapshot(snapshot, raceTime, effectiveTime, isComplete) {
+    const { buffers } = snapshot;
+    const leader = runners.length > 0 ? buffers.order[0] : -1;
+    snapshot.raceTime = raceTime;
+    snapshot.effectiveTime = effectiveTime;
+    snapshot.isComplete = isComplete;
+    snapshot.leaderId = leader >= 0 ? runners[leader].id || null : null;
+    snapshot.leaderDistance = leader >= 0 ? buffers.distance[leader] || 0 : 0;
+    snapshot.frame += 1;
+    return snapshot;
+  }
+
+  const model = {
     event: eventConfig,
     runners,
-    getSnapshot,
+    runnerMap,
+    runnerIndexById,
+    splitTables,
+    timeline: null,
+    // The state of the race at raceTime. Pass the previous snapshot from this
+    // model to refill it in place (no per-frame allocation; views handed out
+    // earlier then show the new frame); without one a new snapshot is built.
+    getSnapshot(raceTime, previous = null) {
+      const snapshot = previous && previous.model === model ? previous : new RaceSnapshot(model);
+      return model.timeline ? fillSnapshotFromTimeline(snapshot, raceTime) : fillSnapshot(snapshot, raceTime);
+    },
+    // Play back a precomputed trajectory timeline (timeline.js) instead of
+    // evaluating the model each frame. Returns false, keeping the live model,
+    // when it was built for other runners or another oval.
+    useTimeline(timeline) {
+      model.timeline = timeline && timeline.matches(runners, TRACK_CONFIG.svg) ? timeline : null;
+      return model.timeline !== null;
+    },
   };
+  return model;
 }
@@ -0,0 +1,97 @@
+// Pre-rendered replay soundtrack (python -m commentary_pipeline mixdown):
+// commentary and effects mixed into one track per playback speed. Instead of
+// firing clips and effects per frame, the player keeps a single stream at the
+// position for state.raceTime and only seeks when it drifts.
+
+const DRIFT_TOLERANCE_S = 0.15;
+
+export class SoundtrackPlayer {
+  constructor() {
+    this.table = null;
+    this.dir = "";
+    this.audio = null;
+    this.track = null;
+    this.pendingSeek = null;
+  }
+
+  // Resolves false (and stays inactive) when the replay has no soundtrack.
+  async load(url) {
+    try {
+      const response = await fetch(url);
+      if (!response.ok) return false;
+      this.table = await response.json();
+    } catch {
+      return false;
+    }
+    this.dir = url.slice(0, url.lastIndexOf("/")) || ".";
+    return this.table.tracks?.length > 0;
+  }
+
+  trackFor(speed) {
+    return this.table?.tracks.find((track) => Math.abs(track.speed - speed) < 1e-6) || null;
+  }
+
+  // True when a track covers this speed (the caller then skips live triggers).
+  isActive(speed) {
+    return this.trackFor(speed) !== null;
+  }
+
+  positionFor(raceTime, track) {
+    return Math.max(0, (raceTime - this.table.raceTimeStart) / track.speed);
+  }
+
+  // Call once per frame. Returns whether the soundtrack is handling audio.
+  sync(raceTime, speed, isRunning) {
+    const track = this.trackFor(speed);
+    if (track !== this.track) this.switchTo(track);
+    if (!track) return false;
+
+    const audio = this.audio;
+    const position = this.positionFor(raceTime, track);
+    if (!isRunning) {
+      if (!audio.paused) audio.pause();
+      return true;
+    }
+    if (position >= track.duration) {
+      if (!audio.paused) audio.pause();
+      return true;
+    }
+    if (audio.readyState < 1) {
+      // No metadata yet: seek as soon as it arrives.
+      this.pendingSeek = position;
+    } else if (Math.abs(audio.currentTime - position) > DRIFT_TOLERANCE_S) {
+      audio.currentTime = position;
+    }
+    if (audio.paused) {
+      audio.play().catch((e) => console.warn("Soundtrack play failed:", e.message));
+    }
+    return true;
+  }
+
+  switchTo(track) {
+    if (this.audio) {
+      this.audio.pause();
+      this.audio = null;
+    }
+    this.track = track;
+    this.pendingSeek = null;
+    if (!track) return;
+    this.audio = new Audio(`${this.dir}/${track.file}`);
+    this.audio.preload = "auto";
+    this.audio.onloadedmetadata = () => {
+      if (this.pendingSeek !== null) {
+        this.audio.currentTime = this.pendingSeek;
+        this.pendingSeek = null;
+      }
+    };
+  }
+
+  pause() {
+    if (this.audio && !this.audio.paused) this.audio.pause();
+  }
+
+  reset() {
+    this.pause();
+    if (this.audio && this.audio.readyState >= 1) this.audio.currentTime = 0;
+  }
+}
@@ -0,0 +1,83 @@
+// Precomputed trajectory timeline (python -m commentary_pipeline timeline):
+// every marker's drawn position, lane, place and phase at a fixed frame rate
+// of race time. With one attached (model.useTimeline) the race model fills
+// its snapshot by interpolating the two keyframes around the requested time
+// instead of evaluating the model, and the render loop places markers
+// directly instead of running the speed governor. Every device then draws
+// the same race, and seeking is a lookup.
+
+const TIMELINE_VERSION = 1;
+const PLANE_TYPES = { float32: Float32Array, int16: Int16Array, uint8: Uint8Array };
+// Playback time is summed from frame deltas, so it lands a rounding error shy
+// of a keyframe; that close counts as on it for place and phase.
+const FRAME_EPSILON = 1e-6;
+
+export class TrajectoryTimeline {
+  constructor(index, buffer) {
+    this.fps = index.fps;
+    this.frames = index.frames;
+    this.runnerIds = index.runnerIds;
+    this.count = index.runnerIds.length;
+    this.svg = index.svg;
+    this.xyScale = index.xyScale;
+    this.laneScale = index.laneScale;
+    this.planes = {};
+    index.planes.forEach((plane) => {
+      const Type = PLANE_TYPES[plane.type];
+      this.planes[plane.name] = new Type(buffer, plane.offset, this.frames * this.count);
+    });
+  }
+
+  // Resolves null when the replay has no timeline or it can't be read.
+  static async load(url) {
+    try {
+      const response = await fetch(url);
+      if (!response.ok) return null;
+      const index = await response.json();
+      if (index.version !== TIMELINE_VERSION || !(index.frames > 0)) return null;
+      const dir = url.slice(0, url.lastIndexOf("/")) || ".";
+      const data = await fetch(`${dir}/${index.file}`);
+      if (!data.ok) return null;
+      const buffer = await data.arrayBuffer();
+      if (buffer.byteLength < index.bytes) return null;
+      return new TrajectoryTimeline(index, buffer);
+    } catch {
+      return null;
+    }
+  }
+
+  // Whether this timeline was built for these runners (same ids, same order)
+  // on the oval currently installed in svg{}.
+  matches(runners, svg) {
+    if (runners.length !== this.count) return false;
+    if (runners.some((runner, index) => runner.id !== this.runnerIds[index])) return false;
+    return ["centerX", "topY", "bottomY", "outerRadius", "innerRadius"]
+      .every((key) => Math.abs(svg[key] - this.svg[key]) < 1e-6);
+  }
+
+  // Write the state at raceTime into snapshot buffers (race-model.js layout):
+  // distance, x, y and displayLane interpolated between keyframes, place and
+  // phase taken from the keyframe at or before raceTime.
+  sample(raceTime, buffers) {
+    const { distance, x, y, lane, place, phase } = this.planes;
+    const count = this.count;
+    const last = this.frames - 1;
+    const position = Math.min(Math.max(raceTime * this.fps, 0), last);
+    const frame = Math.floor(position);
+    const step = position - frame;
+    const from = frame * count;
+    const to = Math.min(frame + 1, last) * count;
+    const keyframe = Math.min(Math.floor(position + FRAME_EPSILON), last) * count;
+
+    for (let i = 0; i < count; i += 1) {
+      const a = from + i;
+      const b = to + i;
+      buffers.distance[i] = distance[a] + ((distance[b] - distance[a]) * step);
+      buffers.x[i] = (x[a] + ((x[b] - x[a]) * step)) / this.xyScale;
+      buffers.y[i] = (y[a] + ((y[b] - y[a]) * step)) / this.xyScale;
+      buffers.displayLane[i] = (lane[a] + ((lane[b] - lane[a]) * step)) / this.laneScale;
+      buffers.place[i] = place[keyframe + i];
+      buffers.phase[i] = phase[keyframe + i];
+    }
+  }
+}
@@ -59,6 +59,7 @@ export function configureTrackGeometry(event = {}) {
 
   if (!profile) {
     Object.assign(TRACK_CONFIG.svg, DEFAULT_SVG);
+    trackGeometryCache = buildTrackGeometryCache();
     return TRACK_CONFIG.svg;
   }
 
@@ -95,6 +96,7 @@ export function configureTrackGeometry(event = {}) {
     outerRadius,
     innerRadius,
   });
+  trackGeometryCache = buildTrackGeometryCache();
   return TRACK_CONFIG.svg;
 }
 
@@ -127,8 +129,72 @@ function getLaneRadiusPx(lane, laneCount = TRACK_CONFIG.laneCount) {
 }
 
 export function getLanePathLengthPx(lane, laneCount = TRACK_CONFIG.laneCount) {
-  const radius = getLaneRadiusPx(lane, laneCount);
-  return (2 * straightVisualLength()) + (2 * Math.PI * radius);
+  const cache = getTrackGeometryCache();
+  const radius = cache.outerRadius - (laneCount * cache.laneWidth) + ((clampLane(lane, laneCount) - 0.5) * cache.laneWidth);
+  return (2 * cache.straightLength) + (2 * Math.PI * radius);
+}
+
+// Geometry cache for getTrackCoordinates, which runs several times per runner
+// per frame (model, speed governor). Everything that depends only on the
+// installed svg{} profile is resolved once: the straight length and lane width
+// (so a lane's radius and arc lengths are a multiply-add away; they are linear
+// in the lane, so a fractional lane blends its neighbours exactly), and the
+// bends read a sampled half circle instead of calling cos/sin. With
+// BEND_SAMPLES steps a point interpolated between samples strays well under a
+// thousandth of a pixel from the true arc.
+const BEND_SAMPLES = 1024;
+const BEND_COS = new Float64Array(BEND_SAMPLES + 1);
+const BEND_SIN = new Float64Array(BEND_SAMPLES + 1);
+for (let sample = 0; sample <= BEND_SAMPLES; sample += 1) {
+  const angle = (sample / BEND_SAMPLES) * Math.PI;
+  BEND_COS[sample] = Math.cos(angle);
+  BEND_SIN[sample] = Math.sin(angle);
+}
+
+// Built by configureTrackGeometry; rebuilt if svg{} or TRACK_CONFIG.laneCount
+// no longer match what it was built from.
+let trackGeometryCache = null;
+
+function buildTrackGeometryCache() {
+  const { centerX, topY, bottomY, outerRadius, innerRadius } = TRACK_CONFIG.svg;
+  return {
+    centerX,
+    topY,
+    bottomY,
+    outerRadius,
+    innerRadius,
+    trackLaneCount: TRACK_CONFIG.laneCount,
+    straightLength: straightVisualLength(),
+    laneWidth: baseVisualLaneWidth(),
+  };
+}
+
+function getTrackGeometryCache() {
+  const cache = trackGeometryCache;
+  const svg = TRACK_CONFIG.svg;
+  if (
+    !cache
+    || cache.centerX !== svg.centerX
+    || cache.topY !== svg.topY
+    || cache.bottomY !== svg.bottomY
+    || cache.outerRadius !== svg.outerRadius
+    || cache.innerRadius !== svg.innerRadius
+    || cache.trackLaneCount !== TRACK_CONFIG.laneCount
+  ) {
+    trackGeometryCache = buildTrackGeometryCache();
+  }
+  return trackGeometryCache;
+}
+
+// Point at `fraction` (0-1) of the way around a bend, as [cos, sin] of
+// fraction * PI, written into out.x / out.y.
+function sampleBend(fraction, out) {
+  const position = Math.min(Math.max(fraction, 0), 1) * BEND_SAMPLES;
+  const sample = Math.min(Math.floor(position), BEND_SAMPLES - 1);
+  const step = position - sample;
+  out.x = BEND_COS[sample] + ((BEND_COS[sample + 1] - BEND_COS[sample]) * step);
+  out.y = BEND_SIN[sample] + ((BEND_SIN[sample + 1] - BEND_SIN[sample]) * step);
+  return out;
 }
 
 export function getLaneStartOffsetMeters(
@@ -161,57 +227,59 @@ export function getVisualLane(lane, laneCount = TRACK_CONFIG.laneCount) {
  * outer lanes angularly ahead, drawing a rail leader behind packed runners;
  * fully on the inner lane (blend = 0) aligns them perfectly but speeds outer
  * lanes up on the curves. The blend trades a little of each.
+ *
+ * Pass `out` (any {x, y} object) to have the point written into it instead of
+ * a new object — the per-frame snapshot reuses one per runner.
  */
-export function getTrackCoordinates(meters, lane = 1, options = {}) {
+export function getTrackCoordinates(meters, lane = 1, options = {}, out = {}) {
   const lapDistance = options.lapDistance ?? TRACK_CONFIG.trackLength;
   const startOffsetMeters = options.startOffsetMeters ?? 0;
   const laneCount = options.laneCount ?? TRACK_CONFIG.laneCount;
-  const normalizedMeters = (((meters + startOffsetMeters) % lapDistance) + lapDistance) % lapDistance;
+  // One fmod plus a branch: % is costly next to the table lookups below.
+  let normalizedMeters = (meters + startOffsetMeters) % lapDistance;
+  if (normalizedMeters < 0) normalizedMeters += lapDistance;
+  if (normalizedMeters >= lapDistance) normalizedMeters = 0;
   const progress = normalizedMeters / lapDistance;
-  const radius = getLaneRadiusPx(lane, laneCount);
-  const { centerX, topY, bottomY } = TRACK_CONFIG.svg;
+  const { centerX, topY, bottomY, outerRadius, laneWidth, straightLength: straightLen } = getTrackGeometryCache();
+  const trackInnerRadius = outerRadius - (laneCount * laneWidth);
+  const radius = trackInnerRadius + (clampLane(lane, laneCount) - 0.5) * laneWidth;
 
   // Curve parametrization radius: blended between the inner lane and this
   // runner's own radius. Straights are a fixed pixel length for every lane, so
   // only the curve length needs this shared-ish reference.
-  const innerRadius = getLaneRadiusPx(1, laneCount);
+  const innerRadius = trackInnerRadius + (clampLane(1, laneCount) - 0.5) * laneWidth;
   const referenceRadius = innerRadius + (LANE_FAIR_BLEND * (radius - innerRadius));
   const halfCircumference = Math.PI * referenceRadius;
-  const straightLen = straightVisualLength();
   const totalPath = (2 * straightLen) + (2 * halfCircumference);
   const finishLinePathDistance = (2 * straightLen) + halfCircumference;
-  const pathDistance = ((progress * totalPath) + finishLinePathDistance) % totalPath;
+  let pathDistance = (progress * totalPath) + finishLinePathDistance;
+  if (pathDistance >= totalPath) pathDistance -= totalPath;
 
   if (pathDistance <= straightLen) {
-    return {
-      x: centerX - radius,
-      y: topY + pathDistance,
-    };
+    out.x = centerX - radius;
+    out.y = topY + pathDistance;
+    return out;
   }
 
   if (pathDistance <= straightLen + halfCircumference) {
-    const arcFraction = (pathDistance - straightLen) / halfCircumference;
-    const angle = Math.PI - (arcFraction * Math.PI);
-    return {
-      x: centerX + radius * Math.cos(angle),
-      y: bottomY + radius * Math.sin(angle),
-    };
+    // Angle PI - fraction * PI: cos flips sign, sin is unchanged.
+    sampleBend((pathDistance - straightLen) / halfCircumference, out);
+    out.x = centerX - (radius * out.x);
+    out.y = bottomY + (radius * out.y);
+    return out;
   }
 
   if (pathDistance <= (2 * straightLen) + halfCircumference) {
     const straightDistance = pathDistance - straightLen - halfCircumference;
-    return {
-      x: centerX + radius,
-      y: bottomY - straightDistance,
-    };
+    out.x = centerX + radius;
+    out.y = bottomY - straightDistance;
+    return out;
   }
 
-  const arcFraction = (pathDistance - (2 * straightLen) - halfCircumference) / halfCircumference;
-  const angle = arcFraction * Math.PI;
-  return {
-    x: centerX + radius * Math.cos(angle),
-    y: topY - radius * Math.sin(angle),
-  };
+  sampleBend((pathDistance - (2 * straightLen) - halfCircumference) / halfCircumference, out);
+  out.x = centerX + (radius * out.x);
+  out.y = topY - (radius * out.y);
+  return out;
 }
 
 export function getCheckpointSegment(meters, options = {}) {
@@ -290,6 +358,124 @@ export function getTimeAtDistance(splits, targetDistance, splitMarks = null, rac
   return splits[splits.length - 1];
 }
 
+// Compile a runner's splits into an interpolation table, once per replay, so
+// per-frame and per-checkpoint lookups are a binary search (or, for forward
+// playback, a check of the segment used last time) instead of re-normalizing
+// the marks and scanning every segment. Segment durations and lengths are
+// stored rather than speeds so results match getDistanceAtTime and
+// getTimeAtDistance bit for bit.
+export function compileSplitTable(splits, splitMarks = null, raceDistance = TRACK_CONFIG.raceDistance) {
+  const marks = Float64Array.from(getNormalizedSplitMarks(splits, splitMarks, raceDistance));
+  const times = Float64Array.from(splits);
+  const segmentCount = Math.max(0, times.length - 1);
+  const durations = new Float64Array(segmentCount);
+  const lengths = new Float64Array(segmentCount);
+  let monotonic = true;
+  for (let i = 0; i < segmentCount; i += 1) {
+    durations[i] = times[i + 1] - times[i];
+    lengths[i] = marks[i + 1] - marks[i];
+    if (!(durations[i] >= 0 && lengths[i] >= 0)) monotonic = false;
+  }
+
+  return {
+    times,
+    marks,
+    durations,
+    lengths,
+    raceDistance,
+    // Binary search needs sorted times and marks; malformed splits fall back
+    // to the same linear scan as the uncompiled functions.
+    monotonic,
+    lastTime: times[times.length - 1],
+    lastMark: marks[marks.length - 1],
+    cursor: 0,
+  };
+}
+
+// Last index i with values[i] <= value, or -1.
+function findLastAtOrBelow(values, value) {
+  let lo = 0;
+  let hi = values.length - 1;
+  let found = -1;
+  while (lo <= hi) {
+    const mid = (lo + hi) >> 1;
+    if (values[mid] <= value) {
+      found = mid;
+      lo = mid + 1;
+    } else {
+      hi = mid - 1;
+    }
+  }
+  return found;
+}
+
+// getDistanceAtTime against a compiled table.
+export function lookupDistanceAtTime(table, currentTime) {
+  if (currentTime <= 0) return 0;
+  const { times, marks, durations, lengths } = table;
+  if (currentTime >= table.lastTime) return table.lastMark;
+
+  let i = -1;
+  if (table.monotonic) {
+    // Playback moves forward a little each frame: try the segment used last
+    // time and the one after it before searching.
+    const cursor = table.cursor;
+    if (times[cursor] <= currentTime && currentTime < times[cursor + 1]) {
+      i = cursor;
+    } else if (times[cursor + 1] <= currentTime && currentTime < times[cursor + 2]) {
+      i = cursor + 1;
+    } else {
+      i = findLastAtOrBelow(times, currentTime);
+    }
+    if (i < 0) return table.lastMark;
+    table.cursor = i;
+  } else {
+    for (let k = 0; k < durations.length; k += 1) {
+      if (currentTime >= times[k] && currentTime < times[k + 1]) {
+        i = k;
+        break;
+      }
+    }
+    if (i < 0) return table.lastMark;
+  }
+
+  return marks[i] + (((currentTime - times[i]) / durations[i]) * lengths[i]);
+}
+
+// getTimeAtDistance against a compiled table.
+export function lookupTimeAtDistance(table, targetDistance) {
+  if (targetDistance <= 0) return 0;
+  if (targetDistance >= table.raceDistance) return table.lastTime;
+  const { times, marks, durations, lengths } = table;
+
+  let i = -1;
+  if (table.monotonic) {
+    // First segment whose end mark is at or past the target.
+    let lo = 0;
+    let hi = durations.length - 1;
+    while (lo <= hi) {
+      const mid = (lo + hi) >> 1;
+      if (targetDistance <= marks[mid + 1]) {
+        i = mid;
+        hi = mid - 1;
+      } else {
+        lo = mid + 1;
+      }
+    }
+  } else {
+    for (let k = 0; k < durations.length; k += 1) {
+      if (targetDistance <= marks[k + 1]) {
+        i = k;
+        break;
+      }
+    }
+  }
+  if (i < 0) return table.lastTime;
+  if (lengths[i] === 0) return times[i];
+
+  return times[i] + (durations[i] * ((targetDistance - marks[i]) / lengths[i]));
+}
+
 export function formatTime(seconds) {
   if (!Number.isFinite(seconds)) return "—";
   if (seconds < 0) {
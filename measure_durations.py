@@ -1,50 +1,30 @@
-import os
-import json
-from pathlib import Path
-from pydub import AudioSegment
+import sys
+import time
 
-# Scan actual MP3 files and get durations
-audio_dir = Path("./commentary_audio_v2")
-mp3_files = sorted(audio_dir.glob("*.mp3"))
+from commentary_pipeline import AssetIndex
 
-print(f"Found {len(mp3_files)} MP3 files")
-print("-" * 80)
+# Refresh the clip directory's asset index; only new or changed MP3 files are
+# re-read (durations come from their headers, never a decode)
+audio_dir = sys.argv[1] if len(sys.argv) > 1 else "./commentary_audio_v2"
+output_path = sys.argv[2] if len(sys.argv) > 2 else "./data/commentary_timing.json"
 
-commentary_timing = []
+start = time.perf_counter()
+index = AssetIndex(audio_dir)
+stats = index.refresh()
+elapsed_ms = (time.perf_counter() - start) * 1000
 
-for mp3_file in mp3_files:
-    if mp3_file.name == "commentary_manifest.json":
-        continue
-    
-    # Parse index from filename (commentary_XX_...)
-    try:
-        parts = mp3_file.stem.split("_")
-        index = int(parts[1])
-    except:
-        continue
-    
-    # Get duration
-    audio = AudioSegment.from_mp3(mp3_file)
-    duration_sec = round(len(audio) / 1000, 2)
-    
-    commentary_timing.append({
-        "index": index,
-        "filename": mp3_file.name,
-        "duration": duration_sec
-    })
-    
-    print(f"  [{index:02d}] {mp3_file.name[:50]:50s} - {duration_sec:5.2f}s")
+print(f"Indexed {len(index.assets)} MP3 files ({stats.describe()}) in {elapsed_ms:.1f} ms")
+print("-" * 80)
 
-# Sort by index
-commentary_timing.sort(key=lambda x: x["index"])
+for asset in index.ordered():
+    print(f"  [{asset['index']:02d}] {asset['filename'][:50]:50s} - {asset['duration_sec']:5.2f}s")
+for name in stats.skipped:
+    print(f"  Skipping {name}: not a commentary_XX_<time>s clip")
 
 # Save timing data
-timing_data = {"commentaryTiming": commentary_timing}
-
-output_path = "./data/commentary_timing.json"
-with open(output_path, "w") as f:
-    json.dump(timing_data, f, indent=2)
+timing_data = index.timing()
+index.write_timing(output_path)
 
 print("-" * 80)
-print(f"Created commentary_timing.json with {len(commentary_timing)} entries")
+print(f"Created commentary_timing.json with {len(timing_data['commentaryTiming'])} entries")
 print(f"Output: {output_path}")